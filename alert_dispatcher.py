@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Non-blocking alert sounds
+A background worker plays queued alerts through one backend chosen at startup: afplay (macOS),
+paplay/aplay (Linux), the terminal bell, or null/recording for tests. An alert already waiting in the
+queue isn't queued twice.
+
+    python3 alert_dispatcher.py [sound ...]     # Play sounds through the detected backend
+
+ROAST_ALERTS=afplay|paplay|aplay|bell|null picks the backend instead of detecting one.
+"""
+import collections
+import os
+import shutil
+import subprocess
+import sys
+import threading
+
+MACOS_SOUND_DIR = '/System/Library/Sounds'
+FREEDESKTOP_SOUND_DIR = '/usr/share/sounds/freedesktop/stereo'  # .oga files, played by paplay
+ALSA_SOUND_DIR = '/usr/share/sounds/alsa'  # .wav files, played by aplay
+
+# The session's macOS sound names, mapped to the closest stock Linux sounds
+LINUX_SOUNDS = {
+    'Tink': ('message', 'Front_Center'),
+    'Hero': ('complete', 'Front_Center'),
+    'Ping': ('bell', 'Noise'),
+    'Glass': ('dialog-information', 'Front_Left'),
+    'Purr': ('dialog-warning', 'Rear_Center'),
+    'Bottle': ('message-new-instant', 'Front_Right'),
+    'Pop': ('dialog-information', 'Side_Left'),
+    'Funk': ('complete', 'Rear_Left'),
+}
+
+class CommandBackend:
+    """Plays each sound by running a player command on its file"""
+
+    def __init__(self, name, command, sound_file):
+        self.name = name
+        self.command = command  # Resolved path of the player
+        self.sound_file = sound_file  # sound name -> path, or None if there's no file for it
+
+    def play(self, sound):
+        path = self.sound_file(sound)
+        if path is None:
+            return
+        subprocess.run([self.command, path], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+class BellBackend:
+    """The terminal bell, for any sound"""
+    name = 'bell'
+
+    def __init__(self, file=None):
+        self.file = file
+
+    def play(self, sound):
+        file = self.file or sys.stdout
+        file.write('\a')
+        file.flush()
+
+class NullBackend:
+    """Plays nothing"""
+    name = 'null'
+
+    def play(self, sound):
+        pass
+
+class RecordingBackend:
+    """Plays nothing and keeps the sounds it was given, in order (for tests)"""
+    name = 'recording'
+
+    def __init__(self):
+        self.played = []
+
+    def play(self, sound):
+        self.played.append(sound)
+
+def _linux_sound(directory, extension, index):
+    def sound_file(sound):
+        names = LINUX_SOUNDS.get(sound, LINUX_SOUNDS['Ping'])
+        path = os.path.join(directory, names[index] + extension)
+        return path if os.path.exists(path) else None
+    return sound_file
+
+def _macos_sound(sound):
+    return os.path.join(MACOS_SOUND_DIR, f'{sound}.aiff')
+
+def make_backend(name):
+    """The named backend, or None if it can't play here (player or sound files missing)"""
+    if name == 'bell':
+        return BellBackend()
+    if name == 'null':
+        return NullBackend()
+    player = shutil.which(name)
+    if player is None:
+        return None
+    if name == 'afplay':
+        return CommandBackend(name, player, _macos_sound)
+    if name == 'paplay' and os.path.isdir(FREEDESKTOP_SOUND_DIR):
+        return CommandBackend(name, player, _linux_sound(FREEDESKTOP_SOUND_DIR, '.oga', 0))
+    if name == 'aplay' and os.path.isdir(ALSA_SOUND_DIR):
+        return CommandBackend(name, player, _linux_sound(ALSA_SOUND_DIR, '.wav', 1))
+    return None
+
+def detect_backend():
+    """The best backend for this machine: ROAST_ALERTS if set, else the first player found, else the bell"""
+    requested = os.environ.get('ROAST_ALERTS')
+    if requested:
+        backend = make_backend(requested)
+        if backend is not None:
+            return backend
+        print(f"⚠️  ROAST_ALERTS={requested} can't play here; detecting a backend instead", file=sys.stderr)
+    for name in ('afplay', 'paplay', 'aplay'):
+        backend = make_backend(name)
+        if backend is not None:
+            return backend
+    return BellBackend()
+
+class AlertDispatcher:
+    """
+    Plays alerts one at a time on a daemon worker thread; play() returns at once.
+
+    A sound that is already waiting in the queue is not queued again, so a
+    burst of the same alert plays once. If the backend fails, the worker
+    switches to the terminal bell for the rest of the process.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self._queue = collections.deque()
+        self._cond = threading.Condition()
+        self._playing = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def play(self, sound):
+        """Queue `sound`; False if the same sound was already waiting"""
+        with self._cond:
+            if sound in self._queue:
+                return False
+            self._queue.append(sound)
+            self._cond.notify_all()
+        return True
+
+    def wait(self, timeout=None):
+        """Block until every queued alert has played; False on timeout"""
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._queue and not self._playing, timeout)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._queue)
+                sound = self._queue.popleft()
+                self._playing = True
+            try:
+                self.backend.play(sound)
+            except (OSError, subprocess.SubprocessError):
+                self.backend = BellBackend()
+                self.backend.play(sound)
+            finally:
+                with self._cond:
+                    self._playing = False
+                    self._cond.notify_all()
+
+if __name__ == "__main__":
+    dispatcher = AlertDispatcher(detect_backend())
+    sounds = sys.argv[1:] or list(LINUX_SOUNDS)
+    print(f"Backend: {dispatcher.backend.name}")
+    for sound in sounds:
+        print(f"  {sound}")
+        dispatcher.play(sound)
+        dispatcher.wait()
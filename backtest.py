@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Rolling-origin backtest of the phase estimator
+Replays the log roast by roast: each roast is predicted from the roasts of its type before it, and the
+mean absolute error per phase is reported for every variant (window, half-life, ideal rating)
+
+Sweep comma-separated values (half-life 0 = no recency decay); variants run in a process pool:
+    python3 backtest.py [windows] [half_lives] [ideals] [workers]
+    python3 backtest.py 3,5,10 0,30,90 5
+"""
+import itertools
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from decay_weights import WeightedSeries
+from phase_estimator import IDEAL_RATING, PHASE_FIELDS, phase_value
+
+_RECORDS = None  # Set once per worker process by _init_worker
+
+def backtest(records, window=5, half_life_days=None, ideal=IDEAL_RATING):
+    """
+    Mean absolute error per phase of one estimator variant: {field: (mae, predictions)}.
+
+    Roasts are replayed oldest first. Before a roast is added to its group's
+    WeightedSeries, the series predicts it from the last `window` roasts of
+    that group, so each prediction only sees what the session would have seen.
+    mae is None for a phase that was never predicted.
+    """
+    totals = {field: [0.0, 0] for field in PHASE_FIELDS}
+    series = {True: WeightedSeries((), half_life_days, ideal), False: WeightedSeries((), half_life_days, ideal)}
+    for r in records:
+        group = series[r.decaf]
+        if len(group):
+            predicted = group.last_n_means(window)
+            for field in PHASE_FIELDS:
+                actual = phase_value(r, field)
+                if actual is not None and predicted[field] is not None:
+                    totals[field][0] += abs(predicted[field] - actual)
+                    totals[field][1] += 1
+        group.append(r)
+    return {field: (total / count if count else None, count) for field, (total, count) in totals.items()}
+
+def _init_worker(records):
+    global _RECORDS
+    _RECORDS = records
+
+def _run_variant(variant):
+    return backtest(_RECORDS, *variant)
+
+def sweep(records, variants, workers=None):
+    """
+    backtest() for every (window, half_life_days, ideal) variant, in order.
+
+    Variants are spread over a pool of `workers` processes (default: one per
+    core, at most one per variant). Each worker receives the parsed roasts
+    once, not once per variant.
+    """
+    variants = list(variants)
+    workers = min(workers or os.cpu_count() or 1, len(variants))
+    if workers <= 1:
+        return [backtest(records, *variant) for variant in variants]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(list(records),)) as pool:
+        return list(pool.map(_run_variant, variants))
+
+def _values(arg, convert, default):
+    if not arg:
+        return default
+    return [convert(value) for value in arg.split(',')]
+
+if __name__ == "__main__":
+    import time
+
+    from history_cache import HistoryCache
+    from roast_store import open_store
+
+    windows = _values(sys.argv[1] if len(sys.argv) > 1 else '', int, [3, 5, 10])
+    half_lives = _values(sys.argv[2] if len(sys.argv) > 2 else '', float, [0.0, 30.0, 90.0])
+    ideals = _values(sys.argv[3] if len(sys.argv) > 3 else '', float, [IDEAL_RATING])
+    workers = int(sys.argv[4]) if len(sys.argv) > 4 else None
+
+    records = HistoryCache(open_store()).records()
+    variants = [(w, h or None, i) for w, h, i in itertools.product(windows, half_lives, ideals)]
+    started = time.perf_counter()
+    results = sweep(records, variants, workers)
+    elapsed = time.perf_counter() - started
+
+    print(f"Backtest: {len(records)} roasts x {len(variants)} variants in {elapsed:.2f}s")
+    print("MAE per phase (times in seconds, temps in °C); n = roasts predicted for FC start\n")
+    labels = [field.replace('_time', ' t').replace('_temp', ' T').replace('turnaround', 'turn') for field in PHASE_FIELDS]
+    print(f"  {'window':>6} {'half-life':>9} {'ideal':>5}" + ''.join(f"{label:>12}" for label in labels) + f"{'n':>7}")
+    for (window, half_life, ideal), result in sorted(zip(variants, results),
+                                                     key=lambda item: item[1]['fc_start_time'][0] or float('inf')):
+        cells = ''.join(f"{'-' if mae is None else f'{mae:.1f}':>12}" for mae, _ in result.values())
+        print(f"  {window:6d} {'none' if half_life is None else f'{half_life:g}':>9} {ideal:5g}"
+              + cells + f"{result['fc_start_time'][1]:7d}")
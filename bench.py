@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for the code roast.py runs every session
+Times and memory-profiles (tracemalloc) loading, estimates, saving and viewing on synthetic logs of 10^2 rows
+up to a maximum size, writes bench_results.json and compares it against bench_baseline.json
+
+    python3 bench.py run [max_rows]         # Default 100000; 1000000 for the full range; fails without a baseline
+    python3 bench.py baseline [max_rows]    # Run and store the results as the new baseline
+
+Each log size runs in a fresh process, so every size starts as cold as a new session.
+"""
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from generate_log import DEFAULT_SEED, write_log
+
+RESULTS_FILE = "bench_results.json"
+BASELINE_FILE = "bench_baseline.json"
+DEFAULT_MAX_ROWS = 100000
+REPEAT = 5  # Timed calls per target after the first; the fastest is reported
+COLD_RUNS = 3  # Fresh processes per size; each figure is the best of them, so one slow start isn't a regression
+TOLERANCE = 0.25  # Slower or bigger than the baseline by more than this is a regression
+NOISE_SECONDS = 0.001  # Differences below this are timer noise, never a regression
+FIRST_NOISE_SECONDS = 0.005  # Same for first calls, which also jitter with imports and the disk cache
+
+def build_log(path, rows, seed=DEFAULT_SEED):
+    """Write a synthetic V2 log of `rows` roasts (see generate_log.py); the seed keeps runs comparable"""
+    with open(path, 'w', newline='') as f:
+        write_log(f, rows, 'v2', seed)
+
+def _measure(call, repeat, setup=None):
+    """(first call seconds, fastest of `repeat` more, tracemalloc peak bytes of one more); setup() runs before the first"""
+    if setup is not None:
+        setup()
+    started = time.perf_counter()
+    call()
+    first = time.perf_counter() - started
+    best = first
+    for _ in range(repeat):
+        started = time.perf_counter()
+        call()
+        best = min(best, time.perf_counter() - started)
+    tracemalloc.start()
+    call()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return first, best, peak
+
+def run_size(repeat):
+    """Benchmark every target on the roast_log.csv in the current directory (child process)"""
+    import contextlib
+    import io
+
+    import roast
+    import roast_stats
+
+    session = roast.RoastSession("Colombian", False, "1", "Medium-Dark")
+    session.loading_temp, session.turnaround_temp = '210', '105'
+    session.fc_start_time, session.fc_start_temp = 440, '192'
+    session.fc_end_time, session.fc_end_temp = 520, '201'
+    session.sc_start_time, session.sc_start_temp = 690, '214'
+    session.end_time, session.end_temp = 760, '218'
+
+    group = {'origin': session.bean_origin, 'batch_size': session.batch_size, 'target_level': session.target_level}
+
+    def quiet(function, *args):
+        def call():
+            with contextlib.redirect_stdout(io.StringIO()):
+                function(*args)
+        return call
+
+    # (name, call, cold): cold targets start from an empty HISTORY, as in a new session process
+    targets = [
+        ('load_roasts', quiet(roast_stats.load_roasts), False),
+        ('get_all_phase_estimates', lambda: roast.get_all_phase_estimates(False), False),
+        ('prepare_estimates', lambda: roast.prepare_estimates(False, group), True),
+        ('similar_roast_estimates', lambda: roast.get_similar_roast_estimates(False, '210', '105'), True),
+        ('get_fc_midpoint_temp', lambda: roast.get_fc_midpoint_temp(False), False),
+        ('save_roast', lambda: roast.save_roast(session, '5', 'bench, run'), False),
+        ('view_recent_roasts', quiet(roast.view_recent_roasts, 5), False),
+    ]
+    results = {}
+    for name, call, cold in targets:
+        first, best, peak = _measure(call, repeat, roast.HISTORY.invalidate if cold else None)
+        results[name] = {'first_seconds': first, 'seconds': best, 'peak_bytes': peak}
+    return results
+
+def _best(runs):
+    """Per target, the smallest of each figure across several runs of one size"""
+    return {name: {key: min(run[name][key] for run in runs) for key in runs[0][name]} for name in runs[0]}
+
+def run(max_rows=DEFAULT_MAX_ROWS, repeat=REPEAT, cold_runs=COLD_RUNS):
+    """Results for every size 10^2 .. max_rows, each measured in `cold_runs` fresh processes on a fresh log"""
+    results = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'repeat': repeat,
+        'cold_runs': cold_runs,
+        'sizes': {},
+    }
+    rows = 100
+    while rows <= max_rows:
+        directory = tempfile.mkdtemp(prefix='roast_bench_')
+        try:
+            pristine = os.path.join(directory, 'pristine.csv')
+            build_log(pristine, rows)
+            runs = []
+            for i in range(cold_runs):
+                # A new directory each time, so no sidecar (aggregates, .idx) survives from the last run
+                work = os.path.join(directory, f'run{i}')
+                os.mkdir(work)
+                shutil.copyfile(pristine, os.path.join(work, 'roast_log.csv'))
+                output = subprocess.run([sys.executable, os.path.abspath(__file__), '_size', str(repeat)],
+                                        cwd=work, capture_output=True, text=True, check=True).stdout
+                runs.append(json.loads(output.splitlines()[-1]))
+            results['sizes'][str(rows)] = _best(runs)
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+        print(f"  {rows:>8} rows done", file=sys.stderr)
+        rows *= 10
+    return results
+
+def compare(results, baseline):
+    """Lines describing each target/size that regressed against the baseline (empty when none)"""
+    regressions = []
+    for size, targets in results['sizes'].items():
+        for name, now in targets.items():
+            before = baseline.get('sizes', {}).get(size, {}).get(name)
+            if before is None:
+                continue
+            # The first call is what a new session process pays, so it is held to the same limit as the warm one
+            for key, label, noise in (('first_seconds', 'first call ', FIRST_NOISE_SECONDS), ('seconds', '', NOISE_SECONDS)):
+                if now[key] > before[key] * (1 + TOLERANCE) and now[key] - before[key] > noise:
+                    regressions.append(f"{name} @ {size} rows: {label}{before[key] * 1000:.2f} -> {now[key] * 1000:.2f} ms")
+            if now['peak_bytes'] > before['peak_bytes'] * (1 + TOLERANCE):
+                regressions.append(f"{name} @ {size} rows: peak {before['peak_bytes'] / 1e6:.2f} -> "
+                                   f"{now['peak_bytes'] / 1e6:.2f} MB")
+    return regressions
+
+def print_results(results):
+    for size, targets in results['sizes'].items():
+        print(f"\n{size} rows:")
+        for name, r in targets.items():
+            print(f"  {name:25s} {r['seconds'] * 1000:10.2f} ms  (first {r['first_seconds'] * 1000:10.2f} ms)  "
+                  f"peak {r['peak_bytes'] / 1e6:8.2f} MB")
+
+if __name__ == "__main__":
+    if len(sys.argv) > 2 and sys.argv[1] == '_size':
+        print(json.dumps(run_size(int(sys.argv[2]))))
+    elif len(sys.argv) > 1 and sys.argv[1] in ('run', 'baseline'):
+        max_rows = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_MAX_ROWS
+        results = run(max_rows)
+        print_results(results)
+        target = BASELINE_FILE if sys.argv[1] == 'baseline' else RESULTS_FILE
+        with open(target, 'w') as f:
+            json.dump(results, f, indent=1)
+        print(f"\n✓ Results written to {target}")
+
+        if sys.argv[1] == 'run':
+            if not os.path.exists(BASELINE_FILE):
+                print(f"\n⚠ No {BASELINE_FILE} to compare against. Store one on the reference machine with:")
+                print(f"  python3 bench.py baseline {max_rows}")
+                sys.exit(1)
+            with open(BASELINE_FILE, 'r') as f:
+                regressions = compare(results, json.load(f))
+            if regressions:
+                print(f"\n⚠ {len(regressions)} regressions against {BASELINE_FILE}:")
+                for line in regressions:
+                    print(f"  {line}")
+                sys.exit(1)
+            print(f"✓ No regressions against {BASELINE_FILE}")
+    else:
+        print("Usage: python3 bench.py run|baseline [max_rows]")
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Binary columnar sidecar for roast_log.csv
+Keeps every numeric column pre-parsed in its own append-only file so tools can mmap typed values
+"""
+import json
+import math
+import mmap
+import os
+from array import array
+
+from roast_record import record_parser
+from log_tail import iter_records_forward, read_header, tail_check
+from roast_store import ROAST_LOG_FILE
+
+COLUMNS_SUFFIX = ".cols"  # Sidecar directory: roast_log.csv.cols/
+COLUMNS_VERSION = 1
+MISSING_TIME = -1  # Missing MM:SS values in int columns; missing floats are NaN
+
+def _time(field):
+    def extract(record):
+        seconds = getattr(record, field)
+        return MISSING_TIME if seconds is None else seconds
+    return extract
+
+def _float(field):
+    def extract(record):
+        value = getattr(record, field)
+        return math.nan if value is None else value
+    return extract
+
+def _date(record):
+    """YYYY-MM-DD as the integer YYYYMMDD"""
+    try:
+        return int(record.date.replace('-', ''))
+    except ValueError:
+        return MISSING_TIME
+
+def _minutes(time_str):
+    try:
+        hours, minutes = time_str.split(':')[:2]
+        return int(hours) * 60 + int(minutes)
+    except (AttributeError, ValueError):
+        return MISSING_TIME
+
+# name -> (array typecode, extractor from a RoastRecord, which already merged the V1 aliases)
+COLUMNS = {
+    'date': ('i', _date),
+    'clock': ('i', lambda record: _minutes(record.time)),
+    'decaf': ('b', lambda record: 1 if record.decaf else 0),
+    'rating': ('d', _float('rating')),
+    'loading_temp': ('d', _float('loading_temp')),
+    'turnaround_temp': ('d', _float('turnaround_temp')),
+    'fc_start_time': ('i', _time('fc_start_time')),
+    'fc_start_temp': ('d', _float('fc_start_temp')),
+    'fc_start_ror': ('d', _float('fc_start_ror')),
+    'fc_end_time': ('i', _time('fc_end_time')),
+    'fc_end_temp': ('d', _float('fc_end_temp')),
+    'fc_end_ror': ('d', _float('fc_end_ror')),
+    'sc_start_time': ('i', _time('sc_start_time')),
+    'sc_start_temp': ('d', _float('sc_start_temp')),
+    'sc_start_ror': ('d', _float('sc_start_ror')),
+    'end_time': ('i', _time('end_time')),
+    'end_temp': ('d', _float('end_temp')),
+}
+
+def is_missing(value):
+    """True for the missing-value marker of either column type"""
+    return value == MISSING_TIME or (isinstance(value, float) and math.isnan(value))
+
+class ColumnarLog:
+    """
+    Typed, memory-mapped columns for one CSV roast log.
+
+    The sidecar directory holds one raw array file per column plus a
+    meta.json recording how many rows and how many bytes of the CSV are
+    covered. refresh() parses only the bytes appended since then; the meta
+    file is replaced last, so a crash mid-update just leaves a few unused
+    bytes at the end of the column files.
+    """
+
+    def __init__(self, path=ROAST_LOG_FILE):
+        self.path = path
+        self.directory = path + COLUMNS_SUFFIX
+        self.rows = 0
+        self._maps = {}
+
+    def _meta_path(self):
+        return os.path.join(self.directory, 'meta.json')
+
+    def _column_path(self, name):
+        return os.path.join(self.directory, f"{name}.{COLUMNS[name][0]}")
+
+    def _load_meta(self):
+        try:
+            with open(self._meta_path(), 'r') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if meta.get('version') != COLUMNS_VERSION or sorted(meta.get('columns', [])) != sorted(COLUMNS):
+            return None
+        return meta
+
+    def _columns_cover(self, rows):
+        """True if every column file holds at least rows values"""
+        for name, (typecode, _) in COLUMNS.items():
+            try:
+                size = os.path.getsize(self._column_path(name))
+            except OSError:
+                return False
+            if size < rows * array(typecode).itemsize:
+                return False
+        return True
+
+    def refresh(self):
+        """Bring the sidecar up to date with the CSV and re-map the columns"""
+        self.close()
+        header, header_end = read_header(self.path)
+        os.makedirs(self.directory, exist_ok=True)
+
+        with open(self.path, 'rb') as f:
+            size = f.seek(0, os.SEEK_END)
+            meta = self._load_meta()
+            valid = (meta is not None
+                     and meta['source_size'] <= size
+                     and tail_check(f, meta['source_size']) == meta['check']
+                     and self._columns_cover(meta['rows']))
+            if valid and meta['source_size'] == size:
+                self.rows = meta['rows']
+                self._map_columns()
+                return self
+
+            start = meta['source_size'] if valid else header_end
+            rows = meta['rows'] if valid else 0
+            new_values = {name: array(typecode) for name, (typecode, _) in COLUMNS.items()}
+            parse = record_parser(tuple(header))
+            for _, fields in iter_records_forward(f, start, size):
+                record = parse(fields)
+                for name, (_, extract) in COLUMNS.items():
+                    new_values[name].append(extract(record))
+                rows += 1
+            check = tail_check(f, size)
+
+        for name, values in new_values.items():
+            with open(self._column_path(name), 'r+b' if valid else 'wb') as col:
+                col.truncate((rows - len(values)) * values.itemsize)
+                col.seek(0, os.SEEK_END)
+                values.tofile(col)
+
+        meta = {
+            'version': COLUMNS_VERSION,
+            'columns': list(COLUMNS),
+            'rows': rows,
+            'source_size': size,
+            'check': check,
+        }
+        tmp_path = self._meta_path() + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self._meta_path())
+
+        self.rows = rows
+        self._map_columns()
+        return self
+
+    def _map_columns(self):
+        for name, (typecode, _) in COLUMNS.items():
+            if self.rows == 0:
+                self._maps[name] = (None, memoryview(array(typecode)))
+                continue
+            with open(self._column_path(name), 'rb') as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            nbytes = self.rows * array(typecode).itemsize
+            self._maps[name] = (mapped, memoryview(mapped)[:nbytes].cast(typecode))
+
+    def column(self, name):
+        """Read-only typed view of one column (memoryview over the mmap)"""
+        return self._maps[name][1]
+
+    def __len__(self):
+        return self.rows
+
+    def close(self):
+        for mapped, view in self._maps.values():
+            view.release()
+            if mapped is not None:
+                mapped.close()
+        self._maps = {}
+
+def open_columns(path=ROAST_LOG_FILE):
+    """Open (building or extending as needed) the columnar sidecar for a CSV log"""
+    if not os.path.exists(path):
+        return None
+    return ColumnarLog(path).refresh()
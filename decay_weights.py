@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Recency-weighted phase estimates
+Weight = quality weight x 2^(-age / half-life), with prefix sums so any window or age limit is a constant-time query
+
+Compare windows and half-lives from one read of the log:
+    python3 decay_weights.py [half_life_days ...]
+"""
+import math
+import sys
+from array import array
+from bisect import bisect_left
+from datetime import date as Date
+
+from phase_estimator import IDEAL_RATING, PHASE_FIELDS, phase_value, quality_weight, stats_from_sums
+
+REBASE_EXPONENT = 300.0  # Re-scale prefix sums well before squared weights (e^600) near float overflow
+
+def roast_day(record):
+    """Roast date and time as a day number (days since 0001-01-01, fractional), or None"""
+    try:
+        day = Date.fromisoformat(record.date).toordinal()
+    except ValueError:
+        return None
+    try:
+        hours, minutes = record.time.split(':')
+        return day + (int(hours) * 60 + int(minutes)) / 1440.0
+    except ValueError:
+        return float(day)
+
+class WeightedSeries:
+    """
+    Prefix sums of weighted phase values for one group of roasts, oldest first.
+
+    Roast i gets weight q_i * 2^((t_i - t_ref) / half_life). The common
+    factor 2^(-t_ref / half_life) cancels in a weighted mean, so the prefix
+    sums never need updating as time passes; t_ref only moves (an O(n)
+    re-scale) if new roasts push the exponent near float overflow. With no
+    half-life every decay factor is 1 and only the quality weight is used.
+
+    After building in O(n), the last-n-roasts query is O(phases) and the
+    last-n-days query adds a bisect, O(log n). A roast over ~1000
+    half-lives older than the ones after it falls below float range and
+    counts as weight 0.
+    """
+
+    def __init__(self, records=(), half_life_days=None, ideal=IDEAL_RATING):
+        self.half_life_days = half_life_days
+        self.rate = math.log(2) / half_life_days if half_life_days else 0.0
+        self.ideal = ideal
+        self.days = []  # Non-decreasing roast day numbers
+        self.t_ref = None
+        self.weight_sums = [array('d', [0.0]) for _ in PHASE_FIELDS]
+        self.value_sums = [array('d', [0.0]) for _ in PHASE_FIELDS]
+        self.square_sums = [array('d', [0.0]) for _ in PHASE_FIELDS]  # w * v^2
+        self.weight_square_sums = [array('d', [0.0]) for _ in PHASE_FIELDS]  # w^2
+        for record in records:
+            self.append(record)
+
+    def __len__(self):
+        return len(self.days)
+
+    def _rebase(self, t_ref):
+        scale = math.exp(-self.rate * (t_ref - self.t_ref))
+        for sums in self.weight_sums + self.value_sums + self.square_sums:
+            for i in range(len(sums)):
+                sums[i] *= scale
+        for sums in self.weight_square_sums:
+            for i in range(len(sums)):
+                sums[i] *= scale * scale
+        self.t_ref = t_ref
+
+    def append(self, record):
+        """Add the next (newest) roast"""
+        day = roast_day(record)
+        if self.days and (day is None or day < self.days[-1]):
+            day = self.days[-1]  # Undated or out-of-order rows count as the previous roast's time
+        elif day is None:
+            day = 0.0
+        self.days.append(day)
+        if self.t_ref is None:
+            self.t_ref = day
+        elif self.rate * (day - self.t_ref) > REBASE_EXPONENT:
+            self._rebase(day)
+
+        weight = quality_weight(record.rating, self.ideal) * math.exp(self.rate * (day - self.t_ref))
+        for k, field in enumerate(PHASE_FIELDS):
+            value = phase_value(record, field) if weight > 0 else None
+            w, v = (weight, value) if value is not None else (0.0, 0.0)
+            self.weight_sums[k].append(self.weight_sums[k][-1] + w)
+            self.value_sums[k].append(self.value_sums[k][-1] + v * w)
+            self.square_sums[k].append(self.square_sums[k][-1] + v * v * w)
+            self.weight_square_sums[k].append(self.weight_square_sums[k][-1] + w * w)
+
+    def _stats_from(self, start):
+        stats = {}
+        for k, field in enumerate(PHASE_FIELDS):
+            stats[field] = stats_from_sums(*(sums[-1] - sums[start] for sums in (
+                self.weight_sums[k], self.value_sums[k], self.square_sums[k], self.weight_square_sums[k])))
+        return stats
+
+    def _means_from(self, start):
+        means = {}
+        for k, field in enumerate(PHASE_FIELDS):
+            total = self.weight_sums[k][-1] - self.weight_sums[k][start]
+            means[field] = (self.value_sums[k][-1] - self.value_sums[k][start]) / total if total > 0 else None
+        return means
+
+    def last_n_stats(self, n):
+        """PhaseStats of every phase over the last n roasts"""
+        return self._stats_from(max(0, len(self.days) - n))
+
+    def last_n_means(self, n):
+        """Weighted mean of every phase over the last n roasts"""
+        return self._means_from(max(0, len(self.days) - n))
+
+    def last_days_means(self, days):
+        """Weighted mean of every phase over roasts within `days` of the newest one"""
+        if not self.days:
+            return self._means_from(0)
+        return self._means_from(bisect_left(self.days, self.days[-1] - days))
+
+class WeightingEngine:
+    """
+    WeightedSeries per (decaf group, half-life) over one list of RoastRecords.
+
+    Each series is built on first use and then kept, so trying several
+    windows for the same half-life reads nothing again. append() extends
+    every series already built.
+    """
+
+    def __init__(self, records, ideal=IDEAL_RATING):
+        self.records = list(records)
+        self.ideal = ideal
+        self._series = {}
+
+    def series(self, is_decaf, half_life_days=None):
+        key = (is_decaf, half_life_days or None)
+        if key not in self._series:
+            group = [r for r in self.records if r.decaf == is_decaf]
+            self._series[key] = WeightedSeries(group, half_life_days, self.ideal)
+        return self._series[key]
+
+    def means(self, is_decaf, window=5, half_life_days=None):
+        """Weighted phase means over the last `window` roasts of a group"""
+        return self.series(is_decaf, half_life_days).last_n_means(window)
+
+    def stats(self, is_decaf, window=5, half_life_days=None):
+        """PhaseStats per phase over the last `window` roasts of a group"""
+        return self.series(is_decaf, half_life_days).last_n_stats(window)
+
+    def means_within(self, is_decaf, days, half_life_days=None):
+        """Weighted phase means over a group's roasts from the last `days` days"""
+        return self.series(is_decaf, half_life_days).last_days_means(days)
+
+    def append(self, record):
+        self.records.append(record)
+        for (is_decaf, _), series in self._series.items():
+            if record.decaf == is_decaf:
+                series.append(record)
+
+if __name__ == "__main__":
+    from history_cache import HistoryCache
+    from roast_store import open_store
+
+    half_lives = [float(h) for h in sys.argv[1:]] or [7.0, 30.0, 90.0]
+    engine = WeightingEngine(HistoryCache(open_store()).records())
+    windows = (3, 5, 10, 20)
+
+    for is_decaf in (True, False):
+        print(f"\n{'DECAF' if is_decaf else 'REGULAR'} - FC start estimate by window (roasts) and half-life (days)")
+        print(f"  {'half-life':>10}" + ''.join(f"{w:>8}" for w in windows))
+        for half_life in [None] + half_lives:
+            cells = []
+            for w in windows:
+                fc = engine.means(is_decaf, w, half_life)['fc_start_time']
+                cells.append('-' if fc is None else f"{int(fc // 60):02d}:{int(fc % 60):02d}")
+            label = 'none' if half_life is None else f"{half_life:g}"
+            print(f"  {label:>10}" + ''.join(f"{c:>8}" for c in cells))
@@ -6,6 +6,9 @@ import csv
 import os
 import shutil
 
+from log_archive import iter_log_lines
+from log_writer import LogWriter
+
 OLD_LOG_FILE = "old_roast_log.csv"
 NEW_LOG_FILE = "roast_log.csv"
 BACKUP_FILE = "roast_log_before_migration.csv"
@@ -14,56 +17,55 @@ def parse_and_fix_old_csv():
     """Parse the old CSV with custom logic to fix misalignment"""
     print(f"Reading and fixing {OLD_LOG_FILE}...")
 
-    with open(OLD_LOG_FILE, 'r') as f:
-        reader = csv.reader(f)
-        header = next(reader)  # Skip header
-
-        fixed_rows = []
-
-        for i, fields in enumerate(reader, start=2):
-            if not any(fields[:5]):  # Skip empty rows
-                continue
-
-            # The old CSV has 18 header columns but 20 data fields (2 trailing empties)
-            # And the data is shifted starting at column 10 (End Time)
-
-            # Based on analysis:
-            # fields[12] = End Time (labeled as "Drop Temp" in header)
-            # fields[13] = End Temp (labeled as "Total Roast Time" in header)
-            # fields[15] = Total Roast Time in minutes (labeled as "Actual Color")
-            # fields[16] = Target Roast Level (labeled as "Notes")
-            # fields[17] = Notes (labeled as "Tasting Notes")
-
-            fixed_row = {
-                'Date': fields[0],
-                'Time': fields[1],
-                'Bean Origin': fields[2],
-                'Decaf': fields[3],
-                'Batch Size (lbs)': fields[4],
-                'Yellow Time': fields[5],
-                'First Crack Time': fields[6],
-                'First Crack Temp': fields[7],
-                'Second Crack Time': fields[8],
-                'Second Crack Temp': fields[9],
-                'End Time': fields[12] if len(fields) > 12 else '',  # Shifted from Drop Temp
-                'End Temp': fields[13] if len(fields) > 13 else '',  # Shifted from Total Roast Time
-                'Drop Temp': '',  # Actually empty
-                'Total Roast Time (min)': fields[15] if len(fields) > 15 else '',  # Shifted from Actual Color
-                'Target Roast Level': fields[16] if len(fields) > 16 else '',  # Shifted from Notes
-                'Actual Color': '',  # Actually empty
-                'Notes': fields[17] if len(fields) > 17 else '',  # Shifted from Tasting Notes
-                'Tasting Notes (added later)': ''  # Actually empty
-            }
-
-            print(f"\nRow {i}: {fixed_row['Date']} - {fixed_row['Decaf']}")
-            print(f"  FC: {fixed_row['First Crack Time']} @ {fixed_row['First Crack Temp']}°C")
-            print(f"  SC: {fixed_row['Second Crack Time']} @ {fixed_row['Second Crack Temp']}°C")
-            print(f"  End: {fixed_row['End Time']} @ {fixed_row['End Temp']}°C")
-            print(f"  Total: {fixed_row['Total Roast Time (min)']} min")
-            print(f"  Level: {fixed_row['Target Roast Level']}")
-            print(f"  Notes: {fixed_row['Notes']}")
-
-            fixed_rows.append(fixed_row)
+    reader = csv.reader(iter_log_lines(OLD_LOG_FILE))  # Archived rows first, then the live file
+    header = next(reader)  # Skip header
+
+    fixed_rows = []
+
+    for i, fields in enumerate(reader, start=2):
+        if not any(fields[:5]):  # Skip empty rows
+            continue
+
+        # The old CSV has 18 header columns but 20 data fields (2 trailing empties)
+        # And the data is shifted starting at column 10 (End Time)
+
+        # Based on analysis:
+        # fields[12] = End Time (labeled as "Drop Temp" in header)
+        # fields[13] = End Temp (labeled as "Total Roast Time" in header)
+        # fields[15] = Total Roast Time in minutes (labeled as "Actual Color")
+        # fields[16] = Target Roast Level (labeled as "Notes")
+        # fields[17] = Notes (labeled as "Tasting Notes")
+
+        fixed_row = {
+            'Date': fields[0],
+            'Time': fields[1],
+            'Bean Origin': fields[2],
+            'Decaf': fields[3],
+            'Batch Size (lbs)': fields[4],
+            'Yellow Time': fields[5],
+            'First Crack Time': fields[6],
+            'First Crack Temp': fields[7],
+            'Second Crack Time': fields[8],
+            'Second Crack Temp': fields[9],
+            'End Time': fields[12] if len(fields) > 12 else '',  # Shifted from Drop Temp
+            'End Temp': fields[13] if len(fields) > 13 else '',  # Shifted from Total Roast Time
+            'Drop Temp': '',  # Actually empty
+            'Total Roast Time (min)': fields[15] if len(fields) > 15 else '',  # Shifted from Actual Color
+            'Target Roast Level': fields[16] if len(fields) > 16 else '',  # Shifted from Notes
+            'Actual Color': '',  # Actually empty
+            'Notes': fields[17] if len(fields) > 17 else '',  # Shifted from Tasting Notes
+            'Tasting Notes (added later)': ''  # Actually empty
+        }
+
+        print(f"\nRow {i}: {fixed_row['Date']} - {fixed_row['Decaf']}")
+        print(f"  FC: {fixed_row['First Crack Time']} @ {fixed_row['First Crack Temp']}°C")
+        print(f"  SC: {fixed_row['Second Crack Time']} @ {fixed_row['Second Crack Temp']}°C")
+        print(f"  End: {fixed_row['End Time']} @ {fixed_row['End Temp']}°C")
+        print(f"  Total: {fixed_row['Total Roast Time (min)']} min")
+        print(f"  Level: {fixed_row['Target Roast Level']}")
+        print(f"  Notes: {fixed_row['Notes']}")
+
+        fixed_rows.append(fixed_row)
 
     return fixed_rows
 
@@ -118,11 +120,10 @@ def append_to_new_log(new_rows):
         shutil.copy2(NEW_LOG_FILE, BACKUP_FILE)
         print(f"\nBackup created: {BACKUP_FILE}")
 
-    # Append to new log
-    with open(NEW_LOG_FILE, 'a', newline='') as f:
-        writer = csv.writer(f)
-        for row in new_rows:
-            writer.writerow(row)
+    # Append to new log in one group commit: if it fails or the process dies part way, none of the rows stay
+    writer = LogWriter(NEW_LOG_FILE)
+    writer.recover()
+    writer.append_many(new_rows)
 
     print(f"\n✓ Appended {len(new_rows)} rows to {NEW_LOG_FILE}")
 
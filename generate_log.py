@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Synthetic roast log generator for load and scale testing
+Streams phase-consistent V1 or V2 rows: FC start < FC end < SC start < drop, temps rising through the roast,
+decaf roasting faster and cooler than regular, ratings, and quoted notes with commas and line breaks
+
+    python3 generate_log.py ROWS [out.csv|-] [v1|v2] [seed]
+
+The same seed always gives the same log. Rows are written as they are generated, so millions of rows
+need no more memory than one.
+"""
+import csv
+import random
+import sys
+
+from roast_record import format_mmss
+from roast_store import LOG_COLUMNS
+
+V1_COLUMNS = [
+    'Date', 'Time', 'Bean Origin', 'Decaf', 'Batch Size (lbs)', 'Yellow Time',
+    'First Crack Time', 'First Crack Temp', 'Second Crack Time', 'Second Crack Temp',
+    'End Time', 'End Temp', 'Drop Temp', 'Total Roast Time (min)', 'Target Roast Level',
+    'Actual Color', 'Notes', 'Tasting Notes (added later)',
+]
+
+DEFAULT_SEED = 1
+ORIGINS = ('Colombian', 'Colombian', 'Colombian', 'Ethiopian', 'Brazil', 'Guatemala', 'Kenya', 'Sumatra')
+TARGET_LEVELS = ('Medium-Dark', 'Medium-Dark', 'Medium', 'Dark')
+BATCH_SIZES = ('1', '1', '1', '0.5', '1.5')
+NOTES = (
+    '', '', '', 'smooth', 'bit slow on the tagging', 'good color (not too black), slight oil',
+    'windy, ambient 12C', 'A bit too dark and shiny', 'fan 90, power 30 at midpoint',
+    'uneven, some tipping\nturned fan up', 'loaded at 200, "quiet" first crack',
+)
+TASTING = ('', '', '', '', 'chocolate, low acid', 'bright, citrus', 'flat')
+
+# Per type: (mean, sd) of each phase; times in seconds from load, temps in °C
+PROFILES = {
+    True: {  # Decaf: earlier, cooler first crack
+        'loading_temp': (200, 3), 'turnaround_temp': (98, 4), 'turnaround_time': (60, 5),
+        'fc_start_time': (450, 25), 'fc_start_temp': (186, 2.5),
+        'fc_length': (75, 12), 'fc_rise': (12, 2),
+        'to_sc': (160, 25), 'sc_rise': (14, 2.5),
+        'development': (70, 15), 'end_rise': (4, 1.5),
+    },
+    False: {
+        'loading_temp': (215, 3), 'turnaround_temp': (106, 4), 'turnaround_time': (62, 5),
+        'fc_start_time': (500, 30), 'fc_start_temp': (193, 2.5),
+        'fc_length': (80, 12), 'fc_rise': (13, 2),
+        'to_sc': (150, 25), 'sc_rise': (14, 2.5),
+        'development': (60, 15), 'end_rise': (5, 1.5),
+    },
+}
+
+def _draw(rng, profile, name, minimum=1.0):
+    mean, sd = profile[name]
+    return max(minimum, rng.gauss(mean, sd))
+
+def generate_roasts(count, seed=DEFAULT_SEED, start_year=2020):
+    """
+    Yield `count` V2 row dicts, oldest first.
+
+    Loading temp shifts the whole roast (a hotter charge reaches first crack
+    sooner), and every later phase is an increment on the one before, so
+    the order of times and temps always holds. Some roasts leave out the
+    optional fields, as real logs do.
+    """
+    rng = random.Random(seed)
+    day, minute = 0, 9 * 60
+    for _ in range(count):
+        minute += int(rng.uniform(14, 40))  # Back-to-back roasts, several per session
+        if minute > 18 * 60 or rng.random() < 0.15:
+            day += rng.choice((1, 1, 2, 3, 7))
+            minute = 9 * 60 + int(rng.uniform(0, 120))
+        year, day_of_year = start_year + day // 336, day % 336
+        date = f"{year:04d}-{1 + day_of_year // 28:02d}-{1 + day_of_year % 28:02d}"
+
+        is_decaf = rng.random() < 0.4
+        p = PROFILES[is_decaf]
+        loading = _draw(rng, p, 'loading_temp')
+        charge = loading - p['loading_temp'][0]
+        turnaround = _draw(rng, p, 'turnaround_temp') + 0.3 * charge
+        fc_start = _draw(rng, p, 'fc_start_time', 300) - 2.0 * charge
+        fc_start_temp = _draw(rng, p, 'fc_start_temp') + 0.1 * charge
+        fc_end = fc_start + _draw(rng, p, 'fc_length', 20)
+        fc_end_temp = fc_start_temp + _draw(rng, p, 'fc_rise')
+        sc_start = fc_end + _draw(rng, p, 'to_sc', 30)
+        sc_start_temp = fc_end_temp + _draw(rng, p, 'sc_rise')
+        end = sc_start + _draw(rng, p, 'development', 10)
+        end_temp = sc_start_temp + _draw(rng, p, 'end_rise')
+
+        # Ratings: closer to 5 when development was near the profile's typical length
+        off = abs(end - sc_start - p['development'][0]) / p['development'][1]
+        rating = min(10, max(1, round(rng.gauss(5 + off * rng.choice((-1, 1)), 1.2))))
+        early = rng.random() < 0.3  # Older-style rows without the V2-only extras
+
+        yield {
+            'Date': date,
+            'Time': f"{minute // 60:02d}:{minute % 60:02d}",
+            'Bean Origin': rng.choice(ORIGINS),
+            'Decaf': 'Yes' if is_decaf else 'No',
+            'Batch Size (lbs)': rng.choice(BATCH_SIZES),
+            'Loading Temp': '' if early else f"{loading:.0f}",
+            'Turnaround Temp': '' if early else f"{turnaround:.0f}",
+            'Early Notes': rng.choice(NOTES) if rng.random() < 0.2 else '',
+            'Yellow Time': format_mmss(fc_start * 0.6) if rng.random() < 0.3 else '',
+            'First Crack Start Time': format_mmss(fc_start),
+            'First Crack Start Temp': f"{fc_start_temp:.0f}",
+            'FC Start ROR': '' if early else f"{rng.uniform(10, 16):.0f}",
+            'First Crack End Time': '' if early else format_mmss(fc_end),
+            'First Crack End Temp': '' if early else f"{fc_end_temp:.0f}",
+            'FC End ROR': '' if early else f"{rng.uniform(6, 10):.0f}",
+            'Second Crack Start Time': format_mmss(sc_start),
+            'Second Crack Start Temp': f"{sc_start_temp:.0f}",
+            'SC Start ROR': '' if early else f"{rng.uniform(3, 6):.0f}",
+            'End Time': format_mmss(end),
+            'End Temp': f"{end_temp:.0f}",
+            'Drop Temp': '',
+            'Total Roast Time (min)': f"{end / 60:.1f}",
+            'Target Roast Level': rng.choice(TARGET_LEVELS),
+            'Roast Level (1-10)': '' if rng.random() < 0.1 else str(rating),
+            'Notes': rng.choice(NOTES),
+            'Tasting Notes (added later)': rng.choice(TASTING),
+        }
+
+def to_v1(row):
+    """The same roast in the V1 layout (start times/temps only, no ROR, loading or rating)"""
+    return {
+        'Date': row['Date'], 'Time': row['Time'], 'Bean Origin': row['Bean Origin'],
+        'Decaf': row['Decaf'], 'Batch Size (lbs)': row['Batch Size (lbs)'], 'Yellow Time': row['Yellow Time'],
+        'First Crack Time': row['First Crack Start Time'], 'First Crack Temp': row['First Crack Start Temp'],
+        'Second Crack Time': row['Second Crack Start Time'], 'Second Crack Temp': row['Second Crack Start Temp'],
+        'End Time': row['End Time'], 'End Temp': row['End Temp'], 'Drop Temp': row['Drop Temp'],
+        'Total Roast Time (min)': row['Total Roast Time (min)'], 'Target Roast Level': row['Target Roast Level'],
+        'Actual Color': '', 'Notes': row['Notes'], 'Tasting Notes (added later)': row['Tasting Notes (added later)'],
+    }
+
+def write_log(f, count, version='v2', seed=DEFAULT_SEED):
+    """Stream a header and `count` generated roasts to an open text file (CRLF rows, like the real log)"""
+    columns = V1_COLUMNS if version == 'v1' else LOG_COLUMNS
+    writer = csv.DictWriter(f, fieldnames=columns)
+    writer.writeheader()
+    for row in generate_roasts(count, seed):
+        writer.writerow(to_v1(row) if version == 'v1' else row)
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python3 generate_log.py ROWS [out.csv|-] [v1|v2] [seed]")
+        sys.exit(1)
+    count = int(sys.argv[1])
+    path = sys.argv[2] if len(sys.argv) > 2 else '-'
+    version = sys.argv[3] if len(sys.argv) > 3 else 'v2'
+    seed = int(sys.argv[4]) if len(sys.argv) > 4 else DEFAULT_SEED
+    if version not in ('v1', 'v2'):
+        print(f"Unknown layout '{version}' (expected v1 or v2)")
+        sys.exit(1)
+
+    if path == '-':
+        sys.stdout.reconfigure(newline='')
+        write_log(sys.stdout, count, version, seed)
+    else:
+        with open(path, 'w', newline='') as f:
+            write_log(f, count, version, seed)
+        print(f"✓ Wrote {count} {version.upper()} roasts to {path} (seed {seed})", file=sys.stderr)
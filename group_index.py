@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Hash index of roast history by any combination of grouping columns
+Buckets hold row positions per (decaf, origin, batch size, target level) combination, so finding a group's
+recent roasts is one dict lookup; sparse groups fall back to coarser ones
+
+List the groups for some columns (default: all of them):
+    python3 group_index.py [decaf] [origin] [batch_size] [target_level]
+"""
+import sys
+
+GROUP_FIELDS = ('decaf', 'origin', 'batch_size', 'target_level')  # RoastRecord fields estimates can group by
+MIN_GROUP_ROASTS = 3  # Fewer roasts than this and a group falls back to the next coarser one
+
+# Finest to coarsest; each level only uses the fields a query actually gives
+FALLBACK_LEVELS = (
+    ('decaf', 'origin', 'batch_size', 'target_level'),
+    ('decaf', 'origin', 'batch_size'),
+    ('decaf', 'origin'),
+    ('decaf',),
+)
+
+def group_value(field, value):
+    """Bucket key for one field: decaf as a bool, text case- and space-insensitive"""
+    if field == 'decaf':
+        return bool(value)
+    return (value or '').strip().lower()
+
+class GroupIndex:
+    """
+    Row positions of a list of RoastRecords, bucketed per combination of GROUP_FIELDS.
+
+    The buckets for a combination are built in one pass the first time it
+    is queried and kept; append() extends every combination built so far.
+    Positions within a bucket are in log order, so a group's last n roasts
+    are its last n positions.
+    """
+
+    def __init__(self, records):
+        self.records = records
+        self._buckets = {}  # fields tuple -> {values tuple: [positions]}
+
+    def _key(self, fields, record):
+        return tuple(group_value(field, getattr(record, field)) for field in fields)
+
+    def buckets(self, fields):
+        """{values: positions} for one combination of fields, in GROUP_FIELDS order"""
+        if fields not in self._buckets:
+            buckets = {}
+            for position, record in enumerate(self.records):
+                buckets.setdefault(self._key(fields, record), []).append(position)
+            self._buckets[fields] = buckets
+        return self._buckets[fields]
+
+    def positions(self, **query):
+        """Positions of the roasts matching every given field (e.g. decaf=True, origin='Colombian')"""
+        fields = tuple(field for field in GROUP_FIELDS if field in query)
+        values = tuple(group_value(field, query[field]) for field in fields)
+        return self.buckets(fields).get(values, [])
+
+    def recent(self, n, **query):
+        """The last n matching roasts, oldest first"""
+        positions = self.positions(**query)[-n:] if n > 0 else []
+        return [self.records[i] for i in positions]
+
+    def resolve(self, n, min_roasts=MIN_GROUP_ROASTS, **query):
+        """
+        (fields, roasts): the last n roasts of the finest group with at least min_roasts.
+
+        Walks FALLBACK_LEVELS, skipping levels that need a field the query
+        doesn't give. The coarsest usable level is returned even when sparse.
+        """
+        levels = [level for level in FALLBACK_LEVELS if all(field in query for field in level)]
+        if not levels:
+            levels = [tuple(field for field in GROUP_FIELDS if field in query)]
+        for fields in levels:
+            roasts = self.recent(n, **{field: query[field] for field in fields})
+            if len(roasts) >= min(n, min_roasts):
+                return fields, roasts
+        return fields, roasts
+
+    def append(self, record):
+        """Index a roast already appended to self.records"""
+        position = len(self.records) - 1
+        for fields, buckets in self._buckets.items():
+            buckets.setdefault(self._key(fields, record), []).append(position)
+
+if __name__ == "__main__":
+    from history_cache import HistoryCache
+    from phase_estimator import phase_means
+    from roast_record import format_mmss
+    from roast_store import open_store
+
+    fields = tuple(field for field in GROUP_FIELDS if field in sys.argv[1:]) or GROUP_FIELDS
+    index = HistoryCache(open_store()).groups()
+    print(f"Groups by {', '.join(fields)}:")
+    for values, positions in sorted(index.buckets(fields).items(), key=lambda item: -len(item[1])):
+        fc = phase_means([index.records[i] for i in positions[-5:]])['fc_start_time']
+        label = ' / '.join(('decaf' if v else 'regular') if f == 'decaf' else (v or '-') for f, v in zip(fields, values))
+        print(f"  {label:45s} {len(positions):5d} roasts, FC start {format_mmss(fc) or '-'}")
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+In-process cache of parsed roast history
+Parses each roast once into a RoastRecord so every estimator in a session shares the work
+"""
+import os
+
+from decay_weights import WeightingEngine
+from group_index import GroupIndex
+from similar_roasts import SimilarRoastIndex
+from roast_record import RoastRecord
+
+class HistoryCache:
+    """
+    Parsed roast history for one RoastStore.
+
+    Results are kept until the store's file changes size or mtime. Roasts
+    saved through append() are added to the cached lists in place, so the
+    session that saved them doesn't have to re-read the log.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self._signature = None
+        self._records = None  # Every roast, loaded on first call to records()
+        self._windows = {}  # (is_decaf, n) -> last n roasts of that group
+        self._engine = None  # Prefix-sum weighting over records(), built on first call to weights()
+        self._groups = None  # Hash index of records() by grouping columns, built on first call to groups()
+        self._recent_groups = {}  # (is_decaf, n) -> hash index of that group's last n roasts
+        self._similar = {}  # (is_decaf, n) -> KD tree of that group (its last n roasts) by loading/turnaround temp
+
+    def _stat(self):
+        try:
+            st = os.stat(self.store.path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def invalidate(self):
+        """Drop everything parsed so far"""
+        self._signature = None
+        self._records = None
+        self._windows = {}
+        self._engine = None
+        self._groups = None
+        self._recent_groups = {}
+        self._similar = {}
+
+    def _check(self):
+        """Invalidate if the log changed behind our back"""
+        signature = self._stat()
+        if signature != self._signature:
+            self.invalidate()
+            self._signature = signature
+
+    def records(self):
+        """Every roast in the store, parsed, oldest first"""
+        self._check()
+        if self._records is None:
+            self._records = [RoastRecord.from_row(r) for r in self.store.load_all()]
+        return self._records
+
+    def recent(self, is_decaf, n):
+        """The last n parsed roasts of one group (decaf/regular), oldest first"""
+        self._check()
+        key = (is_decaf, n)
+        if key not in self._windows:
+            if self._records is not None:
+                group = [r for r in self._records if r.decaf == is_decaf]
+                self._windows[key] = group[-n:] if n > 0 else []
+            else:
+                self._windows[key] = [RoastRecord.from_row(r) for r in self.store.last_n(n, is_decaf=is_decaf)]
+        return self._windows[key]
+
+    def weights(self):
+        """WeightingEngine over every parsed roast (recency-decayed, any window size)"""
+        records = self.records()
+        if self._engine is None:
+            self._engine = WeightingEngine(records)
+        return self._engine
+
+    def groups(self):
+        """GroupIndex over every parsed roast (by decaf, origin, batch size, target level)"""
+        records = self.records()
+        if self._groups is None:
+            self._groups = GroupIndex(records)
+        return self._groups
+
+    def recent_groups(self, is_decaf, n):
+        """
+        GroupIndex over the last n roasts of one type (decaf/regular).
+
+        Sessions find their origin/batch/target group here, so they only
+        read the end of the log; groups() indexes the whole history.
+        """
+        self._check()
+        key = (is_decaf, n)
+        if key not in self._recent_groups:
+            self._recent_groups[key] = GroupIndex(list(self.recent(is_decaf, n)))
+        return self._recent_groups[key]
+
+    def similar(self, is_decaf, n=None):
+        """SimilarRoastIndex of one group's rated roasts, or of its last n roasts (nearest by loading/turnaround temp)"""
+        self._check()
+        key = (is_decaf, n)
+        if key not in self._similar:
+            if n is None:
+                records = (r for r in self.records() if r.decaf == is_decaf)
+            else:
+                records = self.recent(is_decaf, n)
+            self._similar[key] = SimilarRoastIndex(records)
+        return self._similar[key]
+
+    def append(self, row):
+        """Save a roast through the store and fold it into the cache"""
+        was_current = self._stat() == self._signature
+        self.store.append(row)
+        if not was_current:
+            self.invalidate()
+            return
+
+        record = RoastRecord.from_row(row)
+        if self._records is not None:
+            self._records.append(record)
+        if self._engine is not None:
+            self._engine.append(record)
+        if self._groups is not None:
+            self._groups.append(record)
+        # Rebuilt on next use: KD tree scales change, and recent indexes hold positions into a sliding window
+        self._similar = {key: index for key, index in self._similar.items() if key[0] != record.decaf}
+        self._recent_groups = {key: index for key, index in self._recent_groups.items() if key[0] != record.decaf}
+        for (is_decaf, n), window in self._windows.items():
+            if record.decaf == is_decaf and n > 0:
+                window.append(record)
+                del window[:-n]
+        self._signature = self._stat()
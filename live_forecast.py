@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Live re-forecast of the remaining roast phases
+At each control point (FC start, FC end, SC start) the later phases are predicted from the time and temp
+just entered, using per-pair coefficients fitted once when the session starts
+
+Show the coefficients for a group:
+    python3 live_forecast.py [decaf]
+"""
+import sys
+
+from phase_estimator import phase_value, quality_weight
+
+MARKS = ('fc_start', 'fc_end', 'sc_start', 'end')  # Control points in roast order; fields are <mark>_time / <mark>_temp
+FORECAST_ROASTS = 20  # Recent roasts of the group used to fit the coefficients
+PRIOR_ROASTS = 3.0  # Slopes are shrunk toward 1 (a pure shift) as if this many extra roasts had slope 1
+
+def fit_shift(samples):
+    """
+    (x_mean, y_mean, slope) for y ~ x from (weight, x, y) samples, or None.
+
+    A quality-weighted least-squares slope, clamped to [0, 2] and blended
+    with slope 1 by effective sample size: with a handful of roasts a mark
+    that comes 40 s early moves the later phases about 40 s too, and the
+    fitted slope takes over as history grows.
+    """
+    samples = [(w, x, y) for w, x, y in samples if w > 0 and x is not None and y is not None]
+    total = sum(w for w, _, _ in samples)
+    if total <= 0:
+        return None
+    x_mean = sum(w * x for w, x, _ in samples) / total
+    y_mean = sum(w * y for w, _, y in samples) / total
+    sxx = sum(w * (x - x_mean) ** 2 for w, x, _ in samples)
+    sxy = sum(w * (x - x_mean) * (y - y_mean) for w, x, y in samples)
+    ess = total * total / sum(w * w for w, _, _ in samples)
+    fitted = min(2.0, max(0.0, sxy / sxx)) if sxx > 0 else 1.0
+    slope = (ess * fitted + PRIOR_ROASTS) / (ess + PRIOR_ROASTS)
+    return x_mean, y_mean, slope
+
+class PhaseForecaster:
+    """
+    Coefficients for forecasting every later phase from each control point.
+
+    Built once per session from the group's recent roasts. Each later time
+    is predicted from the mark's time and each later temp from its temp;
+    only the latest mark is used, as it already reflects everything before
+    it. forecast() is a handful of multiply-adds, so it costs nothing
+    between the ENTER and the next prompt.
+    """
+
+    def __init__(self, records):
+        rated = [(quality_weight(r.rating), r) for r in records]
+        self.coefficients = {mark: [] for mark in MARKS}  # mark -> [(field, kind, x_mean, y_mean, slope)]
+        for i, mark in enumerate(MARKS):
+            for later in MARKS[i + 1:]:
+                for kind in ('time', 'temp'):
+                    field = f'{later}_{kind}'
+                    fit = fit_shift((w, phase_value(r, f'{mark}_{kind}'), phase_value(r, field)) for w, r in rated)
+                    if fit is not None:
+                        self.coefficients[mark].append((field, kind) + fit)
+
+    def forecast(self, mark, time=None, temp=None):
+        """Predicted later phase values {field: value} given the mark's actual time (s) and temp (°C)"""
+        observed = {'time': time, 'temp': temp}
+        forecast = {}
+        for field, kind, x_mean, y_mean, slope in self.coefficients[mark]:
+            x = observed[kind]
+            if x is None:
+                continue
+            y = y_mean + slope * (x - x_mean)
+            forecast[field] = max(y, x) if kind == 'time' else y  # A later phase can't come before this one
+        return forecast
+
+if __name__ == "__main__":
+    from history_cache import HistoryCache
+    from roast_store import open_store
+
+    is_decaf = len(sys.argv) > 1 and sys.argv[1].lower() in ('decaf', 'yes', 'y')
+    forecaster = PhaseForecaster(HistoryCache(open_store()).recent(is_decaf, FORECAST_ROASTS))
+    print(f"{'DECAF' if is_decaf else 'REGULAR'} - later phase = mean + slope x (mark - mark mean)")
+    for mark in MARKS:
+        for field, kind, x_mean, y_mean, slope in forecaster.coefficients[mark]:
+            print(f"  {mark + '_' + kind:15s} -> {field:15s} slope {slope:5.2f}  "
+                  f"means {x_mean:7.1f} -> {y_mean:7.1f}")
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+Compressed archive of cold roast history
+Rows older than a cutoff move from a CSV log into roast_log.csv.arc, a file of independently
+compressed blocks; roast_log.csv.arc.json indexes each block's offset, row count and date range
+
+    python3 log_archive.py archive 2025-01-01 [roast_log.csv] [gzip|lzma]
+
+Readers use iter_log_lines(), which yields the archived rows followed by the live file
+as one stream of CSV text lines, so csv.reader / csv.DictReader see one logical log.
+"""
+import csv
+import gzip
+import io
+import json
+import lzma
+import os
+import sys
+
+from log_tail import iter_records_forward, read_header, tail_check
+from log_writer import encode_rows, open_locked
+
+ARCHIVE_SUFFIX = ".arc"
+ARCHIVE_INDEX_SUFFIX = ".arc.json"
+ARCHIVE_VERSION = 1
+BLOCK_ROWS = 1000  # Rows per compressed block; a "last N" read decompresses only the newest blocks
+
+CODECS = {
+    'gzip': (gzip.compress, gzip.decompress),
+    'lzma': (lzma.compress, lzma.decompress),
+}
+
+def _index_path(path):
+    return path + ARCHIVE_INDEX_SUFFIX
+
+def _save_index(path, index):
+    tmp_path = _index_path(path) + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(index, f, indent=1)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, _index_path(path))
+
+def _read_index(path):
+    try:
+        with open(_index_path(path), 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _live_replaced(path, pending):
+    """True once the live file no longer holds the bytes it had when the pending run started"""
+    try:
+        with open(path, 'rb') as f:
+            size = f.seek(0, os.SEEK_END)
+            return not (size >= pending['live_size'] and tail_check(f, pending['live_size']) == pending['live_check'])
+    except OSError:
+        return True
+
+def load_index(path):
+    """
+    The archive index for a log, or None if nothing has been archived.
+
+    While an archive run is pending (see archive_log) and the live file
+    still holds the rows being moved, its new blocks are left out, so no
+    row is read twice. Readers never change the archive; an interrupted
+    run is finished or rolled back by recover_archive, under the log's lock.
+    """
+    index = _read_index(path)
+    pending = index.get('pending') if index else None
+    if pending and not _live_replaced(path, pending):
+        index = dict(index, blocks=index['blocks'][:pending['blocks_from']])
+    return index
+
+def _recover(path):
+    """Finish or roll back an interrupted archive run on disk (the caller holds the live log's lock)"""
+    index = _read_index(path)
+    pending = index.get('pending') if index else None
+    if not pending:
+        return index
+    if not _live_replaced(path, pending):
+        # Never replaced: the rows are still live, so drop the new blocks
+        del index['blocks'][pending['blocks_from']:]
+        with open(path + ARCHIVE_SUFFIX, 'r+b') as f:
+            f.truncate(pending['archive_size'])
+    index['pending'] = None
+    _save_index(path, index)
+    return index
+
+def recover_archive(path):
+    """Clean up after an archive run that was interrupted, holding the live log's lock as archive_log does"""
+    index = _read_index(path)
+    if not index or not index.get('pending') or not os.path.exists(path):
+        return
+    with open_locked(path, os.O_RDONLY):
+        _recover(path)
+
+def read_block(f, block):
+    """Decompressed bytes of one archive block"""
+    f.seek(block['offset'])
+    return CODECS[block['codec']][1](f.read(block['length']))
+
+def _block_lines(data, newline):
+    return io.TextIOWrapper(io.BytesIO(data), encoding='utf-8', newline=newline)
+
+def iter_log_lines(path, newline=None, index=None):
+    """
+    Text lines of the whole logical log: header, archived rows, then live rows.
+
+    `newline` has the same meaning as for open(); use newline='' when the
+    lines feed the csv module and quoted fields may hold line breaks.
+    """
+    index = index if index is not None else load_index(path)
+    live = open(path, 'r', encoding='utf-8', newline=newline) if os.path.exists(path) else None
+    try:
+        if live is not None:
+            header_line = live.readline()
+        elif index is not None:
+            header_line = _block_lines(encode_rows([index['header']]), newline).readline()
+        else:
+            return
+        yield header_line
+        if index is not None:
+            with open(path + ARCHIVE_SUFFIX, 'rb') as f:
+                for block in index['blocks']:
+                    yield from _block_lines(read_block(f, block), newline)
+        if live is not None:
+            yield from live
+    finally:
+        if live is not None:
+            live.close()
+
+def _block_rows(f, block, header):
+    return [dict(zip(header, fields))
+            for fields in csv.reader(_block_lines(read_block(f, block), '')) if fields]
+
+def archived_last_n(path, n, decaf=None, index=None):
+    """
+    The newest n archived rows (dicts), oldest first, optionally only one Decaf value.
+
+    Blocks are decompressed newest first and reading stops once n rows are found.
+    """
+    index = index if index is not None else load_index(path)
+    if index is None or n <= 0:
+        return []
+    chunks = []
+    needed = n
+    with open(path + ARCHIVE_SUFFIX, 'rb') as f:
+        for block in reversed(index['blocks']):
+            rows = _block_rows(f, block, index['header'])
+            if decaf is not None:
+                rows = [r for r in rows if (r.get('Decaf') or '').strip().lower() == decaf.lower()]
+            taken = rows[-needed:]
+            chunks.append(taken)
+            needed -= len(taken)
+            if needed <= 0:
+                break
+    rows = []
+    for chunk in reversed(chunks):
+        rows.extend(chunk)
+    return rows
+
+def archived_range(path, since=None, until=None, index=None):
+    """Archived rows dated since/until, decompressing only blocks whose date range overlaps"""
+    index = index if index is not None else load_index(path)
+    if index is None:
+        return []
+    rows = []
+    with open(path + ARCHIVE_SUFFIX, 'rb') as f:
+        for block in index['blocks']:
+            if since and block['last_date'] < since:
+                continue
+            if until and block['first_date'] > until:
+                continue
+            for r in _block_rows(f, block, index['header']):
+                date = r.get('Date') or ''
+                if (not since or date >= since) and (not until or date <= until):
+                    rows.append(r)
+    return rows
+
+def archive_log(path, cutoff, codec='gzip', block_rows=BLOCK_ROWS):
+    """
+    Move rows dated before `cutoff` (YYYY-MM-DD) from the live log into its archive.
+
+    Archived rows keep their original bytes. New blocks are appended and
+    fsynced, the index is saved with a 'pending' marker, the live file is
+    replaced by a copy without those rows, and then the marker is cleared.
+    The whole run holds the live log's lock, which appends and
+    recover_archive take too. Rows without a parseable date stay live.
+    Returns the number of rows moved.
+    """
+    if codec not in CODECS:
+        raise ValueError(f"Unknown codec '{codec}' (expected {' or '.join(CODECS)})")
+    with open_locked(path, os.O_RDONLY) as fd, open(fd, 'rb', closefd=False) as live:
+        index = _recover(path)
+        header, header_end = read_header(path)
+        date_column = header.index('Date')
+        index = index or {'version': ARCHIVE_VERSION, 'header': header, 'blocks': [], 'pending': None}
+        if index['header'] != header:
+            raise ValueError(f"{path} header no longer matches its archive - archive into a new log instead")
+
+        size = live.seek(0, os.SEEK_END)
+        records = list(iter_records_forward(live, header_end, size))
+        old, keep = [], []
+        for i, (offset, fields) in enumerate(records):
+            end = records[i + 1][0] if i + 1 < len(records) else size
+            date = fields[date_column] if len(fields) > date_column else ''
+            target = old if len(date) == 10 and date[4] == '-' and date < cutoff else keep
+            target.append((date, offset, end))
+        if not old:
+            return 0
+
+        def raw(spans):
+            data = bytearray()
+            for _, start, end in spans:
+                live.seek(start)
+                data += live.read(end - start)
+            return bytes(data)
+
+        compress = CODECS[codec][0]
+        blocks_from = len(index['blocks'])
+        with open(path + ARCHIVE_SUFFIX, 'ab') as arc:
+            archive_size = arc.seek(0, os.SEEK_END)
+            for i in range(0, len(old), block_rows):
+                spans = old[i:i + block_rows]
+                data = compress(raw(spans))
+                index['blocks'].append({
+                    'offset': arc.tell(),
+                    'length': len(data),
+                    'codec': codec,
+                    'rows': len(spans),
+                    'first_date': min(d for d, _, _ in spans),
+                    'last_date': max(d for d, _, _ in spans),
+                })
+                arc.write(data)
+            arc.flush()
+            os.fsync(arc.fileno())
+
+        index['pending'] = {
+            'blocks_from': blocks_from,
+            'archive_size': archive_size,
+            'live_size': size,
+            'live_check': tail_check(live, size),
+        }
+        _save_index(path, index)
+
+        live.seek(0)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as out:
+            out.write(live.read(header_end))
+            out.write(raw(keep))
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(tmp_path, path)
+
+        index['pending'] = None
+        _save_index(path, index)
+    return len(old)
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 3 and sys.argv[1] == 'archive':
+        cutoff = sys.argv[2]
+        path = sys.argv[3] if len(sys.argv) > 3 else "roast_log.csv"
+        codec = sys.argv[4] if len(sys.argv) > 4 else 'gzip'
+        moved = archive_log(path, cutoff, codec)
+        index = load_index(path)
+        if not moved:
+            print(f"No roasts in {path} older than {cutoff}")
+        else:
+            stored = sum(block['length'] for block in index['blocks'])
+            rows = sum(block['rows'] for block in index['blocks'])
+            print(f"✓ Archived {moved} roasts older than {cutoff} from {path} ({codec})")
+            print(f"  {path}{ARCHIVE_SUFFIX}: {rows} roasts in {len(index['blocks'])} blocks, {stored} bytes")
+    else:
+        print("Usage: python3 log_archive.py archive YYYY-MM-DD [roast_log.csv] [gzip|lzma]")
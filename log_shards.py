@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+Month-partitioned roast log
+One CSV shard per month (roast_shards/2025-11.csv) plus manifest.json with per-shard counts and date ranges
+
+Split an existing single-file log (the original is left untouched):
+    python3 log_shards.py split [roast_log.csv] [roast_shards]
+Then use it with ROAST_STORE=sharded.
+"""
+import csv
+import json
+import os
+import sys
+from contextlib import contextmanager
+
+from log_tail import iter_records_forward, read_header, tail_group_rows, tail_records
+from log_writer import FSYNC_DEFAULT, LogWriter, open_locked
+from roast_store import LOG_COLUMNS, ROAST_LOG_FILE, RoastStore, decaf_value
+
+ROAST_SHARD_DIR = "roast_shards"
+MANIFEST_FILE = "manifest.json"
+MANIFEST_LOCK_FILE = "manifest.json.lock"  # flock'd around every manifest read-modify-write
+MANIFEST_VERSION = 1
+UNDATED_SHARD = "0000-00"  # Rows whose Date isn't YYYY-MM-DD
+
+def shard_key(date_str):
+    """Month a row belongs to: '2025-11-07' -> '2025-11'"""
+    date_str = (date_str or '').strip()
+    if len(date_str) >= 7 and date_str[4] == '-' and date_str[:4].isdigit() and date_str[5:7].isdigit():
+        return date_str[:7]
+    return UNDATED_SHARD
+
+def _group(row):
+    return (row.get('Decaf') or '').strip().lower()
+
+class ShardedRoastStore(RoastStore):
+    """
+    RoastStore over monthly CSV shards.
+
+    The manifest lists shards oldest first with their row count, first/last
+    date, per-Decaf-group counts and byte size. "Last N" queries walk shards
+    newest first and stop once the group counts cover N; date-bounded loads
+    skip shards whose date range doesn't overlap. A shard whose size no
+    longer matches the manifest (crash between append and manifest write,
+    or a hand edit) is recounted when the manifest is loaded.
+
+    Several stores (processes or stations) can share one directory: appends
+    reload the manifest under a lock and add only their own rows, and
+    readers reload it whenever another writer has replaced it.
+    """
+
+    def __init__(self, path=ROAST_SHARD_DIR, fsync=FSYNC_DEFAULT):
+        self.path = path
+        self.fsync = fsync
+        self.manifest = _empty_manifest()
+        self._signature = None  # Manifest file the in-memory copy was read from
+        self._refresh()
+
+    def _manifest_path(self):
+        return os.path.join(self.path, MANIFEST_FILE)
+
+    @contextmanager
+    def _manifest_lock(self):
+        os.makedirs(self.path, exist_ok=True)
+        with open_locked(os.path.join(self.path, MANIFEST_LOCK_FILE), os.O_RDWR | os.O_CREAT):
+            yield
+
+    def _manifest_signature(self):
+        try:
+            st = os.stat(self._manifest_path())
+        except OSError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def _refresh(self):
+        """Reload the manifest if it was replaced since we read it (by another store or process)"""
+        signature = self._manifest_signature()
+        if signature == self._signature:
+            return
+        if signature is None:
+            self.manifest, self._signature = _empty_manifest(), None
+            return
+        with self._manifest_lock():
+            self.manifest = self._load_manifest()
+
+    def _shard_path(self, entry):
+        return os.path.join(self.path, entry['file'])
+
+    def _load_manifest(self):
+        """Read the manifest from disk, recounting changed shards; the caller holds the manifest lock"""
+        self._signature = self._manifest_signature()
+        try:
+            with open(self._manifest_path(), 'r') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return _empty_manifest()
+
+        changed = False
+        listed = {entry['file'] for entry in manifest['shards']}
+        for name in sorted(os.listdir(self.path)):
+            month = name[:-len('.csv')]
+            if name.endswith('.csv') and name not in listed and shard_key(month + '-01') == month:
+                # Written but never listed (a crash before the manifest write): count it in
+                manifest['shards'].append({'month': month, 'file': name, 'size': None})
+        manifest['shards'].sort(key=lambda e: e['month'])
+        for entry in manifest['shards']:
+            try:
+                size = os.path.getsize(self._shard_path(entry))
+            except OSError:
+                size = 0
+            if size != entry.get('size'):
+                self._recount(entry)
+                changed = True
+        if changed:
+            self._save_manifest(manifest)
+        return manifest
+
+    def _recount(self, entry):
+        """Rebuild one shard's manifest entry by scanning it"""
+        entry.update(rows=0, first_date='', last_date='', groups={}, size=0)
+        path = self._shard_path(entry)
+        if not os.path.exists(path):
+            return
+        header, header_end = read_header(path)
+        with open(path, 'rb') as f:
+            size = f.seek(0, os.SEEK_END)
+            for _, fields in iter_records_forward(f, header_end, size):
+                self._count(entry, dict(zip(header, fields)))
+        entry['size'] = size
+
+    def _count(self, entry, row):
+        date = row.get('Date') or ''
+        entry['rows'] += 1
+        if date and (not entry['first_date'] or date < entry['first_date']):
+            entry['first_date'] = date
+        if date and date > entry['last_date']:
+            entry['last_date'] = date
+        groups = entry['groups']
+        groups[_group(row)] = groups.get(_group(row), 0) + 1
+
+    def _save_manifest(self, manifest=None):
+        manifest = manifest or self.manifest
+        os.makedirs(self.path, exist_ok=True)
+        tmp_path = self._manifest_path() + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f, indent=1)
+        os.replace(tmp_path, self._manifest_path())
+        self._signature = self._manifest_signature()
+
+    def _entry(self, month):
+        for entry in self.manifest['shards']:
+            if entry['month'] == month:
+                return entry
+        entry = {'month': month, 'file': f"{month}.csv", 'rows': 0,
+                 'first_date': '', 'last_date': '', 'groups': {}, 'size': 0}
+        self.manifest['shards'].append(entry)
+        self.manifest['shards'].sort(key=lambda e: e['month'])
+        return entry
+
+    def exists(self):
+        self._refresh()
+        return any(entry['rows'] for entry in self.manifest['shards'])
+
+    def initialize(self):
+        with self._manifest_lock():
+            if not os.path.exists(self._manifest_path()):
+                self.manifest = _empty_manifest()
+                self._save_manifest()
+
+    def append_many(self, rows, header=LOG_COLUMNS):
+        by_month = {}
+        for row in rows:
+            by_month.setdefault(shard_key(row.get('Date')), []).append(row)
+
+        with self._manifest_lock():
+            # Start from what's on disk now, so another writer's shards and counts are kept
+            self.manifest = self._load_manifest()
+            for month, month_rows in by_month.items():
+                entry = self._entry(month)
+                path = self._shard_path(entry)
+                writer = LogWriter(path, fsync=self.fsync)
+                writer.initialize(header)
+                shard_header, _ = read_header(path)
+                writer.append_many([[row.get(column) or '' for column in shard_header] for row in month_rows])
+                for row in month_rows:
+                    self._count(entry, row)
+                entry['size'] = os.path.getsize(path)
+            self._save_manifest()
+
+    def _read_shard(self, entry):
+        path = self._shard_path(entry)
+        if not os.path.exists(path):
+            return []
+        with open(path, 'r', newline='') as f:
+            return list(csv.DictReader(f))
+
+    def load_all(self):
+        self._refresh()
+        rows = []
+        for entry in self.manifest['shards']:
+            rows.extend(self._read_shard(entry))
+        return rows
+
+    def load_range(self, since=None, until=None):
+        self._refresh()
+        rows = []
+        for entry in self.manifest['shards']:
+            if since and entry['last_date'] and entry['last_date'] < since:
+                continue
+            if until and entry['first_date'] and entry['first_date'] > until:
+                continue
+            rows.extend(r for r in self._read_shard(entry) if _in_range(r, since, until))
+        return rows
+
+    def last_n(self, n, is_decaf=None):
+        if n <= 0:
+            return []
+        self._refresh()
+        key = None if is_decaf is None else decaf_value(is_decaf).lower()
+        chunks = []
+        needed = n
+        for entry in reversed(self.manifest['shards']):
+            available = entry['rows'] if key is None else entry['groups'].get(key, 0)
+            if not available:
+                continue
+            path = self._shard_path(entry)
+            take = min(needed, available)
+            if key is None:
+                header, _ = read_header(path)
+                chunks.append([dict(zip(header, fields)) for fields in tail_records(path, take)])
+            else:
+                chunks.append(tail_group_rows(path, decaf_value(is_decaf), take))
+            needed -= take
+            if needed <= 0:
+                break
+        rows = []
+        for chunk in reversed(chunks):
+            rows.extend(chunk)
+        return rows
+
+    def filter(self, is_decaf=None, origin=None):
+        self._refresh()
+        rows = []
+        key = None if is_decaf is None else decaf_value(is_decaf).lower()
+        for entry in self.manifest['shards']:
+            if key is not None and not entry['groups'].get(key):
+                continue
+            for r in self._read_shard(entry):
+                if key is not None and _group(r) != key:
+                    continue
+                if origin is not None and (r.get('Bean Origin') or '').lower() != origin.lower():
+                    continue
+                rows.append(r)
+        return rows
+
+def _empty_manifest():
+    return {'version': MANIFEST_VERSION, 'shards': []}
+
+def _in_range(row, since, until):
+    date = row.get('Date') or ''
+    if since and date < since:
+        return False
+    if until and date > until:
+        return False
+    return True
+
+def split_log(source=ROAST_LOG_FILE, directory=ROAST_SHARD_DIR):
+    """One-shot: copy a single-file log into monthly shards. Returns rows copied."""
+    if os.path.exists(os.path.join(directory, MANIFEST_FILE)):
+        raise FileExistsError(f"{directory} already has a manifest - not splitting twice")
+    header, _ = read_header(source)
+    with open(source, 'r', newline='') as f:
+        rows = list(csv.DictReader(f))
+    store = ShardedRoastStore(directory)
+    store.append_many(rows, header=header)
+    return len(rows)
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 2 and sys.argv[1] == 'split':
+        source = sys.argv[2] if len(sys.argv) > 2 else ROAST_LOG_FILE
+        directory = sys.argv[3] if len(sys.argv) > 3 else ROAST_SHARD_DIR
+        count = split_log(source, directory)
+        store = ShardedRoastStore(directory)
+        print(f"✓ Split {count} roasts from {source} into {len(store.manifest['shards'])} monthly shards in {directory}/")
+        for entry in store.manifest['shards']:
+            print(f"  {entry['file']}: {entry['rows']} roasts ({entry['first_date']} - {entry['last_date']})")
+        print("  Set ROAST_STORE=sharded to use it.")
+    else:
+        print("Usage: python3 log_shards.py split [roast_log.csv] [roast_shards]")
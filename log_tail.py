@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Reverse tail reader for the roast log
+Reads roast_log.csv backwards in blocks so "last N roasts" never parses the whole file
+"""
+import csv
+import io
+import json
+import os
+
+BLOCK_SIZE = 8192  # Bytes read per step when walking the log backwards
+INDEX_SUFFIX = ".idx"  # Sidecar index lives next to the log: roast_log.csv.idx
+INDEX_DEPTH = 50  # Record offsets remembered per Decaf group
+INDEX_CHECK_BYTES = 64  # Tail bytes used to detect edits made outside of roast.py
+
+def parse_record(raw):
+    """Parse one raw CSV record (bytes, may span lines inside quoted Notes) into fields"""
+    text = raw.decode('utf-8')
+    return next(csv.reader(io.StringIO(text, newline='')), [])
+
+def read_header(path):
+    """Return (header fields, byte offset of the first data record)"""
+    with open(path, 'rb') as f:
+        line = f.readline()
+        return parse_record(line), f.tell()
+
+def _iter_lines_reverse(f, start, end, block_size):
+    """Yield (offset, line) pairs from end back to start, newline stripped"""
+    pos = end
+    remainder = b''
+    while pos > start:
+        read_size = min(block_size, pos - start)
+        pos -= read_size
+        f.seek(pos)
+        chunk = f.read(read_size) + remainder
+        lines = chunk.split(b'\n')
+        remainder = lines[0]
+        cursor = pos + len(chunk)
+        for line in reversed(lines[1:]):
+            cursor -= len(line)
+            yield cursor, line
+            cursor -= 1  # The newline itself
+    if remainder:
+        yield start, remainder
+
+def _is_blank(line):
+    return not line.strip(b'\r')
+
+def iter_records_reverse(path, block_size=BLOCK_SIZE, start=None, end=None):
+    """
+    Yield (offset, fields) for each data record, newest first.
+
+    A record whose quoted field spans several lines has an odd number of
+    quote characters on its first and last physical line and an even number
+    on every line in between, so lines are joined until the running quote
+    count is even again.
+    """
+    if start is None:
+        _, start = read_header(path)
+    with open(path, 'rb') as f:
+        if end is None:
+            end = f.seek(0, os.SEEK_END)
+        pending = []
+        quotes = 0
+        for offset, line in _iter_lines_reverse(f, start, end, block_size):
+            if not pending and _is_blank(line):
+                continue
+            pending.append(line)
+            quotes += line.count(b'"')
+            if quotes % 2 == 0:
+                yield offset, parse_record(b'\n'.join(reversed(pending)))
+                pending = []
+                quotes = 0
+
+def iter_records_forward(f, start, end):
+    """Yield (offset, fields) for each record between two byte offsets of an open log"""
+    f.seek(start)
+    pending = []
+    quotes = 0
+    offset = start
+    pos = start
+    while pos < end:
+        line = f.readline()
+        if not line:
+            break
+        if not pending:
+            offset = pos
+        pos += len(line)
+        if not pending and _is_blank(line.rstrip(b'\n')):
+            continue
+        pending.append(line)
+        quotes += line.count(b'"')
+        if quotes % 2 == 0:
+            yield offset, parse_record(b''.join(pending))
+            pending = []
+            quotes = 0
+
+def last_line_end(f, size):
+    """Offset just past the last newline before size (0 if none), so a row still being written is left for later"""
+    pos = size
+    while pos > 0:
+        start = max(0, pos - BLOCK_SIZE)
+        f.seek(start)
+        newline = f.read(pos - start).rfind(b'\n')
+        if newline >= 0:
+            return start + newline + 1
+        pos = start
+    return 0
+
+def fold_appended(path, covered, add):
+    """
+    Call add(fields) for each record appended since `covered` and return (covered, signature).
+
+    `covered` is the {'size', 'check'} an earlier call returned ({'size': 0,
+    'check': ''} reads every record). Returns None without calling add if the
+    log is missing, shrank or was rewritten since. Reading stops after the
+    last complete line, so a row still being written is left for next time;
+    signature is the [mtime_ns, size] seen, for a cheap "changed since?" check.
+    """
+    if not os.path.exists(path):
+        return None
+    _, header_end = read_header(path)
+    with open(path, 'rb') as f:
+        size = f.seek(0, os.SEEK_END)
+        if size < covered['size'] or tail_check(f, covered['size']) != covered['check']:
+            return None
+        end = start = max(covered['size'], header_end)
+        for _, fields in iter_records_forward(f, start, last_line_end(f, size)):
+            add(fields)
+            end = f.tell()
+        signature = [os.fstat(f.fileno()).st_mtime_ns, size]  # A row appended meanwhile changes the size again
+        return {'size': end, 'check': tail_check(f, end)}, signature
+
+def read_record_at(f, offset):
+    """Read the single record starting at a byte offset of an open log"""
+    for _, fields in iter_records_forward(f, offset, float('inf')):
+        return fields
+    return None
+
+def tail_records(path, n):
+    """Return the last n data records as field lists, oldest first"""
+    records = []
+    if n <= 0:
+        return records
+    for _, fields in iter_records_reverse(path):
+        records.append(fields)
+        if len(records) >= n:
+            break
+    records.reverse()
+    return records
+
+def _group_key(fields, column):
+    """Index key for a record: the lowercased Decaf value"""
+    return fields[column].strip().lower() if column < len(fields) else ''
+
+def _index_path(path):
+    return path + INDEX_SUFFIX
+
+def tail_check(f, size):
+    """Hex of the bytes just before size, used to notice that the log was rewritten (shared by every sidecar)"""
+    start = max(0, size - INDEX_CHECK_BYTES)
+    f.seek(start)
+    return f.read(size - start).hex()
+
+def _load_index(path):
+    try:
+        with open(_index_path(path), 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _save_index(path, index):
+    """Write the sidecar atomically; an unwritable directory just means no index"""
+    tmp_path = _index_path(path) + '.tmp'
+    try:
+        with open(tmp_path, 'w') as f:
+            json.dump(index, f)
+        os.replace(tmp_path, _index_path(path))
+    except OSError:
+        pass
+
+def _rebuild_index(path, size, column):
+    """
+    Walk back from the end until every group has INDEX_DEPTH offsets.
+    Returns (groups, scanned_from) where scanned_from is the lowest offset read.
+    """
+    _, scanned_from = read_header(path)
+    groups = {}
+    for offset, fields in iter_records_reverse(path, end=size):
+        key = _group_key(fields, column)
+        offsets = groups.setdefault(key, [])
+        if len(offsets) < INDEX_DEPTH:
+            offsets.append(offset)
+        if len(groups) >= 2 and all(len(o) >= INDEX_DEPTH for o in groups.values()):
+            scanned_from = offset
+            break
+    return {key: list(reversed(offsets)) for key, offsets in groups.items()}, scanned_from
+
+def update_group_index(path, column_name='Decaf'):
+    """
+    Bring the per-group byte-offset index up to date and return it.
+
+    Appended rows are picked up by scanning forward from the last indexed
+    size, so normal use only ever reads the new records. If the log shrank
+    or its tail bytes changed (e.g. tasting notes edited in vi) the index is
+    rebuilt from the end of the file.
+    """
+    header, header_end = read_header(path)
+    if column_name not in header:
+        return None
+    column = header.index(column_name)
+
+    with open(path, 'rb') as f:
+        size = f.seek(0, os.SEEK_END)
+        index = _load_index(path)
+
+        valid = (index is not None
+                 and index.get('column') == column
+                 and 'scanned_from' in index
+                 and index.get('size', 0) <= size
+                 and tail_check(f, index['size']) == index.get('check'))
+
+        if valid and index['size'] == size:
+            return index
+
+        if valid:
+            groups = index['groups']
+            scanned_from = index['scanned_from']
+            for offset, fields in iter_records_forward(f, index['size'], size):
+                offsets = groups.setdefault(_group_key(fields, column), [])
+                offsets.append(offset)
+                del offsets[:-INDEX_DEPTH]
+        else:
+            groups, scanned_from = _rebuild_index(path, size, column)
+
+        index = {
+            'column': column,
+            'size': size,
+            'check': tail_check(f, size),
+            'groups': groups,
+            'complete': scanned_from <= header_end,
+            'scanned_from': scanned_from,
+        }
+
+    _save_index(path, index)
+    return index
+
+def tail_group_rows(path, group, n, column_name='Decaf'):
+    """
+    Return the last n rows whose column_name equals group (case-insensitive)
+    as DictReader-style dicts, oldest first.
+    """
+    if n <= 0:
+        return []
+    header, _ = read_header(path)
+    if column_name not in header:
+        return []
+    column = header.index(column_name)
+    key = group.strip().lower()
+
+    index = update_group_index(path, column_name)
+    offsets = index['groups'].get(key, []) if index else []
+
+    if index and (len(offsets) >= n or index['complete']):
+        # Index holds everything we need (or every row this group has)
+        with open(path, 'rb') as f:
+            records = [read_record_at(f, offset) for offset in offsets[-n:]]
+    else:
+        # Deeper than the index: walk backwards, still stopping after n matches
+        records = []
+        for _, fields in iter_records_reverse(path):
+            if _group_key(fields, column) == key:
+                records.append(fields)
+                if len(records) >= n:
+                    break
+        records.reverse()
+
+    return [dict(zip(header, fields)) for fields in records if fields]
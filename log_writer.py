@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+Crash-safe append path for roast_log.csv
+Every commit is one O_APPEND write (+ optional fsync); a torn trailing record is truncated on open
+
+Writers hold an exclusive fcntl lock on the log while creating the header,
+appending or recovering, so several stations can share one log file.
+"""
+import csv
+import io
+import json
+import os
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows; appends still go out as single O_APPEND writes
+    fcntl = None
+
+from log_tail import parse_record, read_header, tail_check
+
+CHECKPOINT_SUFFIX = ".ckpt"  # Last offset known to end on a complete record
+FSYNC_DEFAULT = os.environ.get('ROAST_FSYNC', '1') != '0'  # ROAST_FSYNC=0 skips fsync
+
+def encode_rows(rows):
+    """CSV-encode field lists exactly as csv.writer would write them to the log"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(row)
+    return buffer.getvalue().encode('utf-8')
+
+@contextmanager
+def locked(fd):
+    """Hold an exclusive advisory lock on an open log descriptor"""
+    if fcntl is None:
+        yield
+        return
+    fcntl.flock(fd, fcntl.LOCK_EX)
+    try:
+        yield
+    finally:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+
+@contextmanager
+def open_locked(path, flags):
+    """
+    Open the log for appending and hold its lock.
+
+    If the file was replaced while we waited (log_archive rewrites the live
+    log), the descriptor points at the old copy, so reopen and lock again.
+    """
+    while True:
+        fd = os.open(path, flags, 0o644)
+        try:
+            with locked(fd):
+                try:
+                    current = os.stat(path).st_ino
+                except FileNotFoundError:
+                    current = None
+                if current == os.fstat(fd).st_ino:
+                    yield fd
+                    return
+        finally:
+            os.close(fd)
+
+class LogWriter:
+    """
+    Append-only writer for one CSV log.
+
+    append() and append_many() each become a single write() on an O_APPEND
+    descriptor followed by fsync (unless disabled), so a bulk import is one
+    group commit instead of one write per row. Inside `with writer.batch():`
+    rows are buffered and committed together when the block exits. A
+    group commit is all-or-nothing: if the write fails it is truncated
+    away, and if the process dies part way recover() (or the next commit)
+    removes every row of it.
+
+    Every write happens under locked(), so concurrent writers (other
+    processes or stations) never interleave rows, and recover() can't
+    mistake another writer's in-flight row for a torn one.
+    """
+
+    def __init__(self, path, fsync=FSYNC_DEFAULT):
+        self.path = path
+        self.fsync = fsync
+        self._batch = None
+
+    def _checkpoint_path(self):
+        return self.path + CHECKPOINT_SUFFIX
+
+    def _load_checkpoint(self, f, size):
+        """
+        (offset of the last known-good record end, whether a group commit was
+        under way from there), if the checkpoint still matches the file
+        """
+        try:
+            with open(self._checkpoint_path(), 'r') as cf:
+                checkpoint = json.load(cf)
+        except (OSError, ValueError):
+            return None
+        offset = checkpoint.get('size')
+        if not isinstance(offset, int) or offset > size or tail_check(f, offset) != checkpoint.get('check'):
+            return None
+        return offset, bool(checkpoint.get('committing'))
+
+    def _save_checkpoint(self, f, size, committing=False):
+        tmp_path = self._checkpoint_path() + '.tmp'
+        checkpoint = {'size': size, 'check': tail_check(f, size)}
+        if committing:
+            checkpoint['committing'] = True
+        try:
+            with open(tmp_path, 'w') as cf:
+                json.dump(checkpoint, cf)
+                if committing and self.fsync:
+                    cf.flush()
+                    os.fsync(cf.fileno())  # Must be on disk before any of the commit's rows
+            os.replace(tmp_path, self._checkpoint_path())
+        except OSError:
+            pass
+
+    def _drop_unfinished(self, fd):
+        """
+        Truncate a group commit that never finished back to where it started.
+
+        The commit's writer held the lock until it replaced the 'committing'
+        checkpoint, so finding one while holding the lock means it died part
+        way. Returns the number of bytes cut.
+        """
+        size = os.fstat(fd).st_size
+        with open(self.path, 'rb') as f:
+            checkpoint = self._load_checkpoint(f, size)
+            if checkpoint is None or not checkpoint[1]:
+                return 0
+            offset = checkpoint[0]
+            os.ftruncate(fd, offset)
+            if self.fsync:
+                os.fsync(fd)
+            self._save_checkpoint(f, offset)
+        return size - offset
+
+    def recover(self):
+        """
+        Truncate a torn trailing record left by a crash mid-write.
+
+        A multi-row group commit that didn't finish is removed whole, back to
+        where it started. Otherwise this scans forward from the checkpoint
+        (normally zero bytes). A trailing piece counts as torn if it leaves a
+        quote open or has fewer fields than the header; a complete row that
+        only lacks its final newline is kept and the newline is added.
+        Returns the number of bytes cut.
+        """
+        if not os.path.exists(self.path):
+            return 0
+        header, header_end = read_header(self.path)
+        with open(self.path, 'r+b') as f, locked(f.fileno()):
+            dropped = self._drop_unfinished(f.fileno())
+            size = f.seek(0, os.SEEK_END)
+            checkpoint = self._load_checkpoint(f, size)
+            start = checkpoint[0] if checkpoint is not None else header_end
+
+            f.seek(start)
+            good_end = start
+            pending = []
+            quotes = 0
+            pos = start
+            while True:
+                line = f.readline()
+                if not line:
+                    break
+                pos += len(line)
+                pending.append(line)
+                quotes += line.count(b'"')
+                if quotes % 2 == 0 and line.endswith(b'\n'):
+                    good_end = pos
+                    pending = []
+                    quotes = 0
+
+            cut = 0
+            if pending:
+                tail = b''.join(pending)
+                if quotes % 2 == 0 and len(parse_record(tail)) >= len(header):
+                    f.seek(0, os.SEEK_END)
+                    f.write(b'\n' if tail.endswith(b'\r') else b'\r\n')
+                    good_end = f.tell()
+                else:
+                    f.truncate(good_end)
+                    cut = size - good_end
+                f.flush()
+                if self.fsync:
+                    os.fsync(f.fileno())
+            self._save_checkpoint(f, good_end)
+        return dropped + cut
+
+    def initialize(self, header):
+        """Create the log with its header row; no-op if it already has one"""
+        if os.path.exists(self.path) and os.path.getsize(self.path) > 0:
+            return False
+        with open_locked(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT) as fd:
+            # Another station may have written the header while we waited for the lock
+            if os.fstat(fd).st_size > 0:
+                return False
+            self._write_all(fd, encode_rows([header]))
+        return True
+
+    def append(self, row):
+        """Append one row (list of field values)"""
+        self.append_many([row])
+
+    def append_many(self, rows):
+        """Append several rows as one group commit"""
+        rows = list(rows)
+        if not rows:
+            return
+        if self._batch is not None:
+            self._batch.extend(rows)
+            return
+        self._commit(rows)
+
+    @contextmanager
+    def batch(self):
+        """Buffer appends made inside the block and commit them together"""
+        if self._batch is not None:
+            yield self
+            return
+        self._batch = []
+        try:
+            yield self
+            rows = self._batch
+        finally:
+            self._batch = None
+        self.append_many(rows)
+
+    def _write_all(self, fd, data):
+        view = memoryview(data)
+        while view:
+            written = os.write(fd, view)
+            view = view[written:]
+        if self.fsync:
+            os.fsync(fd)
+
+    def _commit(self, rows):
+        data = encode_rows(rows)
+        with open_locked(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT) as fd:
+            self._drop_unfinished(fd)
+            start = os.fstat(fd).st_size
+            if len(rows) > 1:
+                # Mark where this commit starts, so a crash part way loses all of it, not just a torn last row
+                with open(self.path, 'rb') as f:
+                    self._save_checkpoint(f, start, committing=True)
+            try:
+                self._write_all(fd, data)
+            except BaseException:
+                os.ftruncate(fd, start)  # Disk full, interrupted: none of the rows stay
+                with open(self.path, 'rb') as f:
+                    self._save_checkpoint(f, start)
+                raise
+            # Still under the lock, so the checkpoint can't land inside another writer's row
+            with open(self.path, 'rb') as f:
+                self._save_checkpoint(f, f.seek(0, os.SEEK_END))
+
+class BufferedLogWriter(LogWriter):
+    """
+    Per-station writer that batches rows and commits them under one lock.
+
+    Rows are held in memory until max_rows are waiting or the oldest has
+    waited max_delay seconds (checked on each append), then written as a
+    single locked group commit. flush() / close() (or leaving a `with`
+    block) write whatever is left.
+    """
+
+    def __init__(self, path, fsync=FSYNC_DEFAULT, max_rows=20, max_delay=2.0):
+        super().__init__(path, fsync=fsync)
+        self.max_rows = max_rows
+        self.max_delay = max_delay
+        self._pending = []
+        self._pending_since = None
+
+    def append_many(self, rows):
+        rows = list(rows)
+        if not rows:
+            return
+        if not self._pending:
+            self._pending_since = time.monotonic()
+        self._pending.extend(rows)
+        if len(self._pending) >= self.max_rows or time.monotonic() - self._pending_since >= self.max_delay:
+            self.flush()
+
+    def flush(self):
+        """Commit every buffered row now"""
+        rows, self._pending = self._pending, []
+        self._pending_since = None
+        if rows:
+            super().append_many(rows)
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
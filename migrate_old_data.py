@@ -5,6 +5,8 @@ Migrate old roast log data to new format
 import csv
 import os
 
+from log_archive import iter_log_lines
+
 OLD_LOG_FILE = "old_roast_log.csv"
 NEW_LOG_FILE = "roast_log.csv"
 BACKUP_FILE = "roast_log_before_migration.csv"
@@ -13,13 +15,12 @@ def parse_old_csv():
     """Parse the old CSV and extract data"""
     print(f"Reading {OLD_LOG_FILE}...")
 
-    with open(OLD_LOG_FILE, 'r') as f:
-        reader = csv.DictReader(f)
-        rows = []
+    reader = csv.DictReader(iter_log_lines(OLD_LOG_FILE))  # Archived rows first, then the live file
+    rows = []
 
-        for i, row in enumerate(reader, start=2):
-            print(f"\nRow {i}: {row}")
-            rows.append(row)
+    for i, row in enumerate(reader, start=2):
+        print(f"\nRow {i}: {row}")
+        rows.append(row)
 
     return rows
 
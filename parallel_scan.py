@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Parallel loader for large roast logs
+Memory-maps roast_log.csv, cuts it into chunks on record boundaries and parses the chunks in a process pool
+
+Run directly to time it against csv.DictReader:
+    python3 parallel_scan.py [roast_log.csv] [workers]
+"""
+import csv
+import io
+import mmap
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from log_tail import read_header
+from roast_record import RoastRecord, record_parser
+
+PARALLEL_MIN_BYTES = 4 * 1024 * 1024  # Smaller logs parse faster in-process than via a pool
+CHUNKS_PER_WORKER = 4  # More chunks than workers evens out uneven chunk costs
+COUNT_BLOCK = 16 * 1024 * 1024  # Quote counting reads the map this many bytes at a time
+
+def _count_quotes(mm, start, end):
+    """Number of '"' bytes in mm[start:end], counted a block at a time"""
+    total = 0
+    for pos in range(start, end, COUNT_BLOCK):
+        total += mm[pos:min(end, pos + COUNT_BLOCK)].count(b'"')
+    return total
+
+def find_boundaries(mm, start, end, chunks):
+    """
+    Offsets that split mm[start:end] into about `chunks` pieces of whole records.
+
+    A newline ends a record only outside quotes, i.e. when the number of
+    quote characters since `start` is even. Quotes are counted up to each
+    target offset, then lines are consumed until the count is even again,
+    so quoted Notes with commas and newlines never straddle two chunks.
+    """
+    boundaries = [start]
+    step = max(1, (end - start) // max(1, chunks))
+    pos = start
+    quotes = 0
+    for target in range(start + step, end, step):
+        if target <= pos:
+            continue
+        quotes += _count_quotes(mm, pos, target)
+        pos = target
+        while pos < end:
+            newline = mm.find(b'\n', pos, end)
+            if newline < 0:
+                pos = end
+                break
+            quotes += mm[pos:newline + 1].count(b'"')
+            pos = newline + 1
+            if quotes % 2 == 0:
+                break
+        if pos >= end:
+            break
+        boundaries.append(pos)
+    boundaries.append(end)
+    return boundaries
+
+def parse_chunk(text, header):
+    """Parse CSV text holding whole records into RoastRecords"""
+    parse = record_parser(tuple(header))
+    return [parse(fields) for fields in csv.reader(io.StringIO(text, newline='')) if fields]
+
+def _parse_range(path, header, start, end):
+    """Worker: map the log and parse bytes [start, end)"""
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        return parse_chunk(mm[start:end].decode('utf-8'), header)
+
+def iter_roasts(path, workers=None):
+    """
+    Yield every roast in the log as a RoastRecord, oldest first.
+
+    Logs over PARALLEL_MIN_BYTES are split into chunks parsed by a pool of
+    `workers` processes (default: one per core); results stream back in
+    file order as each chunk finishes.
+    """
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return
+    header, header_end = read_header(path)
+    workers = workers or os.cpu_count() or 1
+
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        size = len(mm)
+        if workers == 1 or size - header_end < PARALLEL_MIN_BYTES:
+            yield from parse_chunk(mm[header_end:size].decode('utf-8'), header)
+            return
+        boundaries = find_boundaries(mm, header_end, size, workers * CHUNKS_PER_WORKER)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        chunks = pool.map(_parse_range, [path] * (len(boundaries) - 1), [header] * (len(boundaries) - 1),
+                          boundaries[:-1], boundaries[1:])
+        for records in chunks:
+            yield from records
+
+def load_roasts(path, workers=None):
+    """Every roast in the log as a list of RoastRecords"""
+    return list(iter_roasts(path, workers))
+
+if __name__ == "__main__":
+    import time
+
+    path = sys.argv[1] if len(sys.argv) > 1 else "roast_log.csv"
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else None
+
+    started = time.perf_counter()
+    with open(path, 'r', newline='') as f:
+        baseline = [RoastRecord.from_row(r) for r in csv.DictReader(f)]
+    single = time.perf_counter() - started
+
+    started = time.perf_counter()
+    records = load_roasts(path, workers)
+    parallel = time.perf_counter() - started
+
+    same = [r.to_row() for r in records] == [r.to_row() for r in baseline]
+    print(f"{len(records)} roasts from {path}")
+    print(f"  csv.DictReader: {single:7.2f}s")
+    print(f"  parallel_scan:  {parallel:7.2f}s ({workers or os.cpu_count()} workers)")
+    print(f"  Same records:   {'yes' if same else 'NO'}")
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Running per-group phase aggregates
+Keeps the last N quality-weighted samples of every phase per group (decaf/regular, and decaf/regular + origin)
+with running weighted sums, saved next to the log so estimates don't have to read it
+
+    python3 phase_aggregates.py      # Rebuild from the configured store and print each group
+"""
+import json
+import os
+from collections import deque
+
+from log_archive import archived_range
+from log_tail import fold_appended, read_header
+from phase_estimator import PHASE_FIELDS, phase_value, quality_weight, stats_from_sums
+from roast_record import RoastRecord, record_parser
+from roast_store import CsvRoastStore
+
+AGGREGATES_SUFFIX = ".agg.json"
+AGGREGATES_VERSION = 2
+DEFAULT_WINDOW = 5
+
+def group_key(is_decaf, origin=None):
+    """'yes' / 'no' for a decaf group, 'yes|colombian' when split by origin"""
+    key = 'yes' if is_decaf else 'no'
+    if origin:
+        key += '|' + origin.strip().lower()
+    return key
+
+class PhaseWindow:
+    """
+    The last `size` roasts of one group and the running weighted sums of each phase.
+
+    Each sample is (weight, values). Alongside the weighted sums it keeps
+    sums of w*v^2 and w^2 for the spread. Adding a roast is O(phases). Sums are
+    only ever added to, oldest first, so they match a fresh pass over the
+    window exactly; when a roast slides out, the (at most `size`) remaining
+    samples are re-summed instead of subtracting, which would drift.
+    """
+
+    def __init__(self, size, samples=()):
+        self.size = size
+        self.samples = deque(samples, maxlen=size)
+        self._resum()
+
+    def _resum(self):
+        self.sums = [0.0] * len(PHASE_FIELDS)
+        self.totals = [0.0] * len(PHASE_FIELDS)
+        self.squares = [0.0] * len(PHASE_FIELDS)  # w * v^2, for the spread
+        self.weight_squares = [0.0] * len(PHASE_FIELDS)  # w^2, for the effective sample size
+        for weight, values in self.samples:
+            self._accumulate(weight, values)
+
+    def _accumulate(self, weight, values):
+        if weight <= 0:
+            return
+        for k, value in enumerate(values):
+            if value is not None:
+                self.sums[k] += value * weight
+                self.totals[k] += weight
+                self.squares[k] += value * value * weight
+                self.weight_squares[k] += weight * weight
+
+    def add(self, record):
+        weight = quality_weight(record.rating)
+        values = [phase_value(record, field) for field in PHASE_FIELDS]
+        evicting = len(self.samples) == self.size
+        self.samples.append((weight, values))
+        if evicting:
+            self._resum()
+        else:
+            self._accumulate(weight, values)
+
+    def means(self):
+        """Weighted mean per phase (None when no rated roast has it) - same as phase_means()"""
+        return {field: (self.sums[k] / self.totals[k] if self.totals[k] > 0 else None)
+                for k, field in enumerate(PHASE_FIELDS)}
+
+    def stats(self):
+        """PhaseStats per phase from the same running sums - same as phase_stats()"""
+        return {field: stats_from_sums(self.totals[k], self.sums[k], self.squares[k], self.weight_squares[k])
+                for k, field in enumerate(PHASE_FIELDS)}
+
+    def __len__(self):
+        return len(self.samples)
+
+class RunningAggregates:
+    """
+    Persisted PhaseWindows for every group of one RoastStore.
+
+    The file records the store's (mtime, size) when it was last written.
+    For a CSV log it also records how many bytes of the live file it covers
+    (with a tail check, like the .idx sidecar), so rows appended since, by
+    this process or another station, are folded in by reading only those
+    bytes. It is rebuilt from the store when the log shrank or was
+    rewritten (an edit, an archive run), and for other stores whenever they
+    changed outside append().
+    """
+
+    def __init__(self, store, window=DEFAULT_WINDOW):
+        self.store = store
+        self.window = window
+        self.path = store.path + AGGREGATES_SUFFIX
+        self.groups = None
+        self._signature = None
+        self._covered = None  # {'size', 'check'}: live CSV bytes already folded in
+
+    def _stat(self):
+        try:
+            st = os.stat(self.store.path)
+        except OSError:
+            return None
+        return [st.st_mtime_ns, st.st_size]
+
+    def _load(self):
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if (data.get('version') != AGGREGATES_VERSION or data.get('window') != self.window
+                or data.get('fields') != list(PHASE_FIELDS)):
+            return False
+        self.groups = {key: PhaseWindow(self.window, (tuple(s) for s in samples))
+                       for key, samples in data['groups'].items()}
+        self._signature = data['signature']
+        self._covered = data.get('covered')
+        return True
+
+    def save(self):
+        data = {
+            'version': AGGREGATES_VERSION,
+            'window': self.window,
+            'fields': list(PHASE_FIELDS),
+            'signature': self._signature,
+            'covered': self._covered,
+            'groups': {key: list(w.samples) for key, w in self.groups.items()},
+        }
+        tmp_path = self.path + '.tmp'
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            pass  # Only a cache - rebuilt next time
+
+    def rebuild(self):
+        """Recompute every group from the store"""
+        self.groups = {}
+        if isinstance(self.store, CsvRoastStore):
+            for row in archived_range(self.store.path):
+                self._add(RoastRecord.from_row(row))
+            self._covered = {'size': 0, 'check': ''}
+            if not self._fold_appended():
+                self._signature = self._stat()  # No live file
+        else:
+            self._signature = self._stat()
+            if self.store.exists():
+                for row in self.store.load_all():
+                    self._add(RoastRecord.from_row(row))
+        self.save()
+
+    def _fold_appended(self):
+        """Add the live CSV rows past the covered offset; False if the log is missing, shrank or was rewritten"""
+        path = self.store.path
+        if self._covered is None or self.groups is None or not os.path.exists(path):
+            return False
+        parse = record_parser(tuple(read_header(path)[0]))
+        caught_up = fold_appended(path, self._covered, lambda fields: self._add(parse(fields)))
+        if caught_up is None:
+            return False
+        self._covered, self._signature = caught_up
+        return True
+
+    def _current(self):
+        """Groups matching the store as it is now, loading, catching up or rebuilding if needed"""
+        signature = self._stat()
+        if self.groups is not None and self._signature == signature:
+            return self.groups
+        if self.groups is None and not self._load():
+            self.rebuild()
+        elif self._signature != signature:
+            if self._fold_appended():
+                self.save()
+            else:
+                self.rebuild()
+        return self.groups
+
+    def _add(self, record):
+        keys = [group_key(record.decaf)]
+        if record.origin:
+            keys.append(group_key(record.decaf, record.origin))
+        for key in keys:
+            if key not in self.groups:
+                self.groups[key] = PhaseWindow(self.window)
+            self.groups[key].add(record)
+
+    def append(self, row, write):
+        """Save a roast with write(row) (e.g. HISTORY.append) and fold it in"""
+        if self.groups is None:
+            self._load()
+        was_current = self.groups is not None and self._signature == self._stat()
+        write(row)
+        if isinstance(self.store, CsvRoastStore) and self._fold_appended():
+            self.save()  # Read back from the log, with anything other stations appended first
+            return
+        if not was_current:
+            self.groups = None  # Rebuilt on the next query
+            return
+        self._add(RoastRecord.from_row(row))
+        self._signature = self._stat()
+        self.save()
+
+    def means(self, is_decaf, origin=None):
+        """Weighted phase means over the last `window` roasts of a group"""
+        window = self._current().get(group_key(is_decaf, origin))
+        if window is None:
+            return {field: None for field in PHASE_FIELDS}
+        return window.means()
+
+    def stats(self, is_decaf, origin=None):
+        """PhaseStats (mean, spread, effective sample size) per phase for a group"""
+        window = self._current().get(group_key(is_decaf, origin))
+        if window is None:
+            return {field: None for field in PHASE_FIELDS}
+        return window.stats()
+
+    def count(self, is_decaf, origin=None):
+        """Roasts currently in a group's window"""
+        window = self._current().get(group_key(is_decaf, origin))
+        return len(window) if window is not None else 0
+
+if __name__ == "__main__":
+    from roast_store import open_store
+
+    aggregates = RunningAggregates(open_store())
+    aggregates.rebuild()
+    print(f"Rebuilt {aggregates.path}")
+    for key in sorted(aggregates.groups):
+        means = aggregates.groups[key].means()
+        fc = means['fc_start_time']
+        print(f"  {key:25s} {len(aggregates.groups[key])} roasts, FC start "
+              f"{'-' if fc is None else f'{int(fc // 60):02d}:{int(fc % 60):02d}'}")
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Quality-weighted phase estimates from roast history
+One core for roast.py and check_predictions.py: every phase of every window in one vectorized pass,
+with the weighted spread and effective sample size behind p10/p50/p90 intervals
+
+NumPy is optional. Without it the same numbers come from a plain Python loop.
+"""
+try:
+    import numpy as np
+except ImportError:  # Pure-Python fallback below gives the same results
+    np = None
+
+# Phase metrics estimated from history, in matrix column order
+PHASE_FIELDS = (
+    'turnaround_temp',
+    'fc_start_time', 'fc_start_temp',
+    'fc_end_time', 'fc_end_temp',
+    'sc_start_time', 'sc_start_temp',
+    'end_time', 'end_temp',
+)
+
+IDEAL_RATING = 5
+
+# One-sided 90% Student t quantiles by degrees of freedom
+T90 = ((1, 3.078), (2, 1.886), (3, 1.638), (4, 1.533), (5, 1.476), (6, 1.440), (7, 1.415),
+       (8, 1.397), (9, 1.383), (10, 1.372), (15, 1.341), (20, 1.325), (30, 1.310),
+       (60, 1.296), (120, 1.289))
+
+def t90(dof):
+    """90th percentile of Student's t, rounding dof down to the table (wider, never narrower)"""
+    value = T90[0][1]
+    for table_dof, t in T90:
+        if dof >= table_dof:
+            value = t
+    return value
+
+class PhaseStats:
+    """
+    Weighted mean, standard deviation and effective sample size of one phase.
+
+    ess = (sum w)^2 / sum w^2 is how many equally weighted roasts the window
+    is worth; it sets the Student t quantile and the extra width for not
+    knowing the mean exactly. sd is None with fewer than ~2 effective roasts.
+    """
+    __slots__ = ('mean', 'sd', 'ess')
+
+    def __init__(self, mean, sd, ess):
+        self.mean = mean
+        self.sd = sd
+        self.ess = ess
+
+    def percentiles(self):
+        """(p10, p50, p90) for the next roast, or None without a spread"""
+        if self.sd is None:
+            return None
+        half_width = t90(self.ess - 1) * self.sd * (1 + 1 / self.ess) ** 0.5
+        return (self.mean - half_width, self.mean, self.mean + half_width)
+
+    def __repr__(self):
+        return f"PhaseStats(mean={self.mean:.1f}, sd={self.sd}, ess={self.ess:.2f})"
+
+def stats_from_sums(total, weighted, squares, weight_squares):
+    """
+    PhaseStats from running sums of w, w*v, w*v^2 and w^2 (None when total is 0).
+
+    The variance uses reliability weights:
+    sum w (v - mean)^2 / (sum w - sum w^2 / sum w).
+    """
+    if total <= 0:
+        return None
+    mean = weighted / total
+    if weight_squares <= 0:  # Weights so small their squares underflow
+        return PhaseStats(mean, None, 1.0)
+    ess = total * total / weight_squares
+    sd = None
+    denominator = total - weight_squares / total
+    if ess > 1.0 + 1e-9 and denominator > 0:
+        variance = max(0.0, (squares - weighted * weighted / total) / denominator)
+        sd = variance ** 0.5
+    return PhaseStats(mean, sd, ess)
+
+def quality_weight(rating, ideal=IDEAL_RATING):
+    """1 / (|rating - ideal| + 1); 0 for unrated roasts (same as calculate_roast_quality_weight)"""
+    if not rating:
+        return 0.0
+    return 1.0 / (abs(rating - ideal) + 1.0)
+
+def phase_value(record, field):
+    """A phase value, or None when missing (0 counts as missing, as in the original lists)"""
+    value = getattr(record, field)
+    return value if value else None
+
+def phase_values(records):
+    """Per phase, the values that count toward the estimate (rated roasts with that value)"""
+    values = {field: [] for field in PHASE_FIELDS}
+    for r in records:
+        if quality_weight(r.rating) > 0:
+            for field in PHASE_FIELDS:
+                value = phase_value(r, field)
+                if value is not None:
+                    values[field].append(value)
+    return values
+
+def phase_matrix(windows):
+    """
+    Stack windows of RoastRecords into NumPy arrays.
+
+    Returns (values, weights): values has shape (windows, roasts, phases)
+    with NaN for missing phases and for padding of short windows; weights
+    has shape (windows, roasts) with 0 for unrated roasts and padding.
+    """
+    depth = max((len(w) for w in windows), default=0)
+    values = np.full((len(windows), depth, len(PHASE_FIELDS)), np.nan)
+    weights = np.zeros((len(windows), depth))
+    for i, window in enumerate(windows):
+        for j, r in enumerate(window):
+            weights[i, j] = quality_weight(r.rating)
+            values[i, j] = [getattr(r, field) or np.nan for field in PHASE_FIELDS]
+    return values, weights
+
+def _batch_numpy(windows):
+    values, weights = phase_matrix(windows)
+    mask = ~np.isnan(values) & (weights > 0)[:, :, None]
+    w = np.where(mask, weights[:, :, None], 0.0)
+    v = np.where(mask, values, 0.0)
+    weighted = v * w
+    sums = (w.sum(axis=1), weighted.sum(axis=1), (weighted * v).sum(axis=1), (w * w).sum(axis=1))
+    results = []
+    for row in zip(*(a.tolist() for a in sums)):
+        results.append({field: stats_from_sums(*moments)
+                        for field, moments in zip(PHASE_FIELDS, zip(*row))})
+    return results
+
+def _batch_python(windows):
+    results = []
+    for window in windows:
+        sums = [[0.0, 0.0, 0.0, 0.0] for _ in PHASE_FIELDS]  # w, w*v, w*v^2, w^2
+        for r in window:
+            weight = quality_weight(r.rating)
+            if weight <= 0:
+                continue
+            for k, field in enumerate(PHASE_FIELDS):
+                value = phase_value(r, field)
+                if value is not None:
+                    moments = sums[k]
+                    moments[0] += weight
+                    moments[1] += value * weight
+                    moments[2] += value * value * weight
+                    moments[3] += weight * weight
+        results.append({field: stats_from_sums(*sums[k]) for k, field in enumerate(PHASE_FIELDS)})
+    return results
+
+def batch_phase_stats(windows):
+    """
+    Weighted mean, spread and effective sample size of every phase for many windows.
+
+    Same single pass as batch_phase_means: each window yields a dict of
+    PhaseStats (None where no rated roast has the phase).
+    """
+    windows = [list(w) for w in windows]
+    if not windows:
+        return []
+    if np is not None:
+        return _batch_numpy(windows)
+    return _batch_python(windows)
+
+def batch_phase_means(windows):
+    """
+    Quality-weighted mean of every phase for many windows at once.
+
+    `windows` is a list of RoastRecord lists (e.g. the last 5 roasts of
+    thousands of groups, or every rolling window of one group). Returns one
+    dict per window mapping each PHASE_FIELDS name to its weighted mean, or
+    None when no rated roast in the window has that phase.
+    """
+    return [{field: (stats.mean if stats is not None else None) for field, stats in window.items()}
+            for window in batch_phase_stats(windows)]
+
+def phase_means(records):
+    """Quality-weighted mean of every phase for one window of roasts"""
+    return batch_phase_means([records])[0]
+
+def phase_stats(records):
+    """PhaseStats of every phase for one window of roasts"""
+    return batch_phase_stats([records])[0]
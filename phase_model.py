@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+"""
+Offline-fitted phase model
+Quality-weighted least squares of every phase time and temp on decaf, loading temp, turnaround temp
+and batch size, saved to roast_log.csv.model.json with a hash of the log it was fitted on
+
+    python3 phase_model.py fit      # Fit from the configured store and save the model file
+    python3 phase_model.py show     # Print the saved coefficients
+
+roast.py loads the model file when it exists and keeps it current: roasts appended to a CSV log are folded into the
+saved normal-equation sums, and anything else is refitted in the background when the log's hash changes.
+NumPy is optional. Without it the same normal equations are solved in plain Python.
+"""
+import hashlib
+import json
+import os
+import sys
+import threading
+
+try:
+    import numpy as np
+except ImportError:  # Gaussian elimination below gives the same results
+    np = None
+
+from log_archive import ARCHIVE_INDEX_SUFFIX, archived_range
+from log_shards import MANIFEST_FILE
+from log_tail import fold_appended, read_header
+from phase_estimator import PHASE_FIELDS, PhaseStats, phase_value, quality_weight
+from roast_record import RoastRecord, parse_temp, record_parser
+from roast_store import CsvRoastStore
+
+MODEL_SUFFIX = ".model.json"
+MODEL_VERSION = 3
+FEATURES = ('decaf', 'loading_temp', 'turnaround_temp', 'batch_size')  # Inputs, after the intercept (a phase never uses itself)
+RIDGE = 0.05  # Each slope's diagonal is grown by this fraction, so a handful of roasts can't give wild slopes
+HASH_BLOCK = 1024 * 1024
+
+def model_path(store_path):
+    return store_path + MODEL_SUFFIX
+
+def log_hash(path):
+    """SHA-256 of the log (a shard directory's manifest), including its archive index if any"""
+    digest = hashlib.sha256()
+    target = os.path.join(path, MANIFEST_FILE) if os.path.isdir(path) else path
+    for name in (target, path + ARCHIVE_INDEX_SUFFIX):
+        if not os.path.exists(name):
+            continue
+        with open(name, 'rb') as f:
+            for block in iter(lambda: f.read(HASH_BLOCK), b''):
+                digest.update(block)
+    return digest.hexdigest()
+
+def _signature(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+def feature_values(is_decaf, loading_temp=None, turnaround_temp=None, batch_size=None):
+    """Raw inputs in FEATURES order (None where unknown)"""
+    return [1.0 if is_decaf else 0.0, loading_temp, turnaround_temp, parse_temp(batch_size)]
+
+def _solve_python(a, b):
+    """Solve a x = b by Gaussian elimination with partial pivoting"""
+    n = len(b)
+    m = [row[:] + [b[i]] for i, row in enumerate(a)]
+    for col in range(n):
+        pivot = max(range(col, n), key=lambda r: abs(m[r][col]))
+        m[col], m[pivot] = m[pivot], m[col]
+        for r in range(col + 1, n):
+            factor = m[r][col] / m[col][col]
+            for c in range(col, n + 1):
+                m[r][c] -= factor * m[col][c]
+    x = [0.0] * n
+    for r in range(n - 1, -1, -1):
+        x[r] = (m[r][n] - sum(m[r][c] * x[c] for c in range(r + 1, n))) / m[r][r]
+    return x
+
+def _solve(a, b):
+    if np is not None:
+        return np.linalg.solve(np.array(a), np.array(b)).tolist()
+    return _solve_python(a, b)
+
+def new_sums():
+    """Empty running sums for fit_sums(); add_to_sums() folds roasts in one at a time"""
+    return {'means': [[0.0, 0.0] for _ in FEATURES], 'phases': {}}
+
+def _phase_sums():
+    size = len(FEATURES) + 1
+    return {
+        'rows': 0,
+        'weight_squares': 0.0,  # w^2, for the effective sample size
+        'value_squares': 0.0,  # w * y^2, for the residual spread
+        'known': [[0.0] * size for _ in range(size)],  # w, over rows where inputs i and j are both known
+        'firsts': [[0.0] * size for _ in range(size)],  # w * x_i, over the same rows
+        'products': [[0.0] * size for _ in range(size)],  # w * x_i * x_j
+        'values': [0.0] * size,  # w * x_i * y, over rows where input i is known
+        'value_totals': [0.0] * size,  # w * y, over the same rows
+    }
+
+def add_to_sums(sums, record):
+    """
+    Fold one roast into the running sums (unrated roasts add nothing).
+
+    The sums are of raw inputs, so they only ever grow and a new roast never
+    needs the old ones; fit_sums() centres them on the means afterwards.
+    """
+    weight = quality_weight(record.rating)
+    if weight <= 0:
+        return
+    x = feature_values(record.decaf, record.loading_temp, record.turnaround_temp, record.batch_size)
+    for j, value in enumerate(x):
+        if value is not None:
+            sums['means'][j][0] += weight
+            sums['means'][j][1] += weight * value
+    for field in PHASE_FIELDS:
+        y = phase_value(record, field)
+        if y is None:
+            continue
+        phase = sums['phases'].setdefault(field, _phase_sums())
+        # A phase that is also an input (turnaround temp) is fitted without it, so it can't predict itself
+        inputs = [1.0] + [None if name == field else value for name, value in zip(FEATURES, x)]
+        phase['rows'] += 1
+        phase['weight_squares'] += weight * weight
+        phase['value_squares'] += weight * y * y
+        for i, xi in enumerate(inputs):
+            if xi is None:
+                continue
+            phase['values'][i] += weight * xi * y
+            phase['value_totals'][i] += weight * y
+            for j, xj in enumerate(inputs):
+                if xj is not None:
+                    phase['known'][i][j] += weight
+                    phase['firsts'][i][j] += weight * xi
+                    phase['products'][i][j] += weight * xi * xj
+
+def fit_phase(a, b, rows, weight_squares, value_squares, constant):
+    """
+    Ridge-stabilised weighted least squares for one phase.
+
+    `a` and `b` are the normal equations on centred inputs, intercept first.
+    Returns (coefficients, sd, ess). Inputs whose diagonal is at most
+    `constant[i]` never vary and get a coefficient of 0.
+    """
+    size = len(b)
+    solve_a = [row[:] for row in a]
+    solve_b = b[:]
+    free = 1  # Intercept
+    for i in range(1, size):
+        if a[i][i] <= constant[i]:
+            solve_a[i] = [0.0] * size  # Constant input: pin its coefficient to 0
+            for row in solve_a:
+                row[i] = 0.0
+            solve_a[i][i], solve_b[i] = 1.0, 0.0
+        else:
+            solve_a[i][i] *= 1.0 + RIDGE
+            free += 1
+    coefficients = _solve(solve_a, solve_b)
+
+    total = a[0][0]
+    ess = total * total / weight_squares
+    # Weighted residual sum of squares, expanded so it comes from the same sums
+    squares = (value_squares - 2 * sum(c * v for c, v in zip(coefficients, b))
+               + sum(coefficients[i] * coefficients[j] * a[i][j] for i in range(size) for j in range(size)))
+    sd = None
+    if rows > free:
+        sd = (max(squares, 0.0) / total * rows / (rows - free)) ** 0.5
+    return coefficients, sd, ess
+
+def fit_sums(sums):
+    """Model data (feature means, per-phase fits, and the sums themselves) from running sums"""
+    means = [total_x / total if total > 0 else 0.0 for total, total_x in sums['means']]
+    m = [0.0] + means  # The intercept's input is always 1 and isn't centred
+    size = len(m)
+    phases = {}
+    for field in PHASE_FIELDS:
+        phase = sums['phases'].get(field)
+        if phase is None:
+            continue
+        known, firsts, products = phase['known'], phase['firsts'], phase['products']
+        # Sums of (x_i - m_i)(x_j - m_j) expanded into sums of raw values; an unknown input counts as its mean
+        a = [[products[i][j] - m[j] * firsts[i][j] - m[i] * firsts[j][i] + m[i] * m[j] * known[i][j]
+              for j in range(size)] for i in range(size)]
+        b = [phase['values'][i] - m[i] * phase['value_totals'][i] for i in range(size)]
+        constant = [1e-9 * products[i][i] for i in range(size)]  # Rounding left over when an input never varies
+        coefficients, sd, ess = fit_phase(a, b, phase['rows'], phase['weight_squares'], phase['value_squares'], constant)
+        phases[field] = {'coefficients': coefficients, 'rows': phase['rows'], 'sd': sd, 'ess': ess}
+    return {'features': list(FEATURES), 'means': means, 'phases': phases, 'sums': sums}
+
+def fit_model(records):
+    """Model data (feature means and per-phase fits) from parsed roasts"""
+    sums = new_sums()
+    for record in records:
+        add_to_sums(sums, record)
+    return fit_sums(sums)
+
+class PhaseModel:
+    """
+    A fitted model: phase = intercept + sum(coefficient x (input - mean)).
+
+    Unknown inputs (e.g. loading temp before the roast starts) sit at their
+    training mean, so they add nothing.
+    """
+
+    def __init__(self, data):
+        self.data = data
+        self.means = data['means']
+        self.phases = data['phases']
+
+    def predict(self, is_decaf, loading_temp=None, turnaround_temp=None, batch_size=None):
+        """{field: value} for every fitted phase"""
+        return {field: stats.mean for field, stats in
+                self.stats(is_decaf, loading_temp, turnaround_temp, batch_size).items() if stats is not None}
+
+    def stats(self, is_decaf, loading_temp=None, turnaround_temp=None, batch_size=None):
+        """PhaseStats per phase: the prediction, the residual spread and the fit's effective sample size"""
+        x = feature_values(is_decaf, loading_temp, turnaround_temp, batch_size)
+        centered = [1.0] + [(v if v is not None else mean) - mean for v, mean in zip(x, self.means)]
+        stats = {}
+        for field in PHASE_FIELDS:
+            phase = self.phases.get(field)
+            if phase is None:
+                stats[field] = None
+                continue
+            mean = sum(c * v for c, v in zip(phase['coefficients'], centered))
+            stats[field] = PhaseStats(mean, phase['sd'], phase['ess'])
+        return stats
+
+def save_model(store, data, digest, signature=None):
+    signature = signature if signature is not None else _signature(store.path)
+    data = dict(data, version=MODEL_VERSION, log_hash=digest, signature=signature)
+    tmp_path = model_path(store.path) + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=1)
+    os.replace(tmp_path, model_path(store.path))
+
+def _fold_csv(path, sums, covered):
+    """Add a CSV log's rows past `covered` to the sums; (covered, signature), or None if it was rewritten"""
+    if not os.path.exists(path):
+        return None
+    parse = record_parser(tuple(read_header(path)[0]))
+    return fold_appended(path, covered, lambda fields: add_to_sums(sums, parse(fields)))
+
+def fit_store(store):
+    """Fit on every roast in the store, save the model file and return the model"""
+    digest = log_hash(store.path)
+    sums = new_sums()
+    covered = signature = None
+    if isinstance(store, CsvRoastStore):
+        # Read the live file directly so the model knows exactly which bytes it covers
+        for row in archived_range(store.path):
+            add_to_sums(sums, RoastRecord.from_row(row))
+        caught_up = _fold_csv(store.path, sums, {'size': 0, 'check': ''})
+        if caught_up is not None:
+            covered, signature = caught_up
+    elif store.exists():
+        for row in store.load_all():
+            add_to_sums(sums, RoastRecord.from_row(row))
+    data = dict(fit_sums(sums), covered=covered)
+    save_model(store, data, digest, signature)
+    return PhaseModel(data)
+
+def load_model(store):
+    """
+    The store's saved model, brought up to date first if the log changed; None if never fitted.
+
+    Nothing is read while the log's mtime and size match the fit's. Rows
+    appended to a CSV log since are folded into the saved sums, reading only
+    the new bytes. Otherwise (a rewritten CSV log, or another store) the log
+    is hashed and refitted if the hash differs.
+    """
+    try:
+        with open(model_path(store.path), 'r') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if data.get('version') != MODEL_VERSION or data.get('features') != list(FEATURES):
+        return fit_store(store)
+    if data.get('signature') == _signature(store.path):
+        return PhaseModel(data)
+    if data.get('covered') is not None and isinstance(store, CsvRoastStore):
+        caught_up = _fold_csv(store.path, data['sums'], data['covered'])
+        if caught_up is not None:
+            covered, signature = caught_up
+            data = dict(fit_sums(data['sums']), covered=covered)
+            save_model(store, data, None, signature)  # The hash is only compared after a rewrite, which refits anyway
+            return PhaseModel(data)
+    digest = log_hash(store.path)
+    if digest != data.get('log_hash'):
+        return fit_store(store)
+    save_model(store, data, digest)  # Touched but unchanged: remember the new mtime
+    return PhaseModel(data)
+
+class ModelCache:
+    """
+    load_model() for one RoastStore, kept until the store's file changes size or mtime.
+
+    A roast saved in this process (or by another station) changes the log,
+    so the next get() brings the model up to date. For a CSV log that only
+    reads the appended rows, so it happens in place. Other stores would
+    hash and refit everything, so that runs on a background thread and the
+    previous model is served until it finishes.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self._signature = None
+        self._model = None
+        self._loaded = False
+        self._refitting = False
+        self._lock = threading.Lock()  # Around _refitting and the finished refit's results
+
+    def _reload(self, signature):
+        model = load_model(self.store)
+        with self._lock:
+            self._model = model
+            self._signature = signature
+            self._loaded = True
+            self._refitting = False
+
+    def get(self):
+        """The current model (or the previous one while another store refits), or None if never fitted"""
+        signature = _signature(self.store.path)
+        with self._lock:
+            if self._loaded and signature == self._signature:
+                return self._model
+            if self._loaded and not isinstance(self.store, CsvRoastStore):
+                if not self._refitting:
+                    self._refitting = True
+                    threading.Thread(target=self._reload, args=(signature,), daemon=True).start()
+                return self._model
+        self._reload(signature)
+        return self._model
+
+if __name__ == "__main__":
+    from roast_store import open_store
+
+    store = open_store()
+    if len(sys.argv) > 1 and sys.argv[1] == 'fit':
+        model = fit_store(store)
+        print(f"✓ Fitted {len(model.phases)} phases on {store.path} -> {model_path(store.path)}")
+    elif len(sys.argv) > 1 and sys.argv[1] == 'show':
+        model = load_model(store)
+        if model is None:
+            print(f"No model for {store.path} yet. Run: python3 phase_model.py fit")
+            sys.exit(1)
+    else:
+        print("Usage: python3 phase_model.py fit|show")
+        sys.exit(1)
+
+    print(f"  {'phase':16s} {'rows':>5} {'intercept':>10}" + ''.join(f"{f:>16}" for f in FEATURES) + f"{'sd':>8}")
+    for field, phase in model.phases.items():
+        sd = '-' if phase['sd'] is None else f"{phase['sd']:.1f}"
+        print(f"  {field:16s} {phase['rows']:5d} {phase['coefficients'][0]:10.1f}"
+              + ''.join(f"{c:16.3f}" for c in phase['coefficients'][1:]) + f"{sd:>8}")
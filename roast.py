@@ -4,27 +4,41 @@ Integrated Coffee Roast Timer & Logger
 Real-time tracking with simple Enter key control points
 """
 
-import csv
+import asyncio
+import copy
 import os
+import threading
 import time
 from datetime import datetime
 
-ROAST_LOG_FILE = "roast_log.csv"
+from alert_dispatcher import AlertDispatcher, detect_backend
+from history_cache import HistoryCache
+from live_forecast import FORECAST_ROASTS, PhaseForecaster
+from phase_aggregates import RunningAggregates
+from decay_weights import WeightedSeries
+from phase_estimator import PHASE_FIELDS, phase_stats, quality_weight
+from phase_model import ModelCache
+from roast_record import RoastRecord, format_mmss, format_value, parse_temp
+from roast_store import open_store
+from session_engine import TerminalIO, run as run_sessions
+from session_timer import SessionTimer
+from similar_roasts import KNN_MIN_NEIGHBOURS, KNN_NEIGHBOURS
+
+STORE = open_store()  # CSV by default, SQLite with ROAST_STORE=sqlite
+HISTORY = HistoryCache(STORE)  # Parsed roasts shared by every estimator in this process
+RECENT_ROAST_WINDOW = int(os.environ.get('ROAST_WINDOW') or 5)  # Roasts of the same type used for predictions
+SESSION_HISTORY = int(os.environ.get('ROAST_SESSION_HISTORY') or 2000)  # Latest roasts of one type a session groups, matches and forecasts from (read from the end of the log)
+DECAY_HALF_LIFE_DAYS = float(os.environ.get('ROAST_HALF_LIFE_DAYS') or 0) or None  # Recency decay (off by default)
+FC_ALERT_MIN_LEAD = 15  # Seconds: the FC approaching alert never comes later than this before the average
+FC_ALERT_MIN_ESS = 5.0  # Effective roasts needed before the alert uses the p10 (fewer give a far too wide t interval)
+AGGREGATES = RunningAggregates(STORE, RECENT_ROAST_WINDOW)  # Running phase sums per group, saved next to the log
+ALERTS = AlertDispatcher(detect_backend())  # Sound backend picked once, here; ROAST_ALERTS overrides
+STORE_LOCK = threading.RLock()  # Sessions load history and save roasts from worker threads, one at a time
+MODEL = ModelCache(STORE)  # Fitted by `python3 phase_model.py fit`; new roasts folded in as the log grows
 
 def initialize_log():
     """Create log file with headers if it doesn't exist"""
-    if not os.path.exists(ROAST_LOG_FILE):
-        with open(ROAST_LOG_FILE, 'w', newline='') as f:
-            writer = csv.writer(f)
-            writer.writerow([
-                'Date', 'Time', 'Bean Origin', 'Decaf', 'Batch Size (lbs)',
-                'Loading Temp', 'Turnaround Temp', 'Early Notes',
-                'Yellow Time', 'First Crack Start Time', 'First Crack Start Temp', 'FC Start ROR',
-                'First Crack End Time', 'First Crack End Temp', 'FC End ROR',
-                'Second Crack Start Time', 'Second Crack Start Temp', 'SC Start ROR',
-                'End Time', 'End Temp', 'Drop Temp', 'Total Roast Time (min)', 'Target Roast Level',
-                'Roast Level (1-10)', 'Notes', 'Tasting Notes (added later)'
-            ])
+    STORE.initialize()
 
 def format_time(seconds):
     """Format seconds as MM:SS"""
@@ -60,14 +74,10 @@ def calculate_roast_quality_weight(roast_level, ideal=5):
     - Rating 4 or 6: weight = 0.5
     - Rating 3 or 7: weight = 0.33
     - Rating 1 or 10: weight = 0.2 or 0.167
+
+    Ratings arrive already parsed (RoastRecord.rating, float or None).
     """
-    if not roast_level:
-        return 0.0
-    try:
-        level = float(roast_level)
-        return 1.0 / (abs(level - ideal) + 1.0)
-    except:
-        return 0.0
+    return quality_weight(roast_level, ideal)
 
 def weighted_average(values, weights):
     """
@@ -90,27 +100,30 @@ def weighted_average(values, weights):
     return sum(v * w for v, w in zip(values, weights)) / total_weight
 
 def beep(sound='Ping'):
-    """Make alert sound with different sounds for different phases"""
-    import subprocess
-    # Use macOS system sound
-    subprocess.run(['afplay', f'/System/Library/Sounds/{sound}.aiff'],
-                  stdout=subprocess.DEVNULL,
-                  stderr=subprocess.DEVNULL)
-
-def clear_line():
+    """Queue an alert sound; ALERTS plays it in the background, so the caller never waits"""
+    ALERTS.play(sound)
+
+def clear_line(file=None):
     """Clear current line"""
-    print('\r' + ' ' * 80 + '\r', end='', flush=True)
+    print('\r' + ' ' * 80 + '\r', end='', flush=True, file=file)
 
-def display_timer(elapsed, label=""):
+def display_timer(elapsed, label="", file=None):
     """Display current timer"""
-    clear_line()
+    clear_line(file)
     if label:
-        print(f"⏱  {format_time(elapsed)} - {label}", end='', flush=True)
+        print(f"⏱  {format_time(elapsed)} - {label}", end='', flush=True, file=file)
     else:
-        print(f"⏱  {format_time(elapsed)}", end='', flush=True)
+        print(f"⏱  {format_time(elapsed)}", end='', flush=True, file=file)
 
 class RoastSession:
+    """
+    One roast's recorded state. Each control point (time, temp, ROR) is
+    set in one step under the session's lock, so a concurrent reader such
+    as save_roast() never sees a time without its temp.
+    """
+
     def __init__(self, bean_origin, is_decaf, batch_size, target_level):
+        self._lock = threading.RLock()
         self.bean_origin = bean_origin
         self.is_decaf = is_decaf
         self.batch_size = batch_size
@@ -137,359 +150,366 @@ class RoastSession:
 
     def elapsed(self):
         """Get elapsed time in seconds"""
-        if self.start_time:
-            return time.time() - self.start_time
+        if self.start_time is not None:
+            return time.monotonic() - self.start_time
         return 0
 
-    def mark_yellow(self):
+    def update(self, **fields):
+        """Set several fields as one change"""
+        with self._lock:
+            for name, value in fields.items():
+                if not hasattr(self, name):
+                    raise AttributeError(f"RoastSession has no field '{name}'")
+                setattr(self, name, value)
+
+    def snapshot(self):
+        """A consistent copy of the current state"""
+        with self._lock:
+            return copy.copy(self)
+
+    def mark_yellow(self, at=None):
         """Mark yellowing phase complete"""
-        self.yellow_time = self.elapsed()
+        self.update(yellow_time=self.elapsed() if at is None else at)
+
+    def mark_turnaround(self, temp, at=None):
+        """Mark turnaround (`at`: elapsed seconds when it happened, default now)"""
+        self.update(turnaround_time=self.elapsed() if at is None else at, turnaround_temp=temp)
 
-    def mark_first_crack_start(self, temp):
+    def mark_first_crack_start(self, temp, ror=None, at=None):
         """Mark start of first crack"""
-        self.fc_start_time = self.elapsed()
-        self.fc_start_temp = temp
+        self.update(fc_start_time=self.elapsed() if at is None else at, fc_start_temp=temp, fc_start_ror=ror)
 
-    def mark_first_crack_end(self, temp):
+    def mark_first_crack_end(self, temp, ror=None, at=None):
         """Mark end of first crack"""
-        self.fc_end_time = self.elapsed()
-        self.fc_end_temp = temp
+        self.update(fc_end_time=self.elapsed() if at is None else at, fc_end_temp=temp, fc_end_ror=ror)
 
-    def mark_second_crack_start(self, temp):
+    def mark_second_crack_start(self, temp, ror=None, at=None):
         """Mark second crack start"""
-        self.sc_start_time = self.elapsed()
-        self.sc_start_temp = temp
+        self.update(sc_start_time=self.elapsed() if at is None else at, sc_start_temp=temp, sc_start_ror=ror)
 
-    def mark_end(self, end_temp, drop_temp):
+    def mark_end(self, end_temp, drop_temp=None, at=None):
         """Mark end of roast"""
-        self.end_time = self.elapsed()
-        self.end_temp = end_temp
-        self.drop_temp = drop_temp
+        self.update(end_time=self.elapsed() if at is None else at, end_temp=end_temp, drop_temp=drop_temp)
+
+def get_recent_rows(is_decaf, n=RECENT_ROAST_WINDOW):
+    """Last n parsed roasts of this type (decaf/regular), shared through HISTORY"""
+    return HISTORY.recent(is_decaf, n)
 
 def get_fc_midpoint_temp(is_decaf):
     """Calculate FC midpoint temp from historical data using quality-weighted averaging"""
-    if not os.path.exists(ROAST_LOG_FILE):
+    if not STORE.exists():
         # Default values if no history
         return 186 if is_decaf else 192
 
     try:
-        with open(ROAST_LOG_FILE, 'r') as f:
-            reader = csv.DictReader(f)
-            rows = [r for r in reader if r.get('Decaf', '').lower() == ('yes' if is_decaf else 'no')]
-
-            if not rows:
-                return 186 if is_decaf else 192
-
-            # Get FC start and end temps from recent roasts with quality weights
-            fc_starts = []
-            fc_ends = []
-            weights = []
-            for r in rows[-5:]:  # Last 5 roasts of this type
-                fc_start = r.get('First Crack Start Temp') or r.get('First Crack Temp', '')
-                fc_end = r.get('First Crack End Temp', '')
-                roast_level = r.get('Roast Level (1-10)', '')
-
-                # Calculate quality weight for this roast
-                weight = calculate_roast_quality_weight(roast_level)
-
-                if fc_start and weight > 0:
-                    try:
-                        fc_starts.append(float(fc_start))
-                        if fc_end:
-                            fc_ends.append(float(fc_end))
-                        else:
-                            fc_ends.append(None)
-                        weights.append(weight)
-                    except:
-                        pass
-
-            # Calculate weighted averages
-            if fc_starts and weights:
-                avg_start = weighted_average(fc_starts, weights)
-                # For ends, only use pairs where we have both start and end
-                valid_ends = [e for e in fc_ends if e is not None]
-                valid_end_weights = [w for e, w in zip(fc_ends, weights) if e is not None]
-
-                if valid_ends and valid_end_weights and avg_start is not None:
-                    avg_end = weighted_average(valid_ends, valid_end_weights)
-                    if avg_end is not None:
-                        return int((avg_start + avg_end) / 2)
-
-                # If we only have start temps, add ~4°C for estimated midpoint
-                if avg_start is not None:
-                    return int(avg_start + 4)
+        rows = get_recent_rows(is_decaf)
 
+        if not rows:
             return 186 if is_decaf else 192
+
+        # Get FC start and end temps from recent roasts with quality weights
+        fc_starts = []
+        fc_ends = []
+        weights = []
+        for r in rows:  # Last 5 roasts of this type
+            # Calculate quality weight for this roast
+            weight = calculate_roast_quality_weight(r.rating)
+
+            if r.fc_start_temp and weight > 0:
+                fc_starts.append(r.fc_start_temp)
+                fc_ends.append(r.fc_end_temp)
+                weights.append(weight)
+
+        # Calculate weighted averages
+        if fc_starts and weights:
+            avg_start = weighted_average(fc_starts, weights)
+            # For ends, only use pairs where we have both start and end
+            valid_ends = [e for e in fc_ends if e is not None]
+            valid_end_weights = [w for e, w in zip(fc_ends, weights) if e is not None]
+
+            if valid_ends and valid_end_weights and avg_start is not None:
+                avg_end = weighted_average(valid_ends, valid_end_weights)
+                if avg_end is not None:
+                    return int((avg_start + avg_end) / 2)
+
+            # If we only have start temps, add ~4°C for estimated midpoint
+            if avg_start is not None:
+                return int(avg_start + 4)
+
+        return 186 if is_decaf else 192
     except:
         return 186 if is_decaf else 192
 
 def get_fc_start_estimates(is_decaf):
     """Get estimated FC start time and temp from historical data using quality-weighted averaging"""
-    if not os.path.exists(ROAST_LOG_FILE):
+    if not STORE.exists():
         # Default values if no history
         default_time = 480 if is_decaf else 540  # 8:00 for decaf, 9:00 for regular
         default_temp = 186 if is_decaf else 192
         return default_time, default_temp
 
     try:
-        with open(ROAST_LOG_FILE, 'r') as f:
-            reader = csv.DictReader(f)
-            rows = [r for r in reader if r.get('Decaf', '').lower() == ('yes' if is_decaf else 'no')]
-
-            if not rows:
-                default_time = 480 if is_decaf else 540
-                default_temp = 186 if is_decaf else 192
-                return default_time, default_temp
-
-            # Get FC start times and temps from recent roasts with quality weights
-            fc_start_times = []
-            fc_start_temps = []
-            time_weights = []
-            temp_weights = []
-
-            for r in rows[-5:]:  # Last 5 roasts of this type
-                roast_level = r.get('Roast Level (1-10)', '')
-                weight = calculate_roast_quality_weight(roast_level)
-
-                # Try new format first, then old format
-                fc_start_time = r.get('First Crack Start Time', '') or r.get('First Crack Time', '')
-                if fc_start_time and ':' in fc_start_time and weight > 0:
-                    try:
-                        parts = fc_start_time.split(':')
-                        seconds = int(parts[0]) * 60 + int(parts[1])
-                        fc_start_times.append(seconds)
-                        time_weights.append(weight)
-                    except:
-                        pass
-
-                # Try new format first, then old format
-                fc_start_temp = r.get('First Crack Start Temp', '') or r.get('First Crack Temp', '')
-                if fc_start_temp and weight > 0:
-                    try:
-                        fc_start_temps.append(float(fc_start_temp))
-                        temp_weights.append(weight)
-                    except:
-                        pass
-
-            # Calculate weighted averages
-            avg_time = weighted_average(fc_start_times, time_weights)
-            avg_temp = weighted_average(fc_start_temps, temp_weights)
-
-            # Use weighted averages if available, otherwise fall back to defaults
-            final_time = int(avg_time) if avg_time is not None else (480 if is_decaf else 540)
-            final_temp = int(avg_temp) if avg_temp is not None else (186 if is_decaf else 192)
-
-            return final_time, final_temp
+        rows = get_recent_rows(is_decaf)
+
+        if not rows:
+            default_time = 480 if is_decaf else 540
+            default_temp = 186 if is_decaf else 192
+            return default_time, default_temp
+
+        # Get FC start times and temps from recent roasts with quality weights
+        fc_start_times = []
+        fc_start_temps = []
+        time_weights = []
+        temp_weights = []
+
+        for r in rows:  # Last 5 roasts of this type
+            weight = calculate_roast_quality_weight(r.rating)
+
+            if r.fc_start_time is not None and weight > 0:
+                fc_start_times.append(r.fc_start_time)
+                time_weights.append(weight)
+
+            if r.fc_start_temp is not None and weight > 0:
+                fc_start_temps.append(r.fc_start_temp)
+                temp_weights.append(weight)
+
+        # Calculate weighted averages
+        avg_time = weighted_average(fc_start_times, time_weights)
+        avg_temp = weighted_average(fc_start_temps, temp_weights)
+
+        # Use weighted averages if available, otherwise fall back to defaults
+        final_time = int(avg_time) if avg_time is not None else (480 if is_decaf else 540)
+        final_temp = int(avg_temp) if avg_temp is not None else (186 if is_decaf else 192)
+
+        return final_time, final_temp
     except:
         default_time = 480 if is_decaf else 540
         default_temp = 186 if is_decaf else 192
         return default_time, default_temp
 
-def get_fc_approaching_time(is_decaf):
-    """Calculate when to alert for approaching FC (45s before avg FC start)"""
-    fc_start_time, _ = get_fc_start_estimates(is_decaf)
+def get_fc_approaching_time(is_decaf, group=None, estimates=None):
+    """
+    Calculate when to alert for approaching FC.
+
+    Uses the p10 of FC start (9 in 10 roasts start later) once history is
+    worth FC_ALERT_MIN_ESS effective roasts, but always at least
+    FC_ALERT_MIN_LEAD seconds before the average; otherwise 45s before the
+    average FC start.
+    """
+    if estimates is None and not group:
+        fc_start_time, _ = get_fc_start_estimates(is_decaf)
+        estimates = get_all_phase_estimates(is_decaf)
+    else:
+        estimates = estimates or get_all_phase_estimates(is_decaf, group)
+        fc_start_time = estimates['fc_start_time']
+    interval = estimates['intervals'].get('fc_start_time')
+    if interval and estimates.get('ess', {}).get('fc_start_time', 0) >= FC_ALERT_MIN_ESS:
+        return min(interval[0], fc_start_time - FC_ALERT_MIN_LEAD)
     return fc_start_time - 45
 
-def get_all_phase_estimates(is_decaf):
-    """Get estimated times and temps for all roast phases from historical data"""
-    if not os.path.exists(ROAST_LOG_FILE):
-        # Default values if no history
-        return {
-            'turnaround_time': 60,  # ~1:00 typical turnaround
-            'turnaround_temp': 95 if is_decaf else 105,  # Typical turnaround temps
-            'yellow_time': 300 if is_decaf else 330,  # 5:00 for decaf, 5:30 for regular
-            'fc_start_time': 480 if is_decaf else 540,  # 8:00 for decaf, 9:00 for regular
-            'fc_start_temp': 186 if is_decaf else 192,
-            'fc_end_time': 570 if is_decaf else 630,  # 9:30 for decaf, 10:30 for regular
-            'fc_end_temp': 194 if is_decaf else 200,
-            'sc_start_time': 660 if is_decaf else 720,  # 11:00 for decaf, 12:00 for regular
-            'sc_start_temp': 204 if is_decaf else 210,
-            'end_time': 720 if is_decaf else 780,  # 12:00 for decaf, 13:00 for regular
-            'end_temp': 212 if is_decaf else 218
-        }
+def format_interval(estimates, field):
+    """'  (p10-p90 07:40-08:20)' for a phase time with a spread, else ''"""
+    interval = estimates.get('intervals', {}).get(field)
+    if not interval:
+        return ''
+    return f"  (p10-p90 {format_time(interval[0])}-{format_time(interval[2])})"
+
+def default_phase_estimates(is_decaf):
+    """Typical times and temps used when there's no history for a phase"""
+    return {
+        'turnaround_time': 60,  # ~1:00 typical turnaround
+        'turnaround_temp': 95 if is_decaf else 105,  # Typical turnaround temps
+        'yellow_time': 300 if is_decaf else 330,  # 5:00 for decaf, 5:30 for regular
+        'fc_start_time': 480 if is_decaf else 540,  # 8:00 for decaf, 9:00 for regular
+        'fc_start_temp': 186 if is_decaf else 192,
+        'fc_end_time': 570 if is_decaf else 630,  # 9:30 for decaf, 10:30 for regular
+        'fc_end_temp': 194 if is_decaf else 200,
+        'sc_start_time': 660 if is_decaf else 720,  # 11:00 for decaf, 12:00 for regular
+        'sc_start_temp': 204 if is_decaf else 210,
+        'end_time': 720 if is_decaf else 780,  # 12:00 for decaf, 13:00 for regular
+        'end_temp': 212 if is_decaf else 218,
+        'intervals': {},  # No spread without history
+        'ess': {},
+    }
+
+def estimates_from_stats(stats, defaults):
+    """Phase estimates dict (int means, p10/p50/p90 intervals, effective sample sizes) from PhaseStats"""
+    estimates = {'turnaround_time': 60, 'intervals': {}, 'ess': {}}  # Turnaround time not tracked in CSV
+    for field in PHASE_FIELDS:
+        phase = stats.get(field)
+        estimates[field] = int(phase.mean) if phase is not None else defaults[field]
+        if phase is not None:
+            estimates['ess'][field] = phase.ess
+        percentiles = phase.percentiles() if phase is not None else None
+        if percentiles is not None:
+            estimates['intervals'][field] = tuple(int(p) for p in percentiles)  # (p10, p50, p90)
+    return estimates
+
+def get_model_estimates(is_decaf, loading_temp, turnaround_temp, batch_size=None):
+    """Phase estimates from the fitted model given this roast's loading/turnaround temps, or None"""
+    loading = parse_temp(parse_temp_ror(loading_temp)[0])
+    turnaround = parse_temp(parse_temp_ror(turnaround_temp)[0])
+    model = MODEL.get()
+    if model is None or loading is None or turnaround is None:
+        return None
+    stats = model.stats(is_decaf, loading, turnaround, batch_size)
+    return estimates_from_stats(stats, default_phase_estimates(is_decaf))
+
+def get_similar_roast_estimates(is_decaf, loading_temp, turnaround_temp):
+    """
+    Phase estimates from the roasts that started most like this one, or None.
+
+    Looks up the KNN_NEIGHBOURS rated roasts among the last SESSION_HISTORY
+    of this type nearest in loading and turnaround temp (KD tree, see
+    similar_roasts.py). None when either temp isn't a number or fewer than
+    KNN_MIN_NEIGHBOURS roasts match.
+    """
+    loading = parse_temp(parse_temp_ror(loading_temp)[0])
+    turnaround = parse_temp(parse_temp_ror(turnaround_temp)[0])
+    if loading is None or turnaround is None or not STORE.exists():
+        return None
+    try:
+        neighbours = HISTORY.similar(is_decaf, SESSION_HISTORY).nearest(loading, turnaround, KNN_NEIGHBOURS)
+        if len(neighbours) < KNN_MIN_NEIGHBOURS:
+            return None
+        return estimates_from_stats(phase_stats(neighbours), default_phase_estimates(is_decaf))
+    except:
+        return None
+
+def get_phase_forecaster(is_decaf, group=None):
+    """PhaseForecaster fitted on the recent roasts of this type (and group, when there are enough among the last SESSION_HISTORY)"""
+    roasts = []
+    if STORE.exists():
+        try:
+            _, roasts = HISTORY.recent_groups(is_decaf, SESSION_HISTORY).resolve(FORECAST_ROASTS, decaf=is_decaf, **(group or {}))
+        except:
+            roasts = []
+    return PhaseForecaster(roasts)
+
+def update_phase_estimates(estimates, forecaster, mark, mark_time, mark_temp):
+    """
+    Estimates with every phase after `mark` re-forecast from its actual time and temp.
+
+    The pre-roast p10-p90 ranges of re-forecast phases no longer apply and are dropped.
+    """
+    forecast = forecaster.forecast(mark, mark_time, parse_temp(mark_temp))
+    updated = dict(estimates)
+    updated['intervals'] = {field: interval for field, interval in estimates['intervals'].items()
+                            if field not in forecast}
+    for field, value in forecast.items():
+        updated[field] = int(value)
+    return updated
+
+def print_timeline(estimates, file=None):
+    """Expected FC start/end, SC start and drop with their p10-p90 ranges"""
+    print(f"   FC Start:    ~{format_time(estimates['fc_start_time'])} @ {estimates['fc_start_temp']}°C{format_interval(estimates, 'fc_start_time')}", file=file)
+    print(f"   FC End:      ~{format_time(estimates['fc_end_time'])} @ {estimates['fc_end_temp']}°C{format_interval(estimates, 'fc_end_time')}", file=file)
+    print(f"   SC Start:    ~{format_time(estimates['sc_start_time'])} @ {estimates['sc_start_temp']}°C{format_interval(estimates, 'sc_start_time')}", file=file)
+    print(f"   Drop:        ~{format_time(estimates['end_time'])} @ {estimates['end_temp']}°C{format_interval(estimates, 'end_time')}", file=file)
+
+def get_group_stats(is_decaf, group):
+    """
+    PhaseStats from the finest group of recent roasts matching `group`, or None.
+
+    `group` holds any of origin, batch_size and target_level. The roasts come
+    from a hash index of the last SESSION_HISTORY roasts of this type (see
+    group_index.py), falling back to coarser groups when one has too few
+    roasts; None when that ends at decaf/regular alone, which the running
+    aggregates already cover.
+    """
+    fields, roasts = HISTORY.recent_groups(is_decaf, SESSION_HISTORY).resolve(RECENT_ROAST_WINDOW, decaf=is_decaf, **group)
+    if fields == ('decaf',):
+        return None
+    if DECAY_HALF_LIFE_DAYS:
+        return WeightedSeries(roasts, DECAY_HALF_LIFE_DAYS).last_n_stats(len(roasts))
+    return phase_stats(roasts)
+
+def get_all_phase_estimates(is_decaf, group=None):
+    """
+    Get estimated times and temps for all roast phases from historical data.
+
+    `group` optionally narrows the history to roasts with the same origin,
+    batch size and/or target level, e.g. {'origin': 'Colombian', 'batch_size': '1'}.
+    """
+    defaults = default_phase_estimates(is_decaf)
+    if not STORE.exists():
+        return defaults
 
     try:
-        with open(ROAST_LOG_FILE, 'r') as f:
-            reader = csv.DictReader(f)
-            rows = [r for r in reader if r.get('Decaf', '').lower() == ('yes' if is_decaf else 'no')]
-
-            if not rows:
-                return get_all_phase_estimates.__wrapped__(is_decaf)  # Return defaults
-
-            recent_rows = rows[-5:]  # Last 5 roasts of this type
-
-            def parse_time_to_seconds(time_str):
-                """Convert MM:SS to seconds"""
-                if not time_str or ':' not in time_str:
-                    return None
-                try:
-                    parts = time_str.split(':')
-                    return int(parts[0]) * 60 + int(parts[1])
-                except:
-                    return None
-
-            def parse_temp(temp_str):
-                """Parse temperature value"""
-                if not temp_str:
-                    return None
-                try:
-                    return float(temp_str)
-                except:
-                    return None
-
-            # Collect data for each phase with quality weights (handle both old and new column formats)
-            turnaround_temps = []
-            turnaround_weights = []
-            fc_start_times = []
-            fc_start_time_weights = []
-            fc_start_temps = []
-            fc_start_temp_weights = []
-            fc_end_times = []
-            fc_end_time_weights = []
-            fc_end_temps = []
-            fc_end_temp_weights = []
-            sc_start_times = []
-            sc_start_time_weights = []
-            sc_start_temps = []
-            sc_start_temp_weights = []
-            end_times = []
-            end_time_weights = []
-            end_temps = []
-            end_temp_weights = []
-
-            for r in recent_rows:
-                # Get quality weight for this roast
-                roast_level = r.get('Roast Level (1-10)', '')
-                weight = calculate_roast_quality_weight(roast_level)
-
-                if weight > 0:
-                    # Turnaround temp
-                    tt = parse_temp(r.get('Turnaround Temp', ''))
-                    if tt:
-                        turnaround_temps.append(tt)
-                        turnaround_weights.append(weight)
-
-                    # FC start time (try new format first, then old)
-                    fct = parse_time_to_seconds(r.get('First Crack Start Time', '')) or parse_time_to_seconds(r.get('First Crack Time', ''))
-                    if fct:
-                        fc_start_times.append(fct)
-                        fc_start_time_weights.append(weight)
-
-                    # FC start temp (try new format first, then old)
-                    fctemp = parse_temp(r.get('First Crack Start Temp', '')) or parse_temp(r.get('First Crack Temp', ''))
-                    if fctemp:
-                        fc_start_temps.append(fctemp)
-                        fc_start_temp_weights.append(weight)
-
-                    # FC end time
-                    fcet = parse_time_to_seconds(r.get('First Crack End Time', ''))
-                    if fcet:
-                        fc_end_times.append(fcet)
-                        fc_end_time_weights.append(weight)
-
-                    # FC end temp
-                    fcemp = parse_temp(r.get('First Crack End Temp', ''))
-                    if fcemp:
-                        fc_end_temps.append(fcemp)
-                        fc_end_temp_weights.append(weight)
-
-                    # SC start time (try new format first, then old)
-                    sct = parse_time_to_seconds(r.get('Second Crack Start Time', '')) or parse_time_to_seconds(r.get('Second Crack Time', ''))
-                    if sct:
-                        sc_start_times.append(sct)
-                        sc_start_time_weights.append(weight)
-
-                    # SC start temp (try new format first, then old)
-                    sctemp = parse_temp(r.get('Second Crack Start Temp', '')) or parse_temp(r.get('Second Crack Temp', ''))
-                    if sctemp:
-                        sc_start_temps.append(sctemp)
-                        sc_start_temp_weights.append(weight)
-
-                    # End time
-                    et = parse_time_to_seconds(r.get('End Time', ''))
-                    if et:
-                        end_times.append(et)
-                        end_time_weights.append(weight)
-
-                    # End temp
-                    etemp = parse_temp(r.get('End Temp', ''))
-                    if etemp:
-                        end_temps.append(etemp)
-                        end_temp_weights.append(weight)
-
-            # Calculate weighted averages, falling back to defaults
-            defaults = {
-                'turnaround_time': 60,  # Typical turnaround ~1:00
-                'turnaround_temp': 95 if is_decaf else 105,
-                'fc_start_time': 480 if is_decaf else 540,
-                'fc_start_temp': 186 if is_decaf else 192,
-                'fc_end_time': 570 if is_decaf else 630,
-                'fc_end_temp': 194 if is_decaf else 200,
-                'sc_start_time': 660 if is_decaf else 720,
-                'sc_start_temp': 204 if is_decaf else 210,
-                'end_time': 720 if is_decaf else 780,
-                'end_temp': 212 if is_decaf else 218
-            }
-
-            # Helper to get weighted avg or default
-            def get_avg_or_default(values, weights, default):
-                avg = weighted_average(values, weights)
-                return int(avg) if avg is not None else default
-
-            return {
-                'turnaround_time': 60,  # Not tracked in CSV, using typical value
-                'turnaround_temp': get_avg_or_default(turnaround_temps, turnaround_weights, defaults['turnaround_temp']),
-                'fc_start_time': get_avg_or_default(fc_start_times, fc_start_time_weights, defaults['fc_start_time']),
-                'fc_start_temp': get_avg_or_default(fc_start_temps, fc_start_temp_weights, defaults['fc_start_temp']),
-                'fc_end_time': get_avg_or_default(fc_end_times, fc_end_time_weights, defaults['fc_end_time']),
-                'fc_end_temp': get_avg_or_default(fc_end_temps, fc_end_temp_weights, defaults['fc_end_temp']),
-                'sc_start_time': get_avg_or_default(sc_start_times, sc_start_time_weights, defaults['sc_start_time']),
-                'sc_start_temp': get_avg_or_default(sc_start_temps, sc_start_temp_weights, defaults['sc_start_temp']),
-                'end_time': get_avg_or_default(end_times, end_time_weights, defaults['end_time']),
-                'end_temp': get_avg_or_default(end_temps, end_temp_weights, defaults['end_temp'])
-            }
+        # Means, spreads and effective sample sizes come from the same weighted sums.
+        stats = None
+        if group:
+            # Roasts with the same origin/batch/target, when there are enough of them
+            stats = get_group_stats(is_decaf, group)
+        model = MODEL.get() if stats is None else None
+        if model is not None:
+            # Least-squares fit over the whole log (see phase_model.py) instead of recent averages;
+            # it knows decaf and batch size but not origin or target, so a matching group comes first
+            stats = model.stats(is_decaf, batch_size=(group or {}).get('batch_size'))
+        if stats is None:
+            if DECAY_HALF_LIFE_DAYS:
+                # Quality x recency weights over the last roasts of this type (prefix sums, see decay_weights.py)
+                stats = HISTORY.weights().stats(is_decaf, RECENT_ROAST_WINDOW, DECAY_HALF_LIFE_DAYS)
+            else:
+                # Quality-weighted sums over the recent roasts of this type, kept up to date by save_roast
+                stats = AGGREGATES.stats(is_decaf)
+
+        return estimates_from_stats(stats, defaults)
     except:
         # Return defaults on any error
-        return {
-            'turnaround_time': 60,
-            'turnaround_temp': 95 if is_decaf else 105,
-            'fc_start_time': 480 if is_decaf else 540,
-            'fc_start_temp': 186 if is_decaf else 192,
-            'fc_end_time': 570 if is_decaf else 630,
-            'fc_end_temp': 194 if is_decaf else 200,
-            'sc_start_time': 660 if is_decaf else 720,
-            'sc_start_temp': 204 if is_decaf else 210,
-            'end_time': 720 if is_decaf else 780,
-            'end_temp': 212 if is_decaf else 218
-        }
+        return {'turnaround_time': 60, 'intervals': {}, 'ess': {}, **{field: defaults[field] for field in PHASE_FIELDS}}
 
-def run_roast_session():
-    """Run an interactive roast session"""
-    print("\n=== COFFEE ROAST SESSION ===\n")
+def prepare_estimates(is_decaf, group):
+    """Phase estimates and the live forecaster for a new session, with the similar-roast index built"""
+    with STORE_LOCK:
+        estimates = get_all_phase_estimates(is_decaf, group)
+        if STORE.exists():
+            HISTORY.similar(is_decaf, SESSION_HISTORY)  # Build the similar-roast index now so the lookup after turnaround is instant
+        return estimates, get_phase_forecaster(is_decaf, group)  # Coefficients for re-forecasting at each ENTER
+
+def prepare_turnaround(is_decaf, group, loading_temp, turnaround_temp, batch_size):
+    """
+    (estimates, milestones) once the turnaround temp is known.
+
+    The estimates come from the fitted model, else the roasts that started
+    most like this one; None keeps the pre-roast timeline. Run from a worker
+    thread like prepare_estimates, since a cold model or history load reads
+    the store.
+    """
+    with STORE_LOCK:
+        similar = (get_model_estimates(is_decaf, loading_temp, turnaround_temp, batch_size)
+                   or get_similar_roast_estimates(is_decaf, loading_temp, turnaround_temp))
+        return similar, get_milestones(is_decaf, group, similar)
+
+async def roast_session(io):
+    """Run an interactive roast session, prompting and printing through `io` (see session_engine.py)"""
+    io.print("\n=== COFFEE ROAST SESSION ===\n")
 
     # Pre-roast reminders
-    print("⚠️  PRE-ROAST CHECKLIST:")
-    print("   □ Empty the chaff collector")
-    print("   □ Turn OFF cooling mode")
-    print("   □ Close the roast chamber")
+    io.print("⚠️  PRE-ROAST CHECKLIST:")
+    io.print("   □ Empty the chaff collector")
+    io.print("   □ Turn OFF cooling mode")
+    io.print("   □ Close the roast chamber")
     beep('Tink')
-    print()
-    input("Press ENTER when ready to continue...")
-    print()
+    io.print()
+    await io.ask("Press ENTER when ready to continue...")
+    io.print()
 
     # Setup
     bean_origin = "Colombian"  # Fixed origin
-    is_decaf = input("Decaf? (y/n, default: n): ").strip().lower() == 'y'
+    is_decaf = (await io.ask("Decaf? (y/n, default: n): ")).strip().lower() == 'y'
     batch_size = "1"  # Fixed at 1 lb
     target_level = "Medium-Dark"  # Fixed at Medium-Dark
 
     session = RoastSession(bean_origin, is_decaf, batch_size, target_level)
+    group = {'origin': bean_origin, 'batch_size': batch_size, 'target_level': target_level}
 
-    print(f"\n{bean_origin} {'DECAF' if is_decaf else 'REGULAR'} - {batch_size} lb")
-    print(f"Target: {target_level}\n")
+    io.print(f"\n{bean_origin} {'DECAF' if is_decaf else 'REGULAR'} - {batch_size} lb")
+    io.print(f"Target: {target_level}\n")
 
-    # Get all phase estimates from historical data (early so we can use throughout)
-    phase_estimates = get_all_phase_estimates(is_decaf)
+    # Get all phase estimates from historical data (early so we can use throughout);
+    # read off the loop so other sessions' timers keep ticking through a cold load
+    phase_estimates, forecaster = await asyncio.to_thread(prepare_estimates, is_decaf, group)
 
     # Calculate FC midpoint (halfway between start and end)
     fc_midpoint_time = int((phase_estimates['fc_start_time'] + phase_estimates['fc_end_time']) / 2)
@@ -497,245 +517,209 @@ def run_roast_session():
 
     # Display target settings
     if is_decaf:
-        print("🎯 TARGET SETTINGS (DECAF):")
-        print("   Load: 200°C, Power: 80, Fan: 60")
-        print(f"   At ~{format_time(fc_midpoint_time)} / {fc_midpoint_temp}°C (FC midpoint): Power: 30, Fan: 90")
+        io.print("🎯 TARGET SETTINGS (DECAF):")
+        io.print("   Load: 200°C, Power: 80, Fan: 60")
+        io.print(f"   At ~{format_time(fc_midpoint_time)} / {fc_midpoint_temp}°C (FC midpoint): Power: 30, Fan: 90")
     else:
-        print("🎯 TARGET SETTINGS (REGULAR):")
-        print("   Load: 215°C, Power: 85, Fan: 60")
-        print(f"   At ~{format_time(fc_midpoint_time)} / {fc_midpoint_temp}°C (FC midpoint): Power: 35, Fan: 85")
-    print()
+        io.print("🎯 TARGET SETTINGS (REGULAR):")
+        io.print("   Load: 215°C, Power: 85, Fan: 60")
+        io.print(f"   At ~{format_time(fc_midpoint_time)} / {fc_midpoint_temp}°C (FC midpoint): Power: 35, Fan: 85")
+    io.print()
 
     # Control points
-    input("Press ENTER when you LOAD THE BEANS and start the roast...")
-    session.start_time = time.time()
+    await io.ask("Press ENTER when you LOAD THE BEANS and start the roast...")
+    session.update(start_time=time.monotonic())  # Immune to wall-clock changes mid-roast
+    timer = SessionTimer(session.start_time, lambda elapsed, label: display_timer(elapsed, label, io.file))
     beep('Hero')
-    print("\n🔥 ROAST STARTED! (Timer running in background)\n")
+    io.print("\n🔥 ROAST STARTED! (Timer running in background)\n")
 
     # Collect initial data
-    session.loading_temp = input("Loading temp (°C): ").strip()
-    session.early_notes = input("Early notes (optional): ").strip()
+    session.update(loading_temp=(await io.ask("Loading temp (°C): ")).strip())
+    session.update(early_notes=(await io.ask("Early notes (optional): ")).strip())
 
     # Display comprehensive timeline
-    print(f"\n📊 EXPECTED TIMELINE (based on historical data):")
-    print(f"   Turnaround:  ~{format_time(phase_estimates['turnaround_time'])} @ {phase_estimates['turnaround_temp']}°C")
-    print(f"   FC Start:    ~{format_time(phase_estimates['fc_start_time'])} @ {phase_estimates['fc_start_temp']}°C")
-    print(f"   FC End:      ~{format_time(phase_estimates['fc_end_time'])} @ {phase_estimates['fc_end_temp']}°C")
-    print(f"   SC Start:    ~{format_time(phase_estimates['sc_start_time'])} @ {phase_estimates['sc_start_temp']}°C")
-    print(f"   Drop:        ~{format_time(phase_estimates['end_time'])} @ {phase_estimates['end_temp']}°C")
+    io.print(f"\n📊 EXPECTED TIMELINE (based on historical data):")
+    io.print(f"   Turnaround:  ~{format_time(phase_estimates['turnaround_time'])} @ {phase_estimates['turnaround_temp']}°C")
+    print_timeline(phase_estimates, io.file)
 
     # Wait for turnaround
-    print(f"\n⏱️  NEXT: Press ENTER at TURNAROUND (expected ~{format_time(phase_estimates['turnaround_time'])} @ {phase_estimates['turnaround_temp']}°C)")
-    input()  # User presses ENTER at turnaround
+    io.print(f"\n⏱️  NEXT: Press ENTER at TURNAROUND (expected ~{format_time(phase_estimates['turnaround_time'])} @ {phase_estimates['turnaround_temp']}°C)")
+    await io.ask()  # User presses ENTER at turnaround
 
     # Mark turnaround time
-    session.turnaround_time = session.elapsed()
-    clear_line()
-    print(f"\n⏱  Turnaround at {format_time(session.turnaround_time)}")
-
-    session.turnaround_temp = input("Turnaround temp (°C): ").strip()
+    turnaround_time = session.elapsed()
+    clear_line(io.file)
+    io.print(f"\n⏱  Turnaround at {format_time(turnaround_time)}")
+
+    session.mark_turnaround((await io.ask("Turnaround temp (°C): ")).strip(), at=turnaround_time)
+
+    # Re-issue the timeline from the fitted model, or else the roasts that started most like this one
+    # (off the loop, like the pre-roast estimates); the milestones follow whichever timeline is used
+    similar, milestones = await asyncio.to_thread(prepare_turnaround, is_decaf, group, session.loading_temp,
+                                                  session.turnaround_temp, batch_size)
+    if similar is not None:
+        similar['turnaround_time'] = phase_estimates['turnaround_time']
+        phase_estimates = similar
+        io.print("\n📊 UPDATED TIMELINE (from this roast's loading/turnaround temps):")
+        print_timeline(phase_estimates, io.file)
 
     # Show next phase
-    print(f"\n⏱️  NEXT: Press ENTER at FIRST CRACK START (expected ~{format_time(phase_estimates['fc_start_time'])} @ {phase_estimates['fc_start_temp']}°C)\n")
+    io.print(f"\n⏱️  NEXT: Press ENTER at FIRST CRACK START (expected ~{format_time(phase_estimates['fc_start_time'])} @ {phase_estimates['fc_start_temp']}°C)\n")
 
     # Run timer with milestone checks
-    milestones = get_milestones(is_decaf)
-
-    # Create a background timer thread
-    import threading
-    import sys
-
-    stop_timer = threading.Event()
+    # Milestone alerts are timed events on the session timer, which also redraws the clock each second
+    def milestone_alert(message):
+        def fire(elapsed):
+            timer.flash(message)
+            beep('Ping')
+        return fire
 
-    class MilestoneTracker:
-        def __init__(self):
-            self.last_milestone = 0
-
-    tracker = MilestoneTracker()
-
-    def run_timer():
-        while not stop_timer.is_set():
-            elapsed = session.elapsed()
-
-            # Check for milestone alerts
-            for milestone_time, message in milestones:
-                if elapsed >= milestone_time and tracker.last_milestone < milestone_time:
-                    display_timer(elapsed, message)
-                    beep('Ping')
-                    tracker.last_milestone = milestone_time
-                    time.sleep(1)
-
-            # Display timer
-            display_timer(elapsed)
-            time.sleep(0.1)
-
-    timer_thread = threading.Thread(target=run_timer, daemon=True)
-    timer_thread.start()
+    alerts = [timer.at(milestone_time, milestone_alert(message)) for milestone_time, message in milestones]
+    timer.show(lambda elapsed: '')
 
     # Wait for first crack START
-    input()  # User presses ENTER at first crack start
+    await io.ask()  # User presses ENTER at first crack start
 
     # Mark the time immediately
-    session.fc_start_time = session.elapsed()
+    fc_start_time = session.elapsed()
 
-    stop_timer.set()
-    timer_thread.join(timeout=0.5)
+    timer.show(None)
+    for handle in alerts:
+        timer.cancel(handle)
 
     # First crack START control point
-    clear_line()
-    print(f"\n⏱  First Crack STARTED at {format_time(session.fc_start_time)}")
+    clear_line(io.file)
+    io.print(f"\n⏱  First Crack STARTED at {format_time(fc_start_time)}")
 
-    fc_start_input = input("Temperature at first crack start (°C or °C:ROR): ").strip()
-    session.fc_start_temp, session.fc_start_ror = parse_temp_ror(fc_start_input)
+    fc_start_input = (await io.ask("Temperature at first crack start (°C or °C:ROR): ")).strip()
+    session.mark_first_crack_start(*parse_temp_ror(fc_start_input), at=fc_start_time)
 
-    print("\n🔊 FIRST CRACK STARTED")
+    io.print("\n🔊 FIRST CRACK STARTED")
     beep('Glass')
 
+    # Re-forecast the rest of the roast from the actual FC start
+    phase_estimates = update_phase_estimates(phase_estimates, forecaster, 'fc_start',
+                                             session.fc_start_time, session.fc_start_temp)
+    fc_midpoint_time = int((session.fc_start_time + phase_estimates['fc_end_time']) / 2)
+    fc_start_temp = parse_temp(session.fc_start_temp)
+    if fc_start_temp is not None:
+        fc_midpoint_temp = int((fc_start_temp + phase_estimates['fc_end_temp']) / 2)
+
     # Show prominent power/fan adjustment reminder after data entry
-    print("\n" + "="*60)
-    print("⚡ REMINDER: Adjust Power/Fan at FC Midpoint!")
+    io.print("\n" + "="*60)
+    io.print("⚡ REMINDER: Adjust Power/Fan at FC Midpoint!")
     if is_decaf:
-        print(f"   At ~{format_time(fc_midpoint_time)} / {fc_midpoint_temp}°C: Power: 30, Fan: 90")
+        io.print(f"   At ~{format_time(fc_midpoint_time)} / {fc_midpoint_temp}°C: Power: 30, Fan: 90")
     else:
-        print(f"   At ~{format_time(fc_midpoint_time)} / {fc_midpoint_temp}°C: Power: 35, Fan: 85")
-    print("="*60)
+        io.print(f"   At ~{format_time(fc_midpoint_time)} / {fc_midpoint_temp}°C: Power: 35, Fan: 85")
+    io.print("="*60)
     beep('Purr')  # Alert sound for reminder
 
     # Show next phase
-    print(f"\n⏱️  NEXT: Press ENTER at FIRST CRACK END (expected ~{format_time(phase_estimates['fc_end_time'])} @ {phase_estimates['fc_end_temp']}°C)\n")
-    time.sleep(1)
-
-    stop_timer.clear()
-
-    def run_fc_timer():
-        while not stop_timer.is_set():
-            elapsed = session.elapsed()
-            fc_duration = elapsed - session.fc_start_time
-            display_timer(elapsed, f"First Crack: {format_time(fc_duration)}")
-            time.sleep(0.1)
+    io.print(f"\n⏱️  NEXT: Press ENTER at FIRST CRACK END (expected ~{format_time(phase_estimates['fc_end_time'])} @ {phase_estimates['fc_end_temp']}°C)\n")
+    await asyncio.sleep(1)
 
-    fc_timer_thread = threading.Thread(target=run_fc_timer, daemon=True)
-    fc_timer_thread.start()
+    timer.show(lambda elapsed: f"First Crack: {format_time(elapsed - session.fc_start_time)}")
 
     # Wait for first crack END
-    input()  # User presses ENTER when first crack ends
+    await io.ask()  # User presses ENTER when first crack ends
 
     # Mark the time immediately
-    session.fc_end_time = session.elapsed()
+    fc_end_time = session.elapsed()
 
-    stop_timer.set()
-    fc_timer_thread.join(timeout=0.5)
+    timer.show(None)
 
     # First crack END control point
-    clear_line()
-    print(f"\n⏱  First Crack ENDED at {format_time(session.fc_end_time)}")
+    clear_line(io.file)
+    io.print(f"\n⏱  First Crack ENDED at {format_time(fc_end_time)}")
 
-    fc_end_input = input("Temperature at first crack end (°C or °C:ROR): ").strip()
-    session.fc_end_temp, session.fc_end_ror = parse_temp_ror(fc_end_input)
+    fc_end_input = (await io.ask("Temperature at first crack end (°C or °C:ROR): ")).strip()
+    session.mark_first_crack_end(*parse_temp_ror(fc_end_input), at=fc_end_time)
 
-    print("\n🔊 FIRST CRACK ENDED - Development phase")
+    io.print("\n🔊 FIRST CRACK ENDED - Development phase")
     beep('Bottle')
+    phase_estimates = update_phase_estimates(phase_estimates, forecaster, 'fc_end',
+                                             session.fc_end_time, session.fc_end_temp)
 
     # Reminder to handle prior roast
-    print("\n⚠️  REMINDER: Take care of prior roast beans now!")
+    io.print("\n⚠️  REMINDER: Take care of prior roast beans now!")
     beep('Purr')
 
     # Show next phase
-    print(f"\n⏱️  NEXT: Press ENTER at SECOND CRACK START (expected ~{format_time(phase_estimates['sc_start_time'])} @ {phase_estimates['sc_start_temp']}°C)\n")
-    time.sleep(1)
-
-    stop_timer.clear()
-
-    def run_dev_timer():
-        while not stop_timer.is_set():
-            elapsed = session.elapsed()
-            dev_time = elapsed - session.fc_end_time
-            display_timer(elapsed, f"Development: {format_time(dev_time)}")
-            time.sleep(0.1)
+    io.print(f"\n⏱️  NEXT: Press ENTER at SECOND CRACK START (expected ~{format_time(phase_estimates['sc_start_time'])} @ {phase_estimates['sc_start_temp']}°C)\n")
+    await asyncio.sleep(1)
 
-    dev_timer_thread = threading.Thread(target=run_dev_timer, daemon=True)
-    dev_timer_thread.start()
+    timer.show(lambda elapsed: f"Development: {format_time(elapsed - session.fc_end_time)}")
 
     # Wait for second crack
-    input()  # User presses ENTER
+    await io.ask()  # User presses ENTER
 
     # Mark the time immediately
-    session.sc_start_time = session.elapsed()
+    sc_start_time = session.elapsed()
 
-    stop_timer.set()
-    dev_timer_thread.join(timeout=0.5)
-    clear_line()
+    timer.show(None)
+    clear_line(io.file)
 
     # Second crack control point
-    print(f"\n⏱  Second Crack STARTED at {format_time(session.sc_start_time)}")
-    sc_input = input("Temperature at second crack start (°C or °C:ROR): ").strip()
-    session.sc_start_temp, session.sc_start_ror = parse_temp_ror(sc_input)
+    io.print(f"\n⏱  Second Crack STARTED at {format_time(sc_start_time)}")
+    sc_input = (await io.ask("Temperature at second crack start (°C or °C:ROR): ")).strip()
+    session.mark_second_crack_start(*parse_temp_ror(sc_input), at=sc_start_time)
 
-    print("\n🔊 SECOND CRACK STARTED")
+    io.print("\n🔊 SECOND CRACK STARTED")
     beep('Pop')
+    phase_estimates = update_phase_estimates(phase_estimates, forecaster, 'sc_start',
+                                             session.sc_start_time, session.sc_start_temp)
 
     # Show next phase
-    print(f"\n⏱️  NEXT: Press ENTER when you DROP THE BEANS (expected ~{format_time(phase_estimates['end_time'])} @ {phase_estimates['end_temp']}°C)\n")
-    time.sleep(1)
+    io.print(f"\n⏱️  NEXT: Press ENTER when you DROP THE BEANS (expected ~{format_time(phase_estimates['end_time'])} @ {phase_estimates['end_temp']}°C)\n")
+    await asyncio.sleep(1)
 
-    stop_timer.clear()
-
-    def run_final_timer():
-        while not stop_timer.is_set():
-            elapsed = session.elapsed()
-            sc_time = elapsed - session.sc_start_time
-            display_timer(elapsed, f"After 2nd crack: {format_time(sc_time)}")
-            time.sleep(0.1)
-
-    final_timer_thread = threading.Thread(target=run_final_timer, daemon=True)
-    final_timer_thread.start()
+    timer.show(lambda elapsed: f"After 2nd crack: {format_time(elapsed - session.sc_start_time)}")
 
     # Wait for drop
-    input()
-    session.end_time = session.elapsed()
-    stop_timer.set()
-    final_timer_thread.join(timeout=0.5)
-    clear_line()
-    print(f"\n⏱  Beans dropped at {format_time(session.end_time)}")
+    await io.ask()
+    end_time = session.elapsed()
+    timer.stop()
+    clear_line(io.file)
+    io.print(f"\n⏱  Beans dropped at {format_time(end_time)}")
 
     # Get end temp
-    end_temp = input("End temperature (°C): ").strip()
-    session.end_temp = end_temp
+    session.mark_end((await io.ask("End temperature (°C): ")).strip(), at=end_time)
 
-    print("\n✓ ROAST COMPLETE!")
+    io.print("\n✓ ROAST COMPLETE!")
     beep('Funk')
 
     # Summary
-    print(f"\n=== ROAST SUMMARY ===")
-    print(f"First Crack Start: {format_time(session.fc_start_time)} @ {session.fc_start_temp}°C")
-    print(f"First Crack End: {format_time(session.fc_end_time)} @ {session.fc_end_temp}°C")
+    io.print(f"\n=== ROAST SUMMARY ===")
+    io.print(f"First Crack Start: {format_time(session.fc_start_time)} @ {session.fc_start_temp}°C")
+    io.print(f"First Crack End: {format_time(session.fc_end_time)} @ {session.fc_end_temp}°C")
 
     if session.fc_start_time and session.fc_end_time:
         fc_duration = session.fc_end_time - session.fc_start_time
-        print(f"First Crack Duration: {format_time(fc_duration)}")
+        io.print(f"First Crack Duration: {format_time(fc_duration)}")
 
-    print(f"Total Time: {format_time(session.end_time)} ({session.end_time/60:.1f} min)")
-    print(f"End Temp: {session.end_temp}°C")
+    io.print(f"Total Time: {format_time(session.end_time)} ({session.end_time/60:.1f} min)")
+    io.print(f"End Temp: {session.end_temp}°C")
 
     if session.fc_end_time and session.end_time:
         dev_time = session.end_time - session.fc_end_time
-        print(f"Development Time (after FC): {format_time(dev_time)} ({dev_time/60:.1f} min)")
+        io.print(f"Development Time (after FC): {format_time(dev_time)} ({dev_time/60:.1f} min)")
 
     # Get additional notes
-    print("\n")
-    print("Roast level (1=too light, 5=perfect, 10=burnt):")
-    roast_level = input("Rating (1-10): ").strip()
-    notes = input("Notes (weather, adjustments, observations): ").strip()
+    io.print("\n")
+    io.print("Roast level (1=too light, 5=perfect, 10=burnt):")
+    roast_level = (await io.ask("Rating (1-10): ")).strip()
+    notes = (await io.ask("Notes (weather, adjustments, observations): ")).strip()
 
-    # Save to log
-    save_roast(session, roast_level, notes)
+    # Save to log (a short blocking append, kept off the loop)
+    await asyncio.to_thread(save_roast, session, roast_level, notes)
 
-    print("\n✓ Roast logged successfully!")
-    print(f"Data saved to {ROAST_LOG_FILE}\n")
+    io.print("\n✓ Roast logged successfully!")
+    io.print(f"Data saved to {STORE.path}\n")
 
-def get_milestones(is_decaf):
-    """Get time milestones based on bean type and historical data"""
-    fc_approaching = get_fc_approaching_time(is_decaf)
+def get_milestones(is_decaf, group=None, estimates=None):
+    """Get time milestones based on bean type and historical data (or given phase estimates)"""
+    fc_approaching = get_fc_approaching_time(is_decaf, group, estimates)
 
     return [
         (fc_approaching, f"{format_time(fc_approaching)} - Approaching first crack zone!"),
@@ -743,94 +727,109 @@ def get_milestones(is_decaf):
     ]
 
 def save_roast(session, roast_level, notes):
-    """Save roast to CSV log"""
-    initialize_log()
+    """Save roast to the roast log"""
+    session = session.snapshot()
+    with STORE_LOCK:
+        _append_roast(session, roast_level, notes)
 
-    with open(ROAST_LOG_FILE, 'a', newline='') as f:
-        writer = csv.writer(f)
-        now = datetime.now()
-
-        # Format times as MM:SS
-        yellow_time = format_time(session.yellow_time) if session.yellow_time else ""
-        fc_start_time = format_time(session.fc_start_time) if session.fc_start_time else ""
-        fc_end_time = format_time(session.fc_end_time) if session.fc_end_time else ""
-        sc_start_time = format_time(session.sc_start_time) if session.sc_start_time else ""
-        end_time = format_time(session.end_time) if session.end_time else ""
-        total_time = f"{session.end_time/60:.1f}" if session.end_time else ""
-
-        writer.writerow([
-            now.strftime('%Y-%m-%d'),
-            now.strftime('%H:%M'),
-            session.bean_origin,
-            'Yes' if session.is_decaf else 'No',
-            session.batch_size,
-            session.loading_temp or '',
-            session.turnaround_temp or '',
-            session.early_notes or '',
-            yellow_time,
-            fc_start_time,
-            session.fc_start_temp or '',
-            session.fc_start_ror or '',
-            fc_end_time,
-            session.fc_end_temp or '',
-            session.fc_end_ror or '',
-            sc_start_time,
-            session.sc_start_temp or '',
-            session.sc_start_ror or '',
-            end_time,
-            session.end_temp or '',
-            session.drop_temp or '',
-            total_time,
-            session.target_level,
-            roast_level,
-            notes,
-            ''  # Tasting notes placeholder
-        ])
+def _append_roast(session, roast_level, notes):
+    initialize_log()
+    now = datetime.now()
+
+    # Format times as MM:SS
+    yellow_time = format_time(session.yellow_time) if session.yellow_time else ""
+    fc_start_time = format_time(session.fc_start_time) if session.fc_start_time else ""
+    fc_end_time = format_time(session.fc_end_time) if session.fc_end_time else ""
+    sc_start_time = format_time(session.sc_start_time) if session.sc_start_time else ""
+    end_time = format_time(session.end_time) if session.end_time else ""
+    total_time = f"{session.end_time/60:.1f}" if session.end_time else ""
+
+    AGGREGATES.append({
+        'Date': now.strftime('%Y-%m-%d'),
+        'Time': now.strftime('%H:%M'),
+        'Bean Origin': session.bean_origin,
+        'Decaf': 'Yes' if session.is_decaf else 'No',
+        'Batch Size (lbs)': session.batch_size,
+        'Loading Temp': session.loading_temp or '',
+        'Turnaround Temp': session.turnaround_temp or '',
+        'Early Notes': session.early_notes or '',
+        'Yellow Time': yellow_time,
+        'First Crack Start Time': fc_start_time,
+        'First Crack Start Temp': session.fc_start_temp or '',
+        'FC Start ROR': session.fc_start_ror or '',
+        'First Crack End Time': fc_end_time,
+        'First Crack End Temp': session.fc_end_temp or '',
+        'FC End ROR': session.fc_end_ror or '',
+        'Second Crack Start Time': sc_start_time,
+        'Second Crack Start Temp': session.sc_start_temp or '',
+        'SC Start ROR': session.sc_start_ror or '',
+        'End Time': end_time,
+        'End Temp': session.end_temp or '',
+        'Drop Temp': session.drop_temp or '',
+        'Total Roast Time (min)': total_time,
+        'Target Roast Level': session.target_level,
+        'Roast Level (1-10)': roast_level,
+        'Notes': notes,
+        'Tasting Notes (added later)': ''  # Tasting notes placeholder
+    }, HISTORY.append)
 
 def view_recent_roasts(n=5):
     """View recent roasts"""
-    if not os.path.exists(ROAST_LOG_FILE):
+    if not STORE.exists():
         print("No roast log found yet.")
         return
 
-    with open(ROAST_LOG_FILE, 'r') as f:
-        reader = csv.reader(f)
-        rows = list(reader)
+    recent = [RoastRecord.from_row(r) for r in STORE.last_n(n)]
 
-    if len(rows) <= 1:
+    if not recent:
         print("No roasts logged yet.")
         return
 
-    print(f"\n=== LAST {min(n, len(rows)-1)} ROASTS ===\n")
-    recent = rows[-n:] if len(rows) > n else rows[1:]
+    print(f"\n=== LAST {len(recent)} ROASTS ===\n")
 
-    for row in recent:
-        print(f"Date: {row[0]} {row[1]} | {row[2]} {'(DECAF)' if row[3]=='Yes' else ''}")
-        print(f"  First Crack: {row[6]} @ {row[7]}°C")
-        print(f"  End: {row[10]} @ {row[11]}°C (drop {row[12]}°C)")
-        print(f"  Total: {row[13]} min | Level: {row[14]} → {row[15]}")
-        if row[16]:
-            print(f"  Notes: {row[16]}")
+    for r in recent:
+        total = f"{r.total_minutes:.1f}" if r.total_minutes is not None else ''
+        print(f"Date: {r.date} {r.time} | {r.origin} {'(DECAF)' if r.decaf else ''}")
+        print(f"  First Crack: {format_mmss(r.fc_start_time)} @ {format_value(r.fc_start_temp)}°C")
+        print(f"  End: {format_mmss(r.end_time)} @ {format_value(r.end_temp)}°C (drop {format_value(r.drop_temp)}°C)")
+        print(f"  Total: {total} min | Level: {r.target_level} → {format_value(r.rating)}")
+        if r.notes:
+            print(f"  Notes: {r.notes}")
         print()
 
-def main():
+def run_roast_session():
+    """Run one interactive roast session on the terminal"""
+    run_sessions(roast_session(TerminalIO()))
+
+async def menu(io):
+    """The main menu, prompting through `io`"""
     while True:
-        print("\n=== COFFEE ROAST TRACKER ===\n")
-        print("1. Start new roast session")
-        print("2. View recent roasts")
-        print("3. Exit")
+        io.print("\n=== COFFEE ROAST TRACKER ===\n")
+        io.print("1. Start new roast session")
+        io.print("2. View recent roasts")
+        io.print("3. Exit")
 
-        choice = input("\nChoice: ").strip()
+        choice = (await io.ask("\nChoice: ")).strip()
 
         if choice == '1':
-            run_roast_session()
+            await roast_session(io)
         elif choice == '2':
-            n = input("How many recent roasts to show (default: 5): ").strip()
+            n = (await io.ask("How many recent roasts to show (default: 5): ")).strip()
             view_recent_roasts(int(n) if n else 5)
         elif choice == '3':
             break
         else:
-            print("Invalid choice")
+            io.print("Invalid choice")
+
+def main():
+    io = TerminalIO()
+    try:
+        run_sessions(menu(io))
+    except EOFError:
+        pass  # Input closed: leave as Exit would
+    finally:
+        io.close()
+        ALERTS.wait(timeout=2.0)  # Let the last alert finish before the process exits
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Compact typed roast record shared by all tools
+Parses a V1 or V2 log row once; times are seconds, temps/ROR/rating floats, None when missing
+SCHEMA maps every canonical field to its V2 column and V1 aliases, so readers never repeat the alias fallbacks
+
+Run directly to compare its memory use against csv.DictReader dicts:
+    python3 roast_record.py [rows]
+"""
+import functools
+import sys
+
+def parse_time_to_seconds(time_str):
+    """Convert MM:SS to seconds"""
+    if not time_str or ':' not in time_str:
+        return None
+    try:
+        parts = time_str.split(':')
+        return int(parts[0]) * 60 + int(parts[1])
+    except ValueError:
+        return None
+
+def parse_temp(temp_str):
+    """Parse temperature value"""
+    if not temp_str:
+        return None
+    try:
+        return float(temp_str)
+    except ValueError:
+        return None
+
+def _decaf(value):
+    return value.strip().lower() == 'yes'
+
+# Canonical field -> (parser, log columns): the V2 column first, then its V1 aliases.
+# Parsers take the raw text ('' when missing) and return the typed value (None when missing);
+# short repeated text is interned so thousands of roasts share one string object, None keeps the text as is.
+SCHEMA = (
+    ('date', sys.intern, ('Date',)),
+    ('time', sys.intern, ('Time',)),
+    ('origin', sys.intern, ('Bean Origin',)),
+    ('decaf', _decaf, ('Decaf',)),
+    ('batch_size', sys.intern, ('Batch Size (lbs)',)),
+    ('loading_temp', parse_temp, ('Loading Temp',)),
+    ('turnaround_temp', parse_temp, ('Turnaround Temp',)),
+    ('early_notes', None, ('Early Notes',)),
+    ('yellow_time', None, ('Yellow Time',)),  # Sometimes holds a note in old rows
+    ('fc_start_time', parse_time_to_seconds, ('First Crack Start Time', 'First Crack Time')),
+    ('fc_start_temp', parse_temp, ('First Crack Start Temp', 'First Crack Temp')),
+    ('fc_start_ror', parse_temp, ('FC Start ROR',)),
+    ('fc_end_time', parse_time_to_seconds, ('First Crack End Time',)),
+    ('fc_end_temp', parse_temp, ('First Crack End Temp',)),
+    ('fc_end_ror', parse_temp, ('FC End ROR',)),
+    ('sc_start_time', parse_time_to_seconds, ('Second Crack Start Time', 'Second Crack Time')),
+    ('sc_start_temp', parse_temp, ('Second Crack Start Temp', 'Second Crack Temp')),
+    ('sc_start_ror', parse_temp, ('SC Start ROR',)),
+    ('end_time', parse_time_to_seconds, ('End Time',)),
+    ('end_temp', parse_temp, ('End Temp',)),
+    ('drop_temp', parse_temp, ('Drop Temp',)),
+    ('total_minutes', parse_temp, ('Total Roast Time (min)',)),
+    ('target_level', sys.intern, ('Target Roast Level',)),
+    ('rating', parse_temp, ('Roast Level (1-10)',)),
+    ('notes', None, ('Notes',)),
+    ('tasting_notes', None, ('Tasting Notes (added later)',)),
+)
+
+def _plan(sources):
+    """
+    Split SCHEMA into (field, parser, source) for fields read from one place
+    and (field, parser, sources) for fields with aliases to fall back on.
+
+    sources maps each field to its sources in order (positions or column
+    names); a field with none always reads ''. Untyped fields get str, so
+    every entry has a parser.
+    """
+    single, aliased = [], []
+    for field, parse, _ in SCHEMA:
+        if len(sources[field]) == 1:
+            single.append((field, parse or str, sources[field][0]))
+        else:
+            aliased.append((field, parse or str, sources[field]))
+    return tuple(single), tuple(aliased)
+
+@functools.lru_cache(maxsize=32)
+def record_parser(header):
+    """
+    A function turning one row's csv.reader field list into a RoastRecord, for logs with this header.
+
+    The positions feeding each canonical field (V2 column, else its V1
+    aliases) are resolved once per header tuple, so a row is parsed with
+    list indexing only - no column names and no dict per row. Short rows
+    are padded, as csv.DictReader does.
+    """
+    positions = {column: i for i, column in enumerate(header)}  # Last wins, as in a DictReader dict
+    single, aliased = _plan({field: tuple(positions[c] for c in columns if c in positions)
+                             for field, _, columns in SCHEMA})
+    width = len(header)
+
+    def parse_fields(fields):
+        if len(fields) < width:
+            fields = fields + [''] * (width - len(fields))
+        record = object.__new__(RoastRecord)
+        for field, parse, i in single:
+            setattr(record, field, parse(fields[i]))
+        for field, parse, indexes in aliased:
+            value = ''
+            for i in indexes:
+                value = fields[i]
+                if value:
+                    break
+            setattr(record, field, parse(value))
+        return record
+    return parse_fields
+
+def format_mmss(seconds):
+    """Seconds back to the log's MM:SS text ('' when missing)"""
+    if seconds is None:
+        return ''
+    return f"{int(seconds // 60):02d}:{int(seconds % 60):02d}"
+
+def format_value(value):
+    """Typed number back to log text: 190.0 -> '190', None -> ''"""
+    return '' if value is None else f"{value:g}"
+
+class RoastRecord:
+    """
+    One roast with typed fields.
+
+    __slots__ keeps each record to a fixed-size object with no per-instance
+    dict, instead of a 26-key DictReader dict of strings.
+    """
+    __slots__ = (
+        'date', 'time', 'origin', 'decaf', 'batch_size',
+        'loading_temp', 'turnaround_temp', 'early_notes', 'yellow_time',
+        'fc_start_time', 'fc_start_temp', 'fc_start_ror',
+        'fc_end_time', 'fc_end_temp', 'fc_end_ror',
+        'sc_start_time', 'sc_start_temp', 'sc_start_ror',
+        'end_time', 'end_temp', 'drop_temp', 'total_minutes',
+        'target_level', 'rating', 'notes', 'tasting_notes',
+    )
+
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            setattr(self, name, fields.get(name))
+
+    @classmethod
+    def from_row(cls, row):
+        """Build from a V1 or V2 log row (dict keyed by column name); the first non-empty column of each field wins"""
+        record = object.__new__(cls)
+        for field, parse, column in _ROW_SINGLE:
+            setattr(record, field, parse(row.get(column) or ''))
+        for field, parse, columns in _ROW_ALIASED:
+            value = ''
+            for column in columns:
+                value = row.get(column) or ''
+                if value:
+                    break
+            setattr(record, field, parse(value))
+        return record
+
+    @classmethod
+    def from_fields(cls, header, fields):
+        """Build from a csv.reader field list and its log's header (see record_parser)"""
+        return record_parser(tuple(header))(fields)
+
+    def to_row(self):
+        """Back to a V2 log row (dict of strings)"""
+        return {
+            'Date': self.date,
+            'Time': self.time,
+            'Bean Origin': self.origin,
+            'Decaf': 'Yes' if self.decaf else 'No',
+            'Batch Size (lbs)': self.batch_size,
+            'Loading Temp': format_value(self.loading_temp),
+            'Turnaround Temp': format_value(self.turnaround_temp),
+            'Early Notes': self.early_notes,
+            'Yellow Time': self.yellow_time,
+            'First Crack Start Time': format_mmss(self.fc_start_time),
+            'First Crack Start Temp': format_value(self.fc_start_temp),
+            'FC Start ROR': format_value(self.fc_start_ror),
+            'First Crack End Time': format_mmss(self.fc_end_time),
+            'First Crack End Temp': format_value(self.fc_end_temp),
+            'FC End ROR': format_value(self.fc_end_ror),
+            'Second Crack Start Time': format_mmss(self.sc_start_time),
+            'Second Crack Start Temp': format_value(self.sc_start_temp),
+            'SC Start ROR': format_value(self.sc_start_ror),
+            'End Time': format_mmss(self.end_time),
+            'End Temp': format_value(self.end_temp),
+            'Drop Temp': format_value(self.drop_temp),
+            'Total Roast Time (min)': format_value(self.total_minutes),
+            'Target Roast Level': self.target_level,
+            'Roast Level (1-10)': format_value(self.rating),
+            'Notes': self.notes,
+            'Tasting Notes (added later)': self.tasting_notes,
+        }
+
+    def __repr__(self):
+        return f"RoastRecord({self.date} {self.time} {self.origin}{' decaf' if self.decaf else ''})"
+
+# from_row's plan: each field's column names, V2 first
+_ROW_SINGLE, _ROW_ALIASED = _plan({field: columns for field, _, columns in SCHEMA})
+
+def measure_memory(num_rows=100000):
+    """Bytes held by num_rows DictReader-style dicts vs the same rows as RoastRecords"""
+    import csv
+    import io
+    import tracemalloc
+
+    sample = {
+        'Date': '2025-11-07', 'Time': '15:20', 'Bean Origin': 'Colombian', 'Decaf': 'Yes',
+        'Batch Size (lbs)': '1', 'Loading Temp': '201', 'Turnaround Temp': '107', 'Early Notes': '',
+        'Yellow Time': '', 'First Crack Start Time': '07:06', 'First Crack Start Temp': '190',
+        'FC Start ROR': '13', 'First Crack End Time': '08:44', 'First Crack End Temp': '203',
+        'FC End ROR': '8', 'Second Crack Start Time': '11:31', 'Second Crack Start Temp': '217',
+        'SC Start ROR': '4', 'End Time': '12:28', 'End Temp': '220', 'Drop Temp': '',
+        'Total Roast Time (min)': '12.5', 'Target Roast Level': 'Medium-Dark',
+        'Roast Level (1-10)': '8', 'Notes': 'bit slow on the tagging', 'Tasting Notes (added later)': '',
+    }
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=list(sample))
+    writer.writeheader()
+    for _ in range(num_rows):
+        writer.writerow(sample)
+    text = buffer.getvalue()
+
+    tracemalloc.start()
+    rows = list(csv.DictReader(io.StringIO(text)))
+    dict_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    tracemalloc.start()
+    records = [RoastRecord.from_row(r) for r in csv.DictReader(io.StringIO(text))]
+    record_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    del rows, records
+    return dict_bytes, record_bytes
+
+if __name__ == "__main__":
+    num_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    dict_bytes, record_bytes = measure_memory(num_rows)
+    print(f"{num_rows} roasts:")
+    print(f"  DictReader dicts: {dict_bytes / 1e6:8.1f} MB ({dict_bytes / num_rows:.0f} bytes/roast)")
+    print(f"  RoastRecord:      {record_bytes / 1e6:8.1f} MB ({record_bytes / num_rows:.0f} bytes/roast)")
+    print(f"  Reduction:        {100 * (1 - record_bytes / dict_bytes):.0f}%")
@@ -2,83 +2,98 @@
 """
 Coffee Roast Statistics and Analysis
 Analyze your roasting history to find patterns and improve consistency
+
+Limit the report to a date range (YYYY-MM-DD, inclusive):
+    python3 roast_stats.py [since] [until]
 """
 
-import csv
 import os
+import sys
 from datetime import datetime
 from collections import defaultdict
 
-ROAST_LOG_FILE = "roast_log.csv"
+from columnar_cache import is_missing, open_columns
+from log_archive import archived_range, load_index
+from parallel_scan import load_roasts as scan_roasts
+from roast_record import RoastRecord, format_mmss, format_value
+from roast_store import CsvRoastStore, open_store
 
-def load_roasts():
-    """Load all roasts from CSV"""
-    if not os.path.exists(ROAST_LOG_FILE):
+def load_roasts(store=None, since=None, until=None):
+    """Load roasts from the roast store, optionally only those dated since/until"""
+    store = store or open_store()
+    if not store.exists():
         print(f"No roast log found. Run roast_logger.py first to create logs.")
         return []
 
-    with open(ROAST_LOG_FILE, 'r') as f:
-        reader = csv.DictReader(f)
-        return list(reader)
-
-def parse_time(time_str):
-    """Convert mm:ss to total minutes"""
-    if not time_str or ':' not in time_str:
-        return None
-    try:
-        parts = time_str.split(':')
-        return float(parts[0]) + float(parts[1])/60
-    except:
-        return None
+    if since or until:
+        return [RoastRecord.from_row(r) for r in store.load_range(since, until)]
+    if isinstance(store, CsvRoastStore):
+        archived = [RoastRecord.from_row(r) for r in archived_range(store.path)]
+        return archived + scan_roasts(store.path)  # mmap + process pool on large logs
+    return [RoastRecord.from_row(r) for r in store.load_all()]
 
-def parse_temp(temp_str):
-    """Parse temperature string to float"""
-    if not temp_str:
-        return None
-    try:
-        return float(temp_str)
-    except:
-        return None
-
-def compare_decaf_vs_regular(roasts):
-    """Compare decaf vs regular bean performance"""
+def compare_decaf_vs_regular(roasts=None, columns=None):
+    """Compare decaf vs regular bean performance (from the columnar sidecar when given, else parsed roasts)"""
     print("\n=== DECAF vs REGULAR COMPARISON ===\n")
 
-    decaf_roasts = [r for r in roasts if r['Decaf'].lower() == 'yes']
-    regular_roasts = [r for r in roasts if r['Decaf'].lower() == 'no']
+    if columns is not None:
+        decaf_count = sum(columns.column('decaf'))
+        regular_count = len(columns) - decaf_count
+    else:
+        decaf_roasts = [r for r in roasts if r.decaf]
+        regular_roasts = [r for r in roasts if not r.decaf]
+        decaf_count, regular_count = len(decaf_roasts), len(regular_roasts)
 
-    if not decaf_roasts:
+    if not decaf_count:
         print("No decaf roasts logged yet.")
     else:
-        print(f"Decaf roasts: {len(decaf_roasts)}")
-        analyze_group(decaf_roasts, "DECAF")
+        print(f"Decaf roasts: {decaf_count}")
+        if columns is not None:
+            analyze_columns(columns, True, "DECAF")
+        else:
+            analyze_group(decaf_roasts, "DECAF")
 
     print()
 
-    if not regular_roasts:
+    if not regular_count:
         print("No regular roasts logged yet.")
     else:
-        print(f"Regular roasts: {len(regular_roasts)}")
-        analyze_group(regular_roasts, "REGULAR")
+        print(f"Regular roasts: {regular_count}")
+        if columns is not None:
+            analyze_columns(columns, False, "REGULAR")
+        else:
+            analyze_group(regular_roasts, "REGULAR")
 
 def analyze_group(roasts, label):
     """Analyze statistics for a group of roasts"""
-    # First crack start times
-    fc_times = [parse_time(r.get('First Crack Start Time') or r.get('First Crack Time', '')) for r in roasts]
-    fc_times = [t for t in fc_times if t is not None]
+    # First crack start times (minutes)
+    fc_times = [r.fc_start_time / 60 for r in roasts if r.fc_start_time is not None]
 
     # First crack start temps
-    fc_temps = [parse_temp(r.get('First Crack Start Temp') or r.get('First Crack Temp', '')) for r in roasts]
-    fc_temps = [t for t in fc_temps if t is not None]
+    fc_temps = [r.fc_start_temp for r in roasts if r.fc_start_temp is not None]
 
-    # Total times
-    total_times = [parse_time(r['End Time']) for r in roasts]
-    total_times = [t for t in total_times if t is not None]
+    # Total times (minutes)
+    total_times = [r.end_time / 60 for r in roasts if r.end_time is not None]
 
     # End temps
-    end_temps = [parse_temp(r['End Temp']) for r in roasts]
-    end_temps = [t for t in end_temps if t is not None]
+    end_temps = [r.end_temp for r in roasts if r.end_temp is not None]
+
+    print_group_stats(label, fc_times, fc_temps, total_times, end_temps)
+
+def analyze_columns(columns, is_decaf, label):
+    """Same statistics as analyze_group, read from the typed columnar sidecar"""
+    flag = 1 if is_decaf else 0
+    rows = [i for i, decaf in enumerate(columns.column('decaf')) if decaf == flag]
 
+    def values(name, scale=1):
+        column = columns.column(name)
+        return [column[i] / scale for i in rows if not is_missing(column[i])]
+
+    print_group_stats(label, values('fc_start_time', 60), values('fc_start_temp'),
+                      values('end_time', 60), values('end_temp'))
+
+def print_group_stats(label, fc_times, fc_temps, total_times, end_temps):
+    """Print averages/ranges for one group (times in minutes)"""
     print(f"\n{label} Statistics:")
 
     if fc_times:
@@ -116,14 +131,12 @@ def show_trends(roasts):
 
     print("Last 5 roasts:")
     for r in recent:
-        date = r['Date']
-        origin = r['Bean Origin']
-        decaf = "(DECAF)" if r['Decaf'].lower() == 'yes' else ""
-        total = r['Total Roast Time (min)'] or r['End Time']
-        end_temp = r['End Temp']
-        level = r['Actual Color'] or r['Target Roast Level']
-
-        print(f"  {date}: {origin} {decaf}")
+        decaf = "(DECAF)" if r.decaf else ""
+        total = f"{r.total_minutes:.1f}" if r.total_minutes is not None else format_mmss(r.end_time)
+        end_temp = format_value(r.end_temp)
+        level = format_value(r.rating) or r.target_level
+
+        print(f"  {r.date}: {r.origin} {decaf}")
         print(f"    Time: {total} | End: {end_temp}°F | Result: {level}")
 
 def consistency_check(roasts):
@@ -137,18 +150,15 @@ def consistency_check(roasts):
     # Group by bean type (decaf vs regular)
     groups = defaultdict(list)
     for r in roasts:
-        key = f"{r['Bean Origin']}_{r['Decaf']}"
-        groups[key].append(r)
+        groups[(r.origin, r.decaf)].append(r)
 
-    for key, group_roasts in groups.items():
+    for (origin, is_decaf), group_roasts in groups.items():
         if len(group_roasts) < 2:
             continue
 
-        origin, is_decaf = key.rsplit('_', 1)
-        label = f"{origin} {'(Decaf)' if is_decaf == 'Yes' else ''}"
+        label = f"{origin} {'(Decaf)' if is_decaf else ''}"
 
-        total_times = [parse_time(r['End Time']) for r in group_roasts]
-        total_times = [t for t in total_times if t is not None]
+        total_times = [r.end_time / 60 for r in group_roasts if r.end_time is not None]
 
         if len(total_times) >= 2:
             avg = sum(total_times) / len(total_times)
@@ -167,15 +177,47 @@ def consistency_check(roasts):
                 print(f"  ⚠ High variability - review roast notes")
         print()
 
-def main():
-    roasts = load_roasts()
+def load_columns(store=None):
+    """Typed columns for a CSV log (None for other stores, or if part of the log is archived)"""
+    store = store or open_store()
+    if not isinstance(store, CsvRoastStore) or not os.path.exists(store.path):
+        return None
+    if load_index(store.path) is not None:
+        return None  # The sidecar only covers the live file
+    try:
+        return open_columns(store.path)
+    except OSError:
+        return None
 
-    if not roasts:
+def main():
+    since = sys.argv[1] if len(sys.argv) > 1 else None
+    until = sys.argv[2] if len(sys.argv) > 2 else None
+    store = open_store()
+
+    # Whole-log reports come from the sidecar columns; roasts are only parsed when a report needs them
+    columns = None if since or until else load_columns(store)
+    roasts = None if columns is not None else load_roasts(store, since, until)
+    total = len(columns) if columns is not None else len(roasts)
+
+    def all_roasts():
+        nonlocal roasts
+        if roasts is None:
+            roasts = load_roasts(store)
+        return roasts
+
+    def recent_roasts():
+        if roasts is not None:
+            return roasts
+        return [RoastRecord.from_row(r) for r in store.last_n(5)]
+
+    if not total:
         print("No roasts found. Use roast_logger.py to start logging!")
         return
 
     print(f"\n=== COFFEE ROAST STATISTICS ===")
-    print(f"Total roasts logged: {len(roasts)}")
+    if since or until:
+        print(f"Date range: {since or 'start'} to {until or 'today'}")
+    print(f"Total roasts logged: {total}")
 
     while True:
         print("\n1. Compare Decaf vs Regular")
@@ -187,15 +229,15 @@ def main():
         choice = input("\nChoice: ").strip()
 
         if choice == '1':
-            compare_decaf_vs_regular(roasts)
+            compare_decaf_vs_regular(roasts, columns)
         elif choice == '2':
-            show_trends(roasts)
+            show_trends(recent_roasts())
         elif choice == '3':
-            consistency_check(roasts)
+            consistency_check(all_roasts())
         elif choice == '4':
-            compare_decaf_vs_regular(roasts)
-            show_trends(roasts)
-            consistency_check(roasts)
+            compare_decaf_vs_regular(roasts, columns)
+            show_trends(recent_roasts())
+            consistency_check(all_roasts())
         elif choice == '5':
             break
         else:
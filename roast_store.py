@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+Roast history storage
+One RoastStore interface with a CSV backend (roast_log.csv) and a SQLite backend (roast_log.db)
+
+Pick the backend with the ROAST_STORE environment variable ('csv', 'sqlite' or 'sharded').
+Copy an existing CSV log into SQLite with:  python3 roast_store.py import
+Split it into monthly shards with:          python3 log_shards.py split
+"""
+import csv
+import os
+import sqlite3
+import sys
+import threading
+
+from log_archive import archived_last_n, archived_range, iter_log_lines, load_index, recover_archive
+from log_tail import read_header, tail_group_rows, tail_records
+from log_writer import FSYNC_DEFAULT, LogWriter
+
+ROAST_LOG_FILE = "roast_log.csv"
+ROAST_DB_FILE = "roast_log.db"
+ROAST_STORE = os.environ.get('ROAST_STORE', 'csv')
+
+# V2 column layout (see TECHNICAL.md)
+LOG_COLUMNS = [
+    'Date', 'Time', 'Bean Origin', 'Decaf', 'Batch Size (lbs)',
+    'Loading Temp', 'Turnaround Temp', 'Early Notes',
+    'Yellow Time', 'First Crack Start Time', 'First Crack Start Temp', 'FC Start ROR',
+    'First Crack End Time', 'First Crack End Temp', 'FC End ROR',
+    'Second Crack Start Time', 'Second Crack Start Temp', 'SC Start ROR',
+    'End Time', 'End Temp', 'Drop Temp', 'Total Roast Time (min)', 'Target Roast Level',
+    'Roast Level (1-10)', 'Notes', 'Tasting Notes (added later)'
+]
+
+def decaf_value(is_decaf):
+    """Value stored in the Decaf column"""
+    return 'Yes' if is_decaf else 'No'
+
+class RoastStore:
+    """
+    Storage interface for roast history.
+
+    Rows are dicts keyed by column name with string values, exactly as
+    csv.DictReader returns them, and are always returned oldest first.
+    """
+    path = None
+
+    def exists(self):
+        """True if any roast history has been stored"""
+        raise NotImplementedError
+
+    def initialize(self):
+        """Create the empty log if it doesn't exist"""
+        raise NotImplementedError
+
+    def append(self, row):
+        """Store one roast"""
+        self.append_many([row])
+
+    def append_many(self, rows):
+        """Store several roasts in one write"""
+        raise NotImplementedError
+
+    def load_all(self):
+        """Every stored roast"""
+        raise NotImplementedError
+
+    def load_range(self, since=None, until=None):
+        """Roasts dated between since and until (YYYY-MM-DD, inclusive; None = open-ended)"""
+        rows = self.load_all()
+        if since:
+            rows = [r for r in rows if (r.get('Date') or '') >= since]
+        if until:
+            rows = [r for r in rows if (r.get('Date') or '') <= until]
+        return rows
+
+    def last_n(self, n, is_decaf=None):
+        """The last n roasts, optionally only decaf (True) or regular (False)"""
+        raise NotImplementedError
+
+    def filter(self, is_decaf=None, origin=None):
+        """All roasts matching the given Decaf flag and/or Bean Origin"""
+        raise NotImplementedError
+
+class CsvRoastStore(RoastStore):
+    """
+    The original roast_log.csv file, written through a crash-safe LogWriter.
+
+    Rows moved to the compressed archive (log_archive.py) are read back
+    ahead of the live rows, so readers always see the whole history.
+    """
+
+    def __init__(self, path=ROAST_LOG_FILE, fsync=FSYNC_DEFAULT):
+        self.path = path
+        self.writer = LogWriter(path, fsync=fsync)
+        try:
+            self.writer.recover()  # Drop a torn row left by a crash mid-save
+            recover_archive(path)  # Finish or undo an interrupted archive run
+        except OSError:
+            pass
+
+    def exists(self):
+        return os.path.exists(self.path) or load_index(self.path) is not None
+
+    def initialize(self):
+        self.writer.initialize(LOG_COLUMNS)
+
+    def append_many(self, rows):
+        self.initialize()
+        header, _ = read_header(self.path)
+        self.writer.append_many([[row.get(column) or '' for column in header] for row in rows])
+
+    def load_all(self):
+        if not self.exists():
+            return []
+        return list(csv.DictReader(iter_log_lines(self.path, newline='')))
+
+    def load_range(self, since=None, until=None):
+        if not self.exists():
+            return []
+        rows = archived_range(self.path, since, until)
+        if os.path.exists(self.path):
+            with open(self.path, 'r', newline='') as f:
+                live = list(csv.DictReader(f))
+            rows.extend(r for r in live
+                        if (not since or (r.get('Date') or '') >= since)
+                        and (not until or (r.get('Date') or '') <= until))
+        return rows
+
+    def last_n(self, n, is_decaf=None):
+        if not self.exists():
+            return []
+        rows = []
+        if os.path.exists(self.path):
+            if is_decaf is None:
+                header, _ = read_header(self.path)
+                rows = [dict(zip(header, fields)) for fields in tail_records(self.path, n)]
+            else:
+                rows = tail_group_rows(self.path, decaf_value(is_decaf), n)
+        if len(rows) < n:
+            decaf = None if is_decaf is None else decaf_value(is_decaf)
+            rows = archived_last_n(self.path, n - len(rows), decaf) + rows
+        return rows
+
+    def filter(self, is_decaf=None, origin=None):
+        rows = self.load_all()
+        if is_decaf is not None:
+            rows = [r for r in rows if (r.get('Decaf') or '').lower() == decaf_value(is_decaf).lower()]
+        if origin is not None:
+            rows = [r for r in rows if (r.get('Bean Origin') or '').lower() == origin.lower()]
+        return rows
+
+def _quote(column):
+    """Quote a column name for SQL ("Batch Size (lbs)" etc.)"""
+    return '"' + column.replace('"', '""') + '"'
+
+class SqliteRoastStore(RoastStore):
+    """
+    SQLite database with one TEXT column per CSV column.
+
+    Decaf and Bean Origin compare case-insensitively (like the CSV code's
+    .lower() checks) and are indexed, so group filters and "last N" queries
+    are index lookups rather than full scans.
+
+    The one connection may be used from any thread (sessions load and save
+    from worker threads); a lock keeps its statements one at a time.
+    """
+
+    def __init__(self, path=ROAST_DB_FILE):
+        self.path = path
+        self._conn = None
+        self._lock = threading.RLock()  # Around every use of self._conn
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def _connect(self):
+        with self._lock:
+            if self._conn is None:
+                self._conn = sqlite3.connect(self.path, check_same_thread=False)
+                self.initialize()
+            return self._conn
+
+    def initialize(self):
+        columns = []
+        for column in LOG_COLUMNS:
+            collate = ' COLLATE NOCASE' if column in ('Decaf', 'Bean Origin') else ''
+            columns.append(f"{_quote(column)} TEXT NOT NULL DEFAULT ''{collate}")
+        with self._lock, (self._conn or self._connect()) as conn:
+            conn.execute(f"CREATE TABLE IF NOT EXISTS roasts (id INTEGER PRIMARY KEY AUTOINCREMENT, {', '.join(columns)})")
+            conn.execute('CREATE INDEX IF NOT EXISTS roasts_decaf_date ON roasts ("Decaf", "Date", "Time")')
+            conn.execute('CREATE INDEX IF NOT EXISTS roasts_origin ON roasts ("Bean Origin")')
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def append_many(self, rows):
+        placeholders = ', '.join('?' for _ in LOG_COLUMNS)
+        sql = f"INSERT INTO roasts ({', '.join(_quote(c) for c in LOG_COLUMNS)}) VALUES ({placeholders})"
+        with self._lock, self._connect() as conn:
+            conn.executemany(sql, [[row.get(c) or '' for c in LOG_COLUMNS] for row in rows])
+
+    def _select(self, where='', params=(), order='ASC', limit=None):
+        sql = f"SELECT {', '.join(_quote(c) for c in LOG_COLUMNS)} FROM roasts"
+        if where:
+            sql += f" WHERE {where}"
+        sql += f' ORDER BY "Date" {order}, "Time" {order}, id {order}'
+        if limit is not None:
+            sql += " LIMIT ?"
+            params = tuple(params) + (limit,)
+        with self._lock:
+            return [dict(zip(LOG_COLUMNS, values)) for values in self._connect().execute(sql, params)]
+
+    def load_all(self):
+        if not self.exists():
+            return []
+        return self._select()
+
+    def load_range(self, since=None, until=None):
+        if not self.exists():
+            return []
+        clauses = []
+        params = []
+        if since:
+            clauses.append('"Date" >= ?')
+            params.append(since)
+        if until:
+            clauses.append('"Date" <= ?')
+            params.append(until)
+        return self._select(' AND '.join(clauses), params)
+
+    def last_n(self, n, is_decaf=None):
+        if not self.exists() or n <= 0:
+            return []
+        if is_decaf is None:
+            rows = self._select(order='DESC', limit=n)
+        else:
+            rows = self._select('"Decaf" = ?', (decaf_value(is_decaf),), order='DESC', limit=n)
+        rows.reverse()
+        return rows
+
+    def filter(self, is_decaf=None, origin=None):
+        if not self.exists():
+            return []
+        clauses = []
+        params = []
+        if is_decaf is not None:
+            clauses.append('"Decaf" = ?')
+            params.append(decaf_value(is_decaf))
+        if origin is not None:
+            clauses.append('"Bean Origin" = ?')
+            params.append(origin)
+        return self._select(' AND '.join(clauses), params)
+
+def open_store(backend=None, path=None):
+    """Open the configured roast store (ROAST_STORE env var, default csv)"""
+    backend = (backend or ROAST_STORE).lower()
+    if backend == 'sqlite':
+        return SqliteRoastStore(path or ROAST_DB_FILE)
+    if backend == 'csv':
+        return CsvRoastStore(path or ROAST_LOG_FILE)
+    if backend == 'sharded':
+        from log_shards import ROAST_SHARD_DIR, ShardedRoastStore  # log_shards builds on this module
+        return ShardedRoastStore(path or ROAST_SHARD_DIR)
+    raise ValueError(f"Unknown roast store '{backend}' (expected 'csv', 'sqlite' or 'sharded')")
+
+def import_csv_to_sqlite(csv_path=ROAST_LOG_FILE, db_path=ROAST_DB_FILE):
+    """Copy every row of a CSV log into the SQLite store"""
+    rows = CsvRoastStore(csv_path).load_all()
+    db = SqliteRoastStore(db_path)
+    if db.exists() and db.load_all():
+        print(f"{db_path} already has roasts - not importing twice.")
+        return 0
+    db.append_many(rows)
+    db.close()
+    return len(rows)
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 2 and sys.argv[1] == 'import':
+        count = import_csv_to_sqlite()
+        print(f"✓ Imported {count} roasts from {ROAST_LOG_FILE} into {ROAST_DB_FILE}")
+        print("  Set ROAST_STORE=sqlite to use it.")
+    else:
+        print("Usage: python3 roast_store.py import")
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+asyncio engine for roast sessions
+Each session is a coroutine that prompts through its own IO object; stdin is read without blocking the
+loop, so timer ticks, alerts and saves keep running while a prompt waits, and one process can host
+several sessions (e.g. one per station) on the same loop
+"""
+import asyncio
+import codecs
+import collections
+import io
+import os
+import sys
+import threading
+
+class TerminalIO:
+    """
+    Prompts and output on the process's terminal.
+
+    Lines are read as they arrive (a reader on stdin's fd, or a daemon
+    thread where the loop can't watch it) and wait in order, as typed-ahead
+    lines do for input(), even across event loops. ask() raises EOFError at
+    end of input.
+    """
+
+    def __init__(self, stdin=None, file=None):
+        self.stdin = stdin or sys.stdin
+        self.file = file or sys.stdout
+        self._lines = collections.deque()  # Complete lines; None marks end of input
+        self._guard = threading.Lock()  # Between the loop and the fallback reader thread
+        self._loop = None
+        self._ready = None  # Event on self._loop, set when a line arrives
+        self._fd = None
+        self._thread = None
+        self._decoder = codecs.getincrementaldecoder('utf-8')('replace')
+        self._partial = ''
+
+    def print(self, *args, **kwargs):
+        print(*args, file=self.file, **kwargs)
+
+    async def ask(self, prompt=''):
+        """The next line of input without its newline, like input(prompt)"""
+        self._attach()
+        self.print(prompt, end='', flush=True)
+        while not self._lines:
+            self._ready.clear()
+            await self._ready.wait()
+        if self._lines[0] is None:
+            raise EOFError
+        return self._lines.popleft()
+
+    def _attach(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        self.close()
+        with self._guard:
+            self._loop, self._ready = loop, asyncio.Event()
+        if self._thread is not None:
+            return
+        try:
+            self._fd = self.stdin.fileno()
+            loop.add_reader(self._fd, self._on_readable)
+        except (AttributeError, OSError, ValueError, NotImplementedError, io.UnsupportedOperation):
+            self._fd = None
+            self._thread = threading.Thread(target=self._read_lines, daemon=True)
+            self._thread.start()
+
+    def _push(self, line):
+        self._lines.append(line)
+        self._ready.set()
+
+    def _on_readable(self):
+        data = os.read(self._fd, 4096)
+        if not data:
+            self._loop.remove_reader(self._fd)
+            if self._partial:
+                self._push(self._partial)
+            self._push(None)
+            return
+        *lines, self._partial = (self._partial + self._decoder.decode(data)).split('\n')
+        for line in lines:
+            self._push(line.rstrip('\r'))
+
+    def _read_lines(self):
+        while True:
+            line = self.stdin.readline()
+            line = line.rstrip('\r\n') if line else None
+            with self._guard:
+                if self._loop is None:
+                    self._lines.append(line)  # Picked up by the next ask()
+                else:
+                    self._loop.call_soon_threadsafe(self._push, line)
+            if line is None:
+                return
+
+    def close(self):
+        """Stop watching stdin from the current loop; unread lines are kept for the next one"""
+        with self._guard:
+            if self._loop is not None and self._fd is not None and not self._loop.is_closed():
+                self._loop.remove_reader(self._fd)
+            self._loop = None
+
+class QueueIO:
+    """
+    Scripted or remote input for a hosted session: feed() lines in, output goes to `file`.
+
+    Handy for driving a second station from another source, or a session
+    from a test, alongside the terminal's own session.
+    """
+
+    def __init__(self, lines=(), file=None):
+        self.file = file if file is not None else io.StringIO()
+        self._pending = list(lines)
+        self._lines = None
+
+    def print(self, *args, **kwargs):
+        print(*args, file=self.file, **kwargs)
+
+    def feed(self, line):
+        """Queue a line of input (None ends the input)"""
+        if self._lines is None:
+            self._pending.append(line)
+        else:
+            self._lines.put_nowait(line)
+
+    async def ask(self, prompt=''):
+        if self._lines is None:
+            self._lines = asyncio.Queue()
+            for line in self._pending:
+                self._lines.put_nowait(line)
+        self.print(prompt, end='', flush=True)
+        line = await self._lines.get()
+        if line is None:
+            self._lines.put_nowait(None)
+            raise EOFError
+        self.print(line)  # Echo, as a terminal would
+        return line
+
+def run(*sessions):
+    """Run session coroutines together on one event loop; their results, in order"""
+    async def main():
+        return await asyncio.gather(*sessions)
+    return asyncio.run(main())
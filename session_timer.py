@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Timer display and milestone alerts for a roast session, on the session's asyncio loop
+Milestones are timed callbacks on the loop's monotonic clock and the display is one task that wakes
+on each whole second; the phase label changes through state, not new threads
+"""
+import asyncio
+import math
+import time
+
+TICK_SECONDS = 1.0  # The display shows whole seconds, so it redraws on each second boundary
+FLASH_SECONDS = 1.0  # How long a milestone message replaces the phase label
+
+class SessionTimer:
+    """
+    Timed events for one roast, measured from `origin` (a time.monotonic() value).
+
+    at() schedules a callback at an elapsed time; show() sets the phase
+    label rendered each second, or pauses rendering with None. Everything
+    runs on one event loop, so once show(None) returns nothing more is
+    drawn until the next show(). Create it inside the running loop.
+    """
+
+    def __init__(self, origin, render, loop=None):
+        self.origin = origin
+        self.render = render  # render(elapsed, label)
+        self.loop = loop or asyncio.get_running_loop()
+        self._label = None  # Callable elapsed -> label text, or None while paused
+        self._ticker = None  # Task redrawing the display, while a label is shown
+        self._events = set()
+        self._message = None
+        self._message_until = 0.0
+
+    def elapsed(self):
+        return time.monotonic() - self.origin
+
+    def at(self, elapsed, callback):
+        """Run callback(elapsed) once `elapsed` seconds into the roast (now, if already past); returns a handle"""
+        def fire():
+            self._events.discard(handle)
+            callback(self.elapsed())
+        handle = self.loop.call_at(self.loop.time() + elapsed - self.elapsed(), fire)
+        self._events.add(handle)
+        return handle
+
+    def cancel(self, handle):
+        handle.cancel()
+        self._events.discard(handle)
+
+    def show(self, label):
+        """Render every second with label(elapsed) as the phase label; None stops rendering"""
+        self._label = label
+        if self._ticker is not None:
+            self._ticker.cancel()
+            self._ticker = None
+        if label is not None:
+            self._ticker = self.loop.create_task(self._tick())
+
+    def flash(self, message, seconds=FLASH_SECONDS):
+        """Show `message` instead of the phase label for a moment (e.g. a milestone alert)"""
+        self._message = message
+        self._message_until = time.monotonic() + seconds
+        if self._label is not None:
+            self.render(self.elapsed(), message)
+
+    def stop(self):
+        self.show(None)
+        for handle in self._events:
+            handle.cancel()
+        self._events.clear()
+
+    async def _tick(self):
+        while True:
+            elapsed = self.elapsed()
+            if self._message is not None and time.monotonic() < self._message_until:
+                self.render(elapsed, self._message)
+            else:
+                self.render(elapsed, self._label(elapsed))
+            next_tick = math.floor(elapsed / TICK_SECONDS + 1e-6) * TICK_SECONDS + TICK_SECONDS
+            await asyncio.sleep(next_tick - elapsed)
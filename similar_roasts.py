@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Nearest-neighbour roasts by loading and turnaround temperature
+A 2-d KD tree over rated roasts of one group, built once per session, answers
+"the k roasts that started most like this one" in well under a millisecond
+
+Time a lookup and show the neighbours:
+    python3 similar_roasts.py LOADING TURNAROUND [decaf] [k]
+"""
+import heapq
+import sys
+
+from phase_estimator import quality_weight
+
+KNN_NEIGHBOURS = 5  # Roasts averaged for a similar-roast estimate
+KNN_MIN_NEIGHBOURS = 3  # Fewer similar roasts than this and the group estimate is kept
+
+def _spread(values):
+    """Standard deviation used to put both temps on one scale (1.0 when there's no spread)"""
+    if len(values) < 2:
+        return 1.0
+    mean = sum(values) / len(values)
+    sd = (sum((v - mean) ** 2 for v in values) / (len(values) - 1)) ** 0.5
+    return sd or 1.0
+
+class SimilarRoastIndex:
+    """
+    KD tree of rated roasts keyed by (loading temp, turnaround temp).
+
+    Each temp is divided by its spread across the indexed roasts, so one
+    degree of turnaround counts as much as its share of typical variation,
+    not as one degree of loading temp. Nodes are (x, y, position, axis,
+    left, right) tuples; a query visits O(log n + k) nodes.
+    """
+
+    def __init__(self, records):
+        self.records = [r for r in records
+                        if r.loading_temp is not None and r.turnaround_temp is not None
+                        and quality_weight(r.rating) > 0]
+        self.scale = (_spread([r.loading_temp for r in self.records]),
+                      _spread([r.turnaround_temp for r in self.records]))
+        points = [(r.loading_temp / self.scale[0], r.turnaround_temp / self.scale[1], i)
+                  for i, r in enumerate(self.records)]
+        self.root = self._build(points, 0)
+
+    def _build(self, points, axis):
+        if not points:
+            return None
+        points.sort(key=lambda p: p[axis])
+        middle = len(points) // 2
+        x, y, position = points[middle]
+        return (x, y, position, axis,
+                self._build(points[:middle], 1 - axis), self._build(points[middle + 1:], 1 - axis))
+
+    def __len__(self):
+        return len(self.records)
+
+    def nearest(self, loading_temp, turnaround_temp, k=KNN_NEIGHBOURS):
+        """The k indexed roasts closest to these temps, closest first (newer first on ties)"""
+        target = (loading_temp / self.scale[0], turnaround_temp / self.scale[1])
+        best = []  # Max-heap of (-distance^2, position) holding the k closest so far
+        stack = [(self.root, 0.0)] if self.root is not None and k > 0 else []  # (node, min distance^2 to its region)
+        while stack:
+            node, bound = stack.pop()
+            if node is None or (len(best) == k and bound > -best[0][0]):
+                continue
+            x, y, position, axis, left, right = node
+            distance = (x - target[0]) ** 2 + (y - target[1]) ** 2
+            if len(best) < k:
+                heapq.heappush(best, (-distance, position))
+            elif (-distance, position) > best[0]:
+                heapq.heapreplace(best, (-distance, position))
+            gap = target[axis] - (x, y)[axis]
+            near, far = (left, right) if gap < 0 else (right, left)
+            stack.append((far, gap * gap))  # Skipped when popped if it can't hold anything closer
+            stack.append((near, bound))  # Popped first
+        return [self.records[position] for _, position in sorted(best, key=lambda b: (-b[0], -b[1]))]
+
+if __name__ == "__main__":
+    import time
+
+    from history_cache import HistoryCache
+    from roast_record import format_mmss
+    from roast_store import open_store
+
+    if len(sys.argv) < 3:
+        print("Usage: python3 similar_roasts.py LOADING TURNAROUND [decaf] [k]")
+        sys.exit(1)
+    loading, turnaround = float(sys.argv[1]), float(sys.argv[2])
+    is_decaf = len(sys.argv) > 3 and sys.argv[3].lower() in ('decaf', 'yes', 'y')
+    k = int(sys.argv[4]) if len(sys.argv) > 4 else KNN_NEIGHBOURS
+
+    history = HistoryCache(open_store())
+    started = time.perf_counter()
+    index = history.similar(is_decaf)
+    built = time.perf_counter() - started
+    started = time.perf_counter()
+    neighbours = index.nearest(loading, turnaround, k)
+    lookup = time.perf_counter() - started
+
+    print(f"{len(index)} rated {'decaf' if is_decaf else 'regular'} roasts loaded and indexed in {built * 1000:.2f} ms, "
+          f"lookup {lookup * 1000:.3f} ms")
+    for r in neighbours:
+        print(f"  {r.date} {r.time}  load {r.loading_temp:g} turn {r.turnaround_temp:g}  "
+              f"FC {format_mmss(r.fc_start_time) or '-'}  drop {format_mmss(r.end_time) or '-'}")
@@ -6,6 +6,9 @@ import csv
 import os
 import shutil
 
+from log_archive import iter_log_lines
+from log_writer import LogWriter
+
 OLD_LOG_FILE = "old_roast_log.csv"
 NEW_LOG_FILE = "roast_log.csv"
 BACKUP_FILE = "roast_log_before_migration.csv"
@@ -105,34 +108,33 @@ def parse_and_fix_old_csv():
     """Parse the old CSV with smart pattern detection"""
     print(f"Reading {OLD_LOG_FILE} with smart parser...")
 
-    with open(OLD_LOG_FILE, 'r') as f:
-        reader = csv.reader(f)
-        header = next(reader)  # Skip header
+    reader = csv.reader(iter_log_lines(OLD_LOG_FILE))  # Archived rows first, then the live file
+    header = next(reader)  # Skip header
 
-        fixed_rows = []
+    fixed_rows = []
 
-        for i, fields in enumerate(reader, start=2):
-            if not any(fields[:5]):  # Skip empty rows
-                continue
+    for i, fields in enumerate(reader, start=2):
+        if not any(fields[:5]):  # Skip empty rows
+            continue
 
-            fixed_row = parse_old_row_smart(fields)
+        fixed_row = parse_old_row_smart(fields)
 
-            print(f"\nRow {i}: {fixed_row['Date']} {fixed_row['Time']} - {fixed_row['Decaf']}")
-            if fixed_row['Loading Temp']:
-                print(f"  Loading: {fixed_row['Loading Temp']}°C")
-            if fixed_row['Turnaround Temp']:
-                print(f"  Turnaround: {fixed_row['Turnaround Temp']}°C")
-            if fixed_row['Yellow Time']:
-                print(f"  Yellow: {fixed_row['Yellow Time']}")
-            print(f"  FC: {fixed_row['First Crack Time']} @ {fixed_row['First Crack Temp']}°C")
-            print(f"  SC: {fixed_row['Second Crack Time']} @ {fixed_row['Second Crack Temp']}°C")
-            print(f"  End: {fixed_row['End Time']} @ {fixed_row['End Temp']}°C")
-            print(f"  Total: {fixed_row['Total Roast Time (min)']} min")
-            print(f"  Level: {fixed_row['Target Roast Level']}")
-            if fixed_row['Notes']:
-                print(f"  Notes: {fixed_row['Notes']}")
+        print(f"\nRow {i}: {fixed_row['Date']} {fixed_row['Time']} - {fixed_row['Decaf']}")
+        if fixed_row['Loading Temp']:
+            print(f"  Loading: {fixed_row['Loading Temp']}°C")
+        if fixed_row['Turnaround Temp']:
+            print(f"  Turnaround: {fixed_row['Turnaround Temp']}°C")
+        if fixed_row['Yellow Time']:
+            print(f"  Yellow: {fixed_row['Yellow Time']}")
+        print(f"  FC: {fixed_row['First Crack Time']} @ {fixed_row['First Crack Temp']}°C")
+        print(f"  SC: {fixed_row['Second Crack Time']} @ {fixed_row['Second Crack Temp']}°C")
+        print(f"  End: {fixed_row['End Time']} @ {fixed_row['End Temp']}°C")
+        print(f"  Total: {fixed_row['Total Roast Time (min)']} min")
+        print(f"  Level: {fixed_row['Target Roast Level']}")
+        if fixed_row['Notes']:
+            print(f"  Notes: {fixed_row['Notes']}")
 
-            fixed_rows.append(fixed_row)
+        fixed_rows.append(fixed_row)
 
     return fixed_rows
 
@@ -181,11 +183,10 @@ def append_to_new_log(new_rows):
         shutil.copy2(NEW_LOG_FILE, BACKUP_FILE)
         print(f"\n✓ Backup created: {BACKUP_FILE}")
 
-    # Append to new log
-    with open(NEW_LOG_FILE, 'a', newline='') as f:
-        writer = csv.writer(f)
-        for row in new_rows:
-            writer.writerow(row)
+    # Append to new log in one group commit: if it fails or the process dies part way, none of the rows stay
+    writer = LogWriter(NEW_LOG_FILE)
+    writer.recover()
+    writer.append_many(new_rows)
 
     print(f"✓ Appended {len(new_rows)} rows to {NEW_LOG_FILE}")
 
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Stress test for concurrent appends to one shared roast log
+Starts several processes ("stations") that all create and append to the same new log, then checks every row
+
+    python3 stress_appends.py [stations] [roasts_per_station]
+"""
+import csv
+import os
+import sys
+import tempfile
+from multiprocessing import Process
+
+from log_writer import BufferedLogWriter, LogWriter
+from roast_store import LOG_COLUMNS
+
+def make_row(station, seq):
+    """A V2 row whose Notes spans lines and quotes, so a torn write can't go unnoticed"""
+    row = {column: '' for column in LOG_COLUMNS}
+    row['Date'] = '2025-11-07'
+    row['Time'] = f"{station:02d}:{seq % 60:02d}"
+    row['Bean Origin'] = f"Station {station}"
+    row['Decaf'] = 'Yes' if seq % 2 else 'No'
+    row['First Crack Start Time'] = '07:06'
+    row['First Crack Start Temp'] = '190'
+    row['Notes'] = f"station={station} seq={seq}\n\"quoted\", with comma\n" + 'x' * (seq % 97)
+    return [row[column] for column in LOG_COLUMNS]
+
+def station(path, station_id, count):
+    """One station: creates the log if needed, then mixes single appends and buffered batches"""
+    writer = LogWriter(path, fsync=False)
+    writer.initialize(LOG_COLUMNS)
+    writer.recover()
+    half = count // 2
+    for seq in range(half):
+        writer.append(make_row(station_id, seq))
+    with BufferedLogWriter(path, fsync=False, max_rows=7) as buffered:
+        for seq in range(half, count):
+            buffered.append(make_row(station_id, seq))
+
+def check_log(path, stations, count):
+    """List of problems found in the log (empty if every row is intact)"""
+    problems = []
+    with open(path, 'r', newline='') as f:
+        rows = list(csv.reader(f))
+    if not rows or rows[0] != LOG_COLUMNS:
+        problems.append("header missing or not the first row")
+        return problems
+
+    expected = {(s, seq): make_row(s, seq) for s in range(stations) for seq in range(count)}
+    seen = set()
+    for row in rows[1:]:
+        if row == LOG_COLUMNS:
+            problems.append("header written more than once")
+            continue
+        origin = row[LOG_COLUMNS.index('Bean Origin')] if len(row) == len(LOG_COLUMNS) else ''
+        notes = row[LOG_COLUMNS.index('Notes')] if len(row) == len(LOG_COLUMNS) else ''
+        try:
+            key = (int(origin.split()[1]), int(notes.split()[1].split('=')[1]))
+        except (IndexError, ValueError):
+            problems.append(f"unparseable row: {row[:4]}")
+            continue
+        if expected.get(key) != row:
+            problems.append(f"corrupted row for station {key[0]} seq {key[1]}")
+        elif key in seen:
+            problems.append(f"duplicate row for station {key[0]} seq {key[1]}")
+        seen.add(key)
+    missing = len(expected) - len(seen)
+    if missing:
+        problems.append(f"{missing} rows missing")
+    return problems
+
+def main():
+    stations = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'roast_log.csv')
+        workers = [Process(target=station, args=(path, s, count)) for s in range(stations)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        failed = [w for w in workers if w.exitcode != 0]
+        problems = check_log(path, stations, count)
+        if failed:
+            problems.insert(0, f"{len(failed)} station processes exited with an error")
+
+    print(f"{stations} stations x {count} roasts = {stations * count} rows")
+    if problems:
+        for problem in problems[:20]:
+            print(f"  ✗ {problem}")
+        sys.exit(1)
+    print("  ✓ Header written once, every row present and intact")
+
+if __name__ == "__main__":
+    main()
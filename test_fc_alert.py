@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Check when the FC approaching alert fires
+Runs as a script (python3 test_fc_alert.py) or under pytest
+"""
+import roast
+from phase_estimator import PhaseStats
+
+def estimates_for(mean, sd, ess):
+    """Estimates dict for a history whose FC start has this mean, spread and effective size"""
+    stats = {field: None for field in roast.PHASE_FIELDS}
+    stats['fc_start_time'] = PhaseStats(mean, sd, ess)
+    return roast.estimates_from_stats(stats, roast.default_phase_estimates(True))
+
+def test_low_ess_uses_mean_lead():
+    # Two decaf roasts a minute apart: t(1 dof) = 3.08 would put p10 ~2 minutes early
+    estimates = estimates_for(439.0, 30.0, 2.0)
+    assert estimates['intervals']['fc_start_time'][0] < 439 - 100
+    assert roast.get_fc_approaching_time(True, estimates=estimates) == 439 - 45
+
+def test_enough_ess_uses_p10():
+    estimates = estimates_for(439.0, 20.0, 8.0)
+    p10 = estimates['intervals']['fc_start_time'][0]
+    assert roast.get_fc_approaching_time(True, estimates=estimates) == min(p10, 439 - roast.FC_ALERT_MIN_LEAD)
+
+def test_tight_spread_keeps_min_lead():
+    estimates = estimates_for(439.0, 2.0, 20.0)
+    assert roast.get_fc_approaching_time(True, estimates=estimates) == 439 - roast.FC_ALERT_MIN_LEAD
+
+def test_no_spread_uses_mean_lead():
+    estimates = estimates_for(439.0, None, 1.0)
+    assert roast.get_fc_approaching_time(True, estimates=estimates) == 439 - 45
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith('test_'):
+            test()
+            print(f"✓ {name}")
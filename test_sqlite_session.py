@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Run a whole roast session against the SQLite store and check the roast is saved
+Estimates and the save run in worker threads, so the store must work from any thread
+Runs as a script (python3 test_sqlite_session.py) or under pytest
+"""
+import os
+import subprocess
+import sys
+import tempfile
+
+from roast_store import SqliteRoastStore
+
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Drives roast.menu() with scripted input: view recent roasts, then one regular roast, then exit
+SESSION_SCRIPT = """
+import asyncio
+import roast
+from session_engine import QueueIO
+
+lines = ['2', '', '1', '', 'n', '', '203', 'early', '', '105', '', '192:12', '', '201:8', '', '212:5', '',
+         '218', '7', 'sqlite session', '3']
+io = QueueIO(lines)
+try:
+    asyncio.run(roast.menu(io))
+finally:
+    print(io.file.getvalue())
+"""
+
+def run_session(directory):
+    env = dict(os.environ, ROAST_STORE='sqlite', ROAST_ALERTS='null',
+               PYTHONPATH=PACKAGE_DIR + os.pathsep + os.environ.get('PYTHONPATH', ''))
+    return subprocess.run([sys.executable, '-c', SESSION_SCRIPT], cwd=directory, env=env,
+                          capture_output=True, text=True, timeout=60)
+
+def test_session_saves_to_sqlite():
+    with tempfile.TemporaryDirectory() as directory:
+        store = SqliteRoastStore(os.path.join(directory, 'roast_log.db'))
+        store.append_many([{'Date': '2025-11-07', 'Time': '15:20', 'Bean Origin': 'Colombian', 'Decaf': 'No',
+                            'Batch Size (lbs)': '1', 'Loading Temp': '201', 'Turnaround Temp': '107',
+                            'First Crack Start Time': '07:06', 'First Crack Start Temp': '190',
+                            'End Time': '12:28', 'End Temp': '220', 'Target Roast Level': 'Medium-Dark',
+                            'Roast Level (1-10)': '5'}])
+        store.close()
+
+        result = run_session(directory)
+        assert result.returncode == 0, result.stderr
+        assert 'Roast logged successfully' in result.stdout
+
+        store = SqliteRoastStore(os.path.join(directory, 'roast_log.db'))
+        rows = store.load_all()
+        store.close()
+        assert len(rows) == 2
+        assert rows[-1]['Notes'] == 'sqlite session'
+        assert rows[-1]['First Crack Start Temp'] == '192'
+
+if __name__ == "__main__":
+    test_session_saves_to_sqlite()
+    print("✓ test_session_saves_to_sqlite")